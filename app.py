@@ -99,8 +99,9 @@ def update_config():
                     warning_msg = " | ".join(result['warnings'])
                 bot_engine.log("Configuration updated live from dashboard.", level="info")
             elif bot_engine:
-                 # If not running, just sync the config object
-                 bot_engine.config = current_config
+                 # If not running, just sync the config object (a private copy; current_config is edited in place above)
+                 bot_engine.config = dict(current_config)
+                 bot_engine._refresh_config_cache()
 
             def background_init():
                 global bot_engine
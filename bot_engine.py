@@ -8,17 +8,109 @@ import websocket # The 'websocket-client' package provides the 'websocket' modul
 import ta
 import threading
 from collections import deque
+from types import MappingProxyType
+from operator import itemgetter
 import os # Added for file path operations
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import hashlib
 import hmac
 import base64
-import math
+import random
+import functools
+import itertools
 import _thread
+import queue
+import socket
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import orjson # Optional: faster JSON encoding, emits bytes directly
+except ImportError:
+    orjson = None
+
+if orjson:
+    json_loads = orjson.loads # orjson.JSONDecodeError subclasses json.JSONDecodeError
+
+    def json_dumps_compact(obj):
+        # Compact, key-sorted encoding (matches the stdlib form used for request signing)
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+else:
+    json_loads = json.loads
+
+    def json_dumps_compact(obj):
+        return json.dumps(obj, separators=(',', ':'), sort_keys=True)
 
 # OKX API configuration defaults (now managed per instance)
 OKX_REST_API_BASE_URL = "https://www.okx.com"
 
+# Readers-Writer Lock - shared reads, exclusive writes
+class ReadWriteLock:
+    """
+    Writer-preferring readers-writer lock.
+    `with lock:` takes the exclusive (write) side, `with lock.read():` a shared read.
+    on_write_release, if given, runs at the end of every `with lock:` block while the write side is still held.
+    """
+    def __init__(self, on_write_release=None):
+        self._on_write_release = on_write_release
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._read_ctx = _ReadLockContext(self)
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    def read(self):
+        return self._read_ctx
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._on_write_release:
+                self._on_write_release()
+        finally:
+            self.release()
+
+
+class _ReadLockContext:
+    def __init__(self, rwlock):
+        self._rwlock = rwlock
+
+    def __enter__(self):
+        self._rwlock.acquire_read()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._rwlock.release_read()
+
+
 # Rate Limiter Class - Token Bucket Algorithm
 class RateLimiter:
     """
@@ -44,7 +136,7 @@ class RateLimiter:
             self.locks[category] = threading.Lock()
             self.buckets[category] = {
                 'tokens': self.limits[category]['capacity'],
-                'last_update': time.time()
+                'last_update': time.monotonic()
             }
     
     def _get_category(self, path):
@@ -67,12 +159,12 @@ class RateLimiter:
         """
         category = self._get_category(path)
         lock = self.locks[category]
+        bucket = self.buckets[category]
+        limit = self.limits[category]
         
         with lock:
             while True:
-                now = time.time()
-                bucket = self.buckets[category]
-                limit = self.limits[category]
+                now = time.monotonic() # Elapsed-time math: immune to wall-clock (NTP) steps
                 
                 # Refill tokens based on time elapsed
                 time_passed = now - bucket['last_update']
@@ -113,22 +205,107 @@ def safe_int(value, default=0):
     except (ValueError, TypeError):
         return default
 
+def parse_dt(dt_str):
+    """Parses 'YYYY-MM-DD' or ISO-like 'YYYY-MM-DD HH:MM:SS' strings as UTC datetimes."""
+    try:
+        if len(dt_str) == 10:
+            dt = datetime(int(dt_str[0:4]), int(dt_str[5:7]), int(dt_str[8:10]))
+        else:
+            dt = datetime.fromisoformat(dt_str.replace(' ', 'T'))
+    except ValueError:
+        for fmt in ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S'):
+            try:
+                dt = datetime.strptime(dt_str, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise
+    return dt.replace(tzinfo=timezone.utc)
+
+@functools.lru_cache(maxsize=8)
+def _okx_hmac_base(api_secret):
+    # Keyed HMAC with the secret already absorbed; callers .copy() it so the base is never mutated
+    return hmac.new(api_secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+# run_forever() options shared by the public and private feeds: no Nagle delay on small frames, a deep
+# receive buffer to absorb bursts, TCP keepalive, and no per-frame UTF-8 re-validation (json decoding validates)
+_WS_RUN_OPTS = MappingProxyType({
+    'sockopt': (
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ),
+    'skip_utf8_validation': True,
+})
+
+# Per-side order vocabulary: exit (algo side), close/add (place_order side), price sign toward profit
+_SIDE_TABLE = MappingProxyType({
+    'long': MappingProxyType({'exit': 'sell', 'close': 'Sell', 'add': 'Buy', 'sign': 1}),
+    'short': MappingProxyType({'exit': 'buy', 'close': 'Buy', 'add': 'Sell', 'sign': -1}),
+})
+
+# Auto-exit modes: (direction, needs an open position, reason template). A mode fires when
+# direction * (pnl - threshold) >= 0, i.e. profit targets are >= and loss limits are <=
+_AUTO_EXIT_RULES = MappingProxyType({
+    'manual': (1, False, "Auto-Manual Profit Target: ${pnl:.2f} >= ${thr:.2f}"),
+    'cal_profit': (1, True, "Auto-Cal Profit Target: ${pnl:.2f} >= ${thr:.2f} ({k}x Fee)"),
+    'cal_loss': (-1, True, "Auto-Cal Loss Target: ${pnl:.2f} <= ${thr:.2f} ({k}x Fee)"),
+    'size_profit': (1, True, "Auto-Cal Size Target: ${pnl:.2f} >= ${thr:.2f} ({k}x Size Fee)"),
+    'size_loss': (-1, True, "Auto-Cal Size Loss Target: ${pnl:.2f} <= ${thr:.2f} ({k}x Size Fee)"),
+    'mode_2': (1, True, "Mode 2 Profit Target: Unrealized ${pnl:.2f} >= ${thr:.2f} ({k}x Fee)"),
+    'mode_1': (1, True, "Mode 1 PnL Above Zero: Net ${pnl:.2f} ≈ $0"),
+})
+
+# (use_developer_api, use_testnet) -> (api key, secret, passphrase) config keys
+_CRED_TABLE = MappingProxyType({
+    (True, True): ('dev_demo_api_key', 'dev_demo_api_secret', 'dev_demo_api_passphrase'),
+    (True, False): ('dev_api_key', 'dev_api_secret', 'dev_passphrase'),
+    (False, True): ('okx_demo_api_key', 'okx_demo_api_secret', 'okx_demo_api_passphrase'),
+    (False, False): ('okx_api_key', 'okx_api_secret', 'okx_passphrase'),
+})
+# Extra request headers per environment; shared read-only, _okx_request only copies them in
+_SIM_TRADING_HEADER = MappingProxyType({'x-simulated-trading': '1'})
+_LIVE_TRADING_HEADER = MappingProxyType({})
+
 # Top-level signature helper (kept simple, takes params)
 def generate_okx_signature(api_secret, timestamp, method, request_path, body_str=''):
     """Generate HMAC SHA256 signature for OKX API."""
     message = str(timestamp) + method.upper() + request_path + body_str
-    hashed = hmac.new(api_secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256)
+    hashed = _okx_hmac_base(api_secret).copy()
+    hashed.update(message.encode('utf-8'))
     signature = base64.b64encode(hashed.digest()).decode('utf-8')
     return signature
-    return signature
 
 class TradingBotEngine:
+    # Static fields of attached TP/SL algo orders (market execution, last-price trigger)
+    _TP_ALGO_STATIC = MappingProxyType({"tpOrdPx": "-1", "tpTriggerPxType": "last"})
+    _SL_ALGO_STATIC = MappingProxyType({"slOrdPx": "-1", "slTriggerPxType": "last"})
+    # Map log levels to numerical priorities
+    LEVEL_MAP = MappingProxyType({'debug': 10, 'info': 20, 'warning': 30, 'error': 40, 'critical': 50})
+    LOG_FLUSH_BATCH = 32 # Max queued log records the writer drains per wakeup
+    LOG_PUT_TIMEOUT = 1.0 # Seconds an error record waits for queue room before it is counted as dropped
+    FILLS_PAGE_LIMIT = 100 # Fills requested per reconcile (OKX max page size)
+    # Per-order rejections that can succeed when sent again (busy / timeout / rate limited)
+    RETRYABLE_SCODES = frozenset({'50001', '50004', '50011', '50013', '50026', '50061'})
+    PRODUCT_INFO_TTL = 3600 # Seconds an instrument spec is reused before /public/instruments is re-read
+    RETRY_BASE_DELAY = 0.1 # Full-jitter backoff for _okx_request retries: uniform(0, min(cap, base * 2**attempt))
+    RETRY_MAX_DELAY = 5.0
+    RATE_LIMIT_CODES = frozenset({'50011', '50061'}) # OKX "too many requests" codes, retried instead of returned
+
     def __init__(self, config_path, emit_callback):
         self.config_path = config_path
         self.emit = emit_callback
         
         self.console_logs = deque(maxlen=500)
+        # Log sink runs on its own thread so emits/handler I/O never extend callers' critical sections
+        self._log_q = queue.Queue(maxsize=10000)
+        self._log_thread = None
+        self._log_thread_lock = threading.Lock()
+        self._log_write_lock = threading.Lock() # Held by the writer for each batch; lets a flush wait it out
+        self._log_dropped = 0 # Records shed under backpressure, reported by the writer once it catches up
         self.config = self._load_config()
+        self._refresh_config_cache()
 
         # Configure logging based on config.log_level
         numeric_level = getattr(logging, self.config.get('log_level', 'info').upper(), None)
@@ -164,21 +341,33 @@ class TradingBotEngine:
 
         self.ws = None
         self.ws_thread = None
+        self._ws_inbox = queue.Queue() # Raw WS frames handed from the socket thread to the dispatch thread
+        self.ws_dispatch_thread = None
+        # Private WS 'orders' stream: mirrors live entry orders so account sync can skip the REST poll
+        self.private_ws = None
+        self.private_ws_thread = None
+        self._orders_ws_ready = threading.Event() # Logged in and subscribed to the orders channel
+        self._ws_open_orders = {} # ordId -> raw order for live non-reduce-only orders
+        self._ws_closed_orders = {} # ordId -> uTime of its terminal push, so a stale REST snapshot can't revive it
+        self._ws_orders_lock = threading.Lock()
+        self._last_rest_orders_sync = float('-inf')
         self.is_running = False
         self.stop_event = threading.Event()
         self.bot_start_time = int(time.time() * 1000) # Track start time in ms
         
         self.current_balance = 0.0
-        self.open_trades = []
+        self.open_trades = () # Immutable tuple, rebound wholesale by the sync (readers take no lock)
+        self._open_trades_stake_sum = 0.0 # Total 'stake' of open_trades, accumulated while the sync builds it
         self.is_bot_initialized = threading.Event()
         
         # OKX specific variables (from example bot)
         self.historical_data_store = {}
+        self._latest_candle_snapshot = {} # timeframe -> (o, h, l, c) of the last candle; replaced wholesale, read lock-free
         self.data_lock = threading.Lock()
         self.trade_data_lock = threading.Lock()
         self.latest_trade_price = None
         self.latest_trade_timestamp = None
-        self.last_price_update_time = time.time() # High-precision timestamp of last price arrival
+        self.last_price_update_time = time.monotonic() # Monotonic time of last price arrival (age/staleness checks only)
         self.account_balance = 0.0
         self.available_balance = 0.0
         self.total_equity = 0.0
@@ -191,12 +380,23 @@ class TradingBotEngine:
         self.max_amount_display = 0.0
         self.remaining_amount_notional = 0.0
         self.trade_fees = 0.0
+        self.size_fees = 0.0
+        self.used_fees = 0.0
+        self.need_add_usdt_profit_target = 0.0
+        self.need_add_usdt_above_zero = 0.0
+        self._need_add_cache_key = None # Inputs of the last Need Add computation (skip when unchanged)
+        # Sync-phase metrics handed to position management and the emitter
+        self.cached_pos_notional = 0.0
+        self.cached_used_notional = 0.0 # Before adding pending orders
+        self.cached_unrealized_pnl = 0.0
+        self.cached_active_positions_count = 0
         
         # New State Variables for Client Logic
         self.total_capital_2nd = 0.0
         self.cumulative_margin_used = 0.0
         self.last_add_price = 0.0 # Tracks price of last entry/add for Gap Trigger
         self.auto_add_step_count = 0 # Tracks if we are on Step 1 (Market) or Step 2 (Limit)
+        self._auto_add_cooldown_until = 0.0 # monotonic deadline; replaces the blocking post-add sleep
 
         
         # Refactored for Dual-Direction Support
@@ -211,12 +411,22 @@ class TradingBotEngine:
         self.entry_reduced_tp_flag = {'long': False, 'short': False}
         
         self.batch_counter = 0 # Track batches for logging
+        # Client order ids: a per-process token plus a counter, so every placement gets its own id that
+        # stays the same across retries of that placement (OKX: alphanumeric, starts with a letter, <= 32)
+        self._clordid_token = os.urandom(5).hex()
+        self._clordid_seq = itertools.count(1)
         self.monitoring_tick = 0 # Track monitoring cycles
         self.used_amount_notional = 0.0
-        self.position_lock = threading.Lock()
-        self.pending_entry_ids = [] # List to track multiple pending entry orders
+        self.notional_lock = threading.Lock() # Guards used_amount_notional only, separate from position_lock
+        # `with position_lock:` writes and republishes _pos_snapshot on exit; read-only paths use the snapshot lock-free
+        self.position_lock = ReadWriteLock(on_write_release=self._publish_pos_snapshot)
+        self._publish_pos_snapshot()
+        # pending_entry_ids / pending_entry_order_details are published copy-on-write: writers build a new
+        # frozenset/dict under pending_lock and swap the reference, readers use the reference without locking
+        self.pending_entry_ids = frozenset() # Pending entry order ids (O(1) membership)
         self.pending_entry_order_id = None # Kept for backward compatibility/single tracking if needed
-        self.pending_entry_order_details = {} # Now will store details per order ID in a dict
+        self.pending_entry_order_details = {} # Per order ID details; never mutated after publishing
+        self.pending_lock = threading.Lock() # Serializes writers of the pending_entry_* fields, separate from position_lock
         self.entry_sl_price = 0.0 # This might need migration too if we have concurrent entries? 
                                   # Entries are usually batch-based and transient. 
         self.sl_hit_triggered = False
@@ -255,39 +465,101 @@ class TradingBotEngine:
             "contractSize": None,
         }.copy()
         self.okx_rest_api_base_url = "https://www.okx.com" # Assuming this was a global constant
+        # Per-product order formatting, rebuilt in _fetch_product_info
+        self._qty_fmt = "%.8f".__mod__
+        self._px_fmt = "%.4f".__mod__
+        self._order_body_template = {}
+        self._product_info_cache = {} # symbol -> (monotonic fetch time, raw instrument dict)
+        self._algo_template_cache = {} # (instId, tdMode, posSide, side, trigger px type, kind) -> constant algo body fields
+        self._refresh_product_info()
 
         self.confirmed_subscriptions = set()
+        self.subscribed_symbol = None # Symbol the public stream is subscribed to; set by _send_websocket_subscriptions
         
         # Initialize persistent analytics
         self.analytics_path = "analytics.json"
+        self._last_analytics_key = None # Compact JSON of the last loaded/saved analytics content
         self.total_trade_profit = 0.0
         self.total_trade_loss = 0.0
         self.net_trade_profit = 0.0
+        # Incremental fills reconciler: newest fill ts already counted, id -> ts of the fills counted at or
+        # after it (dedupe key; several fills can share a millisecond) and the session PnL so far
+        self._last_fill_ts = 0
+        self._seen_fill_ids = {}
+        self._fills_session_pnl = 0.0
         self.daily_reports = []
         self._load_analytics()
 
         # Concurrency Guards for Authoritative Exit
         self.exit_lock = threading.Lock()
         self.authoritative_exit_in_progress = False
+        self._exit_queued = False # An auto-exit sits in the action queue; guarded by exit_lock
 
         # Initialize rate limiter for API request throttling (RESTORED)
         self.rate_limiter = RateLimiter()
 
+        # Shared worker pool for short post-trade tasks (replaces per-event Timer/Thread spawning)
+        self.post_trade_workers = min(32, (os.cpu_count() or 1) * 4)
+        self._post_trade_pool = ThreadPoolExecutor(max_workers=self.post_trade_workers, thread_name_prefix="post-trade")
+        self._post_trade_slots = threading.BoundedSemaphore(self.post_trade_workers * 2)
+
+        # Debounced account refresh: order events mark the account dirty, one worker syncs per 250ms window
+        self._sync_dirty = threading.Event()
+        self.sync_worker_thread = None
+        # Coalesced TP/SL re-sync: one worker instead of a thread per trigger
+        self._tpsl_dirty = threading.Event()
+        self.tpsl_worker_thread = None
+        self._batch_tpsl_lock = threading.Lock() # Held for a whole batch_modify_tpsl run; try-acquired, never waited on
+        self._tpsl_placed = {} # side -> ((tp px, sl px, sz) strings, tp algoId, sl algoId) last placed by batch_modify_tpsl
+        # Long-lived worker for one-off actions (authoritative exits) instead of a thread per trigger
+        self._action_queue = queue.SimpleQueue()
+        self.action_worker_thread = None
+        self._action_worker_lock = threading.Lock()
+        # Last bot_tick content, used to skip re-sending unchanged dashboard frames
+        self._last_tick_key = None
+        self._last_tick_emit = float('-inf')
+        # Persistent emit payloads, refreshed in place each tick; socketio.emit encodes synchronously,
+        # so handing out the same dicts every time is safe
+        self._account_payload = {}
+        self._tick_payload = {'trades': (), 'account': self._account_payload}
+        self._pos_side_payloads = {'long': {}, 'short': {}}
+        self._pos_payload = {'positions': self._pos_side_payloads}
+        # Last position_update content, used the same way as _last_tick_key
+        self._last_pos_key = None
+        self._last_pos_emit = float('-inf')
+        # Wakes the management loop early (new pending entries, shutdown) instead of a fixed 1s tick
+        self._mgmt_wakeup = threading.Event()
+
+        # Short-lived cache for /account/positions reads that fire back-to-back on exit flows
+        self._positions_cache = (0.0, None, None) # (monotonic ts, symbol, response)
+        self._positions_cache_lock = threading.Lock()
+
+        # Persistent HTTP session for keep-alive connection reuse across REST calls
+        self.http_session = requests.Session()
+        # Transient gateway errors are retried inside the pool with a short backoff; POST (order placement)
+        # is excluded from read/status retries by urllib3's default allowed_methods, so it is never resent
+        http_retry = Retry(total=2, backoff_factor=0.1, status_forcelist=(502, 503, 504), raise_on_status=False)
+        http_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=http_retry)
+        self.http_session.mount("https://", http_adapter)
+        self.server_time_synced_at = None # time.monotonic() of last successful time sync
+        self.server_time_resync_seconds = 300
+
         self.intervals = {
             '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
             '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800,
             '12h': 43200, '1d': 86400, '1w': 604800, '1M': 2592000
         }
         
+    def _log_enabled(self, level):
+        return self.LEVEL_MAP.get(level, 20) >= self.LEVEL_MAP.get(self.config.get('log_level', 'info').lower(), 20)
+
+    def log_lazy(self, level, fn):
+        """Logs fn() only when level passes the configured filter, so hot paths skip the formatting."""
+        if self._log_enabled(level):
+            self.log(fn(), level=level)
+
     def log(self, message, level='info', to_file=False, filename=None):
-        # Map levels to numerical priorities
-        LEVEL_MAP = {
-            'debug': 10,
-            'info': 20,
-            'warning': 30,
-            'error': 40,
-            'critical': 50
-        }
+        LEVEL_MAP = self.LEVEL_MAP
         
         # Get configured log level from config
         configured_level_str = self.config.get('log_level', 'info').lower()
@@ -304,7 +576,76 @@ class TradingBotEngine:
 
         timestamp = datetime.now().strftime('%H:%M:%S')
         log_entry = {'timestamp': timestamp, 'message': message, 'level': level}
-        
+
+        # Every level goes through the queue so records keep their order. Errors wait (bounded) for room;
+        # anything else is dropped under backpressure and counted. The writer thread never blocks on its own queue.
+        try:
+            if current_level >= 40 and threading.current_thread() is not self._log_thread:
+                self._log_q.put(log_entry, timeout=self.LOG_PUT_TIMEOUT)
+            else:
+                self._log_q.put_nowait(log_entry)
+        except queue.Full:
+            with self._log_thread_lock:
+                self._log_dropped += 1
+            return
+        self._ensure_log_thread()
+
+    def _ensure_log_thread(self):
+        with self._log_thread_lock:
+            if self._log_thread is None:
+                self._log_thread = threading.Thread(target=self._log_writer_loop, daemon=True)
+                self._log_thread.start()
+
+    def _flush_log_queue(self, timeout=2.0):
+        """Waits (bounded) for the writer to drain everything queued so far, so records survive a shutdown."""
+        if threading.current_thread() is self._log_thread:
+            return
+        if not self._log_q.empty():
+            self._ensure_log_thread()
+        deadline = time.monotonic() + timeout
+        while not self._log_q.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The writer may still be on its last batch; it takes the write lock for each one
+        with self._log_write_lock:
+            pass
+
+    def _log_writer_loop(self):
+        # Exits after a quiet period; the next queued message restarts it
+        while True:
+            try:
+                log_entry = self._log_q.get(timeout=5)
+            except queue.Empty:
+                with self._log_thread_lock:
+                    if self._log_q.empty(): # Re-check under the lock so a racing put always finds a writer
+                        self._log_thread = None
+                        return
+                continue
+            with self._log_write_lock:
+                # Drain whatever else is already queued (up to a batch) before blocking again
+                batch = [log_entry]
+                try:
+                    while len(batch) < self.LOG_FLUSH_BATCH:
+                        batch.append(self._log_q.get_nowait())
+                except queue.Empty:
+                    pass
+                for entry in batch:
+                    try:
+                        self._write_log(entry)
+                    except Exception:
+                        pass
+                if self._log_dropped:
+                    with self._log_thread_lock:
+                        dropped, self._log_dropped = self._log_dropped, 0
+                    try:
+                        self._write_log({'timestamp': datetime.now().strftime('%H:%M:%S'),
+                                         'message': f"{dropped} log records dropped under backpressure", 'level': 'warning'})
+                    except Exception:
+                        pass
+
+    def _write_log(self, log_entry):
+        message = log_entry['message']
+        level = log_entry['level']
+
         # Always append to console_logs for internal history if it passed the filter
         self.console_logs.append(log_entry)
         
@@ -404,6 +745,8 @@ class TradingBotEngine:
             self.emit('bot_status', {'running': False})
             return
         
+        # A (re)start always reads fresh instrument specs
+        self._invalidate_product_info(self.config['symbol'])
         if not self._fetch_product_info(self.config['symbol']):
             self.log("Failed to fetch product info. Exiting.", 'error')
             if not passive_monitoring:
@@ -448,6 +791,7 @@ class TradingBotEngine:
             self.is_running = True
         
         self.bot_start_time = int(time.time() * 1000) # Reset session start time
+        self._reset_fill_accumulator()
 
         # Check if threads are already running
         if getattr(self, 'ws_thread', None) and self.ws_thread.is_alive():
@@ -483,17 +827,25 @@ class TradingBotEngine:
         
         # We no longer set stop_event or close WS here to allow background Auto-Exit to work
         self.emit('bot_status', {'running': False})
+        self._flush_log_queue()
 
     def shutdown(self):
         """Truly stops all threads and connections."""
         self.is_running = False
         self.stop_event.set()
+        self._mgmt_wakeup.set()
+        if self.private_ws:
+            try:
+                self.private_ws.close()
+            except Exception:
+                pass
         if self.ws:
             try:
                 self.ws.close()
             except:
                 pass
         self.log('Bot fully shut down.', 'info')
+        self._flush_log_queue()
     
     def _load_config(self):
         try:
@@ -547,39 +899,105 @@ class TradingBotEngine:
             self.log(f"An unexpected error occurred while loading config: {e}", 'error')
             raise
 
+    def _refresh_config_cache(self):
+        """Derived config values used on the order paths; refreshed whenever config is (re)loaded."""
+        self._tp_amount_frac = safe_float(self.config.get('tp_amount', 100)) / 100.0
+        self._sl_amount_frac = safe_float(self.config.get('sl_amount', 100)) / 100.0
+        cfg = self.config
+        # Entry/cancel hot-path values (read every tick, change only on config reload)
+        self._c_leverage = float(cfg.get('leverage', 1))
+        if self._c_leverage <= 0: self._c_leverage = 1.0
+        self._c_max_allowed_used = float(cfg.get('max_allowed_used', 1000.0))
+        self._c_rate_divisor = cfg.get('rate_divisor', 1)
+        if self._c_rate_divisor <= 0: self._c_rate_divisor = 1
+        self._c_min_order_amount = cfg.get('min_order_amount', 100)
+        self._c_target_order_amount = cfg.get('target_order_amount', 100)
+        self._c_tp_price_offset = safe_float(cfg.get('tp_price_offset', 0))
+        self._c_sl_price_offset = safe_float(cfg.get('sl_price_offset', 0))
+        self._c_entry_price_offset = cfg.get('entry_price_offset', 0)
+        self._c_long_safety_line_price = cfg.get('long_safety_line_price', 0)
+        self._c_short_safety_line_price = cfg.get('short_safety_line_price', float('inf'))
+        self._c_cancel_unfilled_seconds = cfg.get('cancel_unfilled_seconds', 90)
+        self._c_loop_time_seconds = cfg.get('loop_time_seconds', 10)
+        self._c_account_update_interval = cfg.get('account_update_interval_seconds', 10)
+        self._c_trade_fee_pct = safe_float(cfg.get('trade_fee_percentage', 0.08)) / 100.0 # As a decimal
+        # Position-management values (read every mgmt tick by _execute_position_management and the emitter)
+        self._c_use_auto_margin = cfg.get('use_auto_margin', False)
+        self._c_auto_margin_offset = cfg.get('auto_margin_offset', 30.0)
+        self._c_use_add_pos_auto_cal = cfg.get('use_add_pos_auto_cal', False)
+        self._c_add_pos_gap_threshold = cfg.get('add_pos_gap_threshold', 5.0)
+        self._c_add_pos_max_count = cfg.get('add_pos_max_count', 10)
+        self._c_add_pos_size_frac = safe_float(cfg.get('add_pos_size_pct', 30.0)) / 100.0
+        self._c_use_pnl_auto_manual = cfg.get('use_pnl_auto_manual', False)
+        self._c_pnl_auto_manual_threshold = cfg.get('pnl_auto_manual_threshold', 100.0)
+        self._c_use_pnl_auto_cal = cfg.get('use_pnl_auto_cal', False)
+        self._c_pnl_auto_cal_times = cfg.get('pnl_auto_cal_times', 4)
+        self._c_use_pnl_auto_cal_loss = cfg.get('use_pnl_auto_cal_loss', False)
+        self._c_pnl_auto_cal_loss_times = cfg.get('pnl_auto_cal_loss_times', 1.5)
+        self._c_use_size_auto_cal = cfg.get('use_size_auto_cal', False)
+        self._c_size_auto_cal_times = cfg.get('size_auto_cal_times', 2.0)
+        self._c_use_size_auto_cal_loss = cfg.get('use_size_auto_cal_loss', False)
+        self._c_size_auto_cal_loss_times = cfg.get('size_auto_cal_loss_times', 1.5)
+        self._c_use_add_pos_profit_target = cfg.get('use_add_pos_profit_target', False)
+        self._c_add_pos_profit_multiplier = cfg.get('add_pos_profit_multiplier', 1.5)
+        self._c_add_pos_recovery_pct = safe_float(cfg.get('add_pos_recovery_percent', 0.6)) / 100.0 # As a decimal
+        self._need_add_cache_key = None # Need Add depends on these values; recompute on the next sync
+        self._c_use_add_pos_above_zero = cfg.get('use_add_pos_above_zero', False)
+        # Enabled auto-exit modes in priority order as (mode, multiplier or fixed threshold); the mgmt
+        # tick walks only these rows and skips the ladder entirely when none is enabled (the common case)
+        self._c_auto_exit_ladder = tuple(row for enabled, row in (
+            (self._c_use_pnl_auto_manual, ('manual', self._c_pnl_auto_manual_threshold)),
+            (self._c_use_pnl_auto_cal, ('cal_profit', self._c_pnl_auto_cal_times)),
+            (self._c_use_pnl_auto_cal_loss, ('cal_loss', self._c_pnl_auto_cal_loss_times)),
+            (self._c_use_size_auto_cal, ('size_profit', self._c_size_auto_cal_times)),
+            (self._c_use_size_auto_cal_loss, ('size_loss', self._c_size_auto_cal_loss_times)),
+            (self._c_use_add_pos_profit_target, ('mode_2', self._c_add_pos_profit_multiplier)),
+            (self._c_use_add_pos_above_zero, ('mode_1', None)),
+        ) if enabled)
+        self._c_any_auto_exit = bool(self._c_auto_exit_ladder)
+        # Dashboard exit targets as (payload key, signed multiplier of the position fee)
+        self._c_exit_target_mults = (
+            ('auto_cal_profit_target', self._c_pnl_auto_cal_times),
+            ('auto_cal_loss_target', -self._c_pnl_auto_cal_loss_times),
+            ('size_profit_target', self._c_size_auto_cal_times),
+            ('size_loss_target', -self._c_size_auto_cal_loss_times),
+            ('mode_2_profit_target', self._c_add_pos_profit_multiplier),
+        )
+        # Hot-path debug logs check this flag before building their f-strings
+        self._debug_enabled = self._log_enabled('debug')
+        self._c_cancel_entry_below = bool(cfg.get('cancel_on_entry_price_below_market'))
+        self._c_cancel_entry_above = bool(cfg.get('cancel_on_entry_price_above_market'))
+        self._c_batch_offset = cfg.get('batch_offset', 0)
+        self._c_direction = cfg.get('direction', 'long')
+        # Enabled candlestick range checks as (label, index into the (o-c, h-l, h-c) changes, min, max)
+        self._candle_checks = tuple(
+            (label, idx, cfg.get(f'min_chg_{key}', 0), cfg.get(f'max_chg_{key}', 0))
+            for idx, (key, label) in enumerate((('open_close', 'open-close'), ('high_low', 'High-Low'), ('high_close', 'High-Close')))
+            if cfg.get(f'use_chg_{key}')
+        )
+
     # ================================================================================
     # OKX API Helper Functions (Adapted as methods)
     # ================================================================================
 
+    def _select_api_credentials(self, use_dev, use_demo):
+        """(key, secret, passphrase, extra headers) for one (developer, testnet) combination."""
+        key_name, secret_name, pass_name = _CRED_TABLE[(bool(use_dev), bool(use_demo))]
+        return (self.config.get(key_name, ''), self.config.get(secret_name, ''), self.config.get(pass_name, ''),
+                _SIM_TRADING_HEADER if use_demo else _LIVE_TRADING_HEADER)
+
+    def _set_api_credentials(self, use_dev, use_demo):
+        """Loads the key/secret/passphrase and demo header for one (developer, testnet) combination."""
+        (self.okx_api_key, self.okx_api_secret, self.okx_passphrase,
+         self.okx_simulated_trading_header) = self._select_api_credentials(use_dev, use_demo)
+
     def _apply_api_credentials(self):
         """Applies configured API credentials to instance variables."""
         self.credentials_invalid = False
         use_dev = self.config.get('use_developer_api', False)
         use_demo = self.config.get('use_testnet', False)
 
-        if use_dev:
-            if use_demo:
-                self.okx_api_key = self.config.get('dev_demo_api_key', '')
-                self.okx_api_secret = self.config.get('dev_demo_api_secret', '')
-                self.okx_passphrase = self.config.get('dev_demo_api_passphrase', '')
-            else:
-                self.okx_api_key = self.config.get('dev_api_key', '')
-                self.okx_api_secret = self.config.get('dev_api_secret', '')
-                self.okx_passphrase = self.config.get('dev_passphrase', '')
-        else:
-            if use_demo:
-                self.okx_api_key = self.config.get('okx_demo_api_key', '')
-                self.okx_api_secret = self.config.get('okx_demo_api_secret', '')
-                self.okx_passphrase = self.config.get('okx_demo_api_passphrase', '')
-            else:
-                self.okx_api_key = self.config.get('okx_api_key', '')
-                self.okx_api_secret = self.config.get('okx_api_secret', '')
-                self.okx_passphrase = self.config.get('okx_passphrase', '')
-
-        if use_demo:
-            self.okx_simulated_trading_header = {'x-simulated-trading': '1'}
-        else:
-            self.okx_simulated_trading_header = {}
+        self._set_api_credentials(use_dev, use_demo)
         self.log(f"API Credentials Applied: {'Developer' if use_dev else 'User'} | {'Demo' if use_demo else 'Live'}", level="debug")
 
     def _save_config(self):
@@ -590,37 +1008,52 @@ class TradingBotEngine:
         except Exception as e:
             self.log(f"Error saving config: {e}", level="error")
 
-    def _okx_request(self, method, path, params=None, body_dict=None, max_retries=3):
+    def _retry_delay(self, attempt, response=None):
+        """Full-jitter backoff for retry attempt, never shorter than a server Retry-After hint."""
+        delay = random.uniform(0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * (2 ** attempt)))
+        if response is not None:
+            retry_after = safe_float(response.headers.get('Retry-After'), 0.0)
+            if retry_after > 0:
+                delay = max(delay, min(retry_after, self.RETRY_MAX_DELAY))
+        return delay
+
+    def _okx_request(self, method, path, params=None, body_dict=None, max_retries=3, creds=None):
+        # creds: optional (key, secret, passphrase, extra headers) used instead of the engine's own credentials
         if self.credentials_invalid:
             return None
             
-        local_dt = datetime.now(timezone.utc)
-        adjusted_dt = local_dt + timedelta(milliseconds=self.server_time_offset)
-        timestamp = adjusted_dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        # Wall clock is required here (OKX validates it); epoch-ms arithmetic avoids per-request datetime objects
+        ts_ms = int(time.time() * 1000) + self.server_time_offset
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(ts_ms // 1000)) + f".{ts_ms % 1000:03d}Z"
 
         body_str = ''
         if body_dict:
-            body_str = json.dumps(body_dict, separators=(',', ':'), sort_keys=True)
+            body_str = json_dumps_compact(body_dict)
 
         request_path_for_signing = path
         final_url = f"{self.okx_rest_api_base_url}{path}" 
 
         if params and method.upper() == 'GET':
-            query_string = '?' + '&'.join([f'{k}={v}' for k, v in sorted(params.items())])
+            # Keys are unique, so ordering by key alone (C-level itemgetter) matches the full tuple sort
+            query_string = '?' + '&'.join([f'{k}={v}' for k, v in sorted(params.items(), key=itemgetter(0))])
             request_path_for_signing += query_string
             final_url += query_string
 
-        signature = generate_okx_signature(self.okx_api_secret, timestamp, method, request_path_for_signing, body_str)
+        if creds is None:
+            creds = (self.okx_api_key, self.okx_api_secret, self.okx_passphrase, self.okx_simulated_trading_header)
+        api_key, api_secret, passphrase, extra_headers = creds
+
+        signature = generate_okx_signature(api_secret, timestamp, method, request_path_for_signing, body_str)
 
         headers = {
-            "OK-ACCESS-KEY": self.okx_api_key,
+            "OK-ACCESS-KEY": api_key,
             "OK-ACCESS-SIGN": signature,
             "OK-ACCESS-TIMESTAMP": timestamp,
-            "OK-ACCESS-PASSPHRASE": self.okx_passphrase,
+            "OK-ACCESS-PASSPHRASE": passphrase,
             "Content-Type": "application/json"
         }
 
-        headers.update(self.okx_simulated_trading_header)
+        headers.update(extra_headers)
 
         for attempt in range(max_retries):
             if self.credentials_invalid:
@@ -630,22 +1063,23 @@ class TradingBotEngine:
                 # Acquire rate limit token before making request
                 self.rate_limiter.acquire(path)
                 
-                req_func = getattr(requests, method.lower(), None)
+                req_func = getattr(self.http_session, method.lower(), None)
                 if not req_func:
                     self.log(f"Unsupported HTTP method: {method}", level="error")
                     return None
 
-                kwargs = {'headers': headers, 'timeout': 15}
+                kwargs = {'headers': headers, 'timeout': (5, 15)} # (connect, read): fail fast on a dead route
 
                 if body_dict and method.upper() in ['POST', 'PUT', 'DELETE']:
                     kwargs['data'] = body_str
 
-                self.log(f"{method} {path} (Attempt {attempt + 1}/{max_retries})", level="debug")
+                if self._debug_enabled:
+                    self.log(f"{method} {path} (Attempt {attempt + 1}/{max_retries})", level="debug")
                 response = req_func(final_url, **kwargs)
 
                 if response.status_code != 200:
                     try:
-                        error_json = response.json()
+                        error_json = json_loads(response.content)
                         okx_error_code = error_json.get('code')
                         
                         # Check for invalid credential error codes
@@ -655,6 +1089,13 @@ class TradingBotEngine:
                                 self.credentials_invalid = True
                             return error_json
 
+                        # Rate limited: back off (honoring Retry-After) and retry rather than surfacing the error
+                        if (response.status_code == 429 or okx_error_code in self.RATE_LIMIT_CODES) and attempt < max_retries - 1:
+                            delay = self._retry_delay(attempt, response)
+                            self.log(f"Rate limited on {method} {path} (Code={okx_error_code}), retrying in {delay:.2f}s", level="warning")
+                            time.sleep(delay)
+                            continue
+
                         if not self.credentials_invalid:
                             self.log(f"API Error: Status={response.status_code}, Code={okx_error_code}, Msg={error_json.get('msg')}. Full Response: {error_json}", level="error")
                         
@@ -665,27 +1106,29 @@ class TradingBotEngine:
                             self.log(f"API Error: Status={response.status_code}, Response: {response.text}", level="error")
 
                     if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)
+                        time.sleep(self._retry_delay(attempt, response))
                         continue
                     return None
 
                 try:
-                    json_response = response.json()
-                    if json_response.get('code') != '0':
-                        self.log(f"OKX API returned non-zero code: {json_response.get('code')} Msg: {json_response.get('msg')} for {method} {path}. Full Response: {json_response}", level="debug")
-                    self.log(f"DEBUG: Full OKX API Response for {method} {path}: {json_response}", level="debug") # Log full response
+                    # Parse the raw bytes directly (orjson when installed) instead of requests' text decode + stdlib json
+                    json_response = json_loads(response.content)
+                    if self._debug_enabled:
+                        if json_response.get('code') != '0':
+                            self.log(f"OKX API returned non-zero code: {json_response.get('code')} Msg: {json_response.get('msg')} for {method} {path}. Full Response: {json_response}", level="debug")
+                        self.log(f"DEBUG: Full OKX API Response for {method} {path}: {json_response}", level="debug") # Log full response
                     return json_response
                 except json.JSONDecodeError:
                     self.log(f"Failed to decode JSON for {method} {path}. Status: {response.status_code}, Resp: {response.text}", level="error")
                     if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)
+                        time.sleep(self._retry_delay(attempt, response))
                         continue
                     return None
 
             except requests.exceptions.Timeout:
                 self.log(f"API request timeout (Attempt {attempt + 1}/{max_retries})", level="error")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    time.sleep(self._retry_delay(attempt))
                     continue
                 return None
             except requests.exceptions.RequestException as e:
@@ -693,17 +1136,36 @@ class TradingBotEngine:
                 err_text = e.response.text[:200] if e.response is not None else 'No response text'
                 self.log(f"OKX API HTTP Error ({method} {path}): Status={status_code}, Error={e}. Response: {err_text}", level="error")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    time.sleep(self._retry_delay(attempt))
                     continue
                 return None
             except Exception as e:
                 self.log(f"Unexpected error during OKX API request ({method} {path}): {e}", level="error")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    time.sleep(self._retry_delay(attempt))
                     continue
                 return None
         return None
 
+    def _get_positions_cached(self, symbol=None, ttl=0.8):
+        """GET /account/positions for symbol, reusing a response younger than ttl seconds."""
+        symbol = symbol or self.config['symbol']
+        with self._positions_cache_lock:
+            cached_ts, cached_symbol, cached_response = self._positions_cache
+            if cached_symbol == symbol and cached_response is not None and time.monotonic() - cached_ts < ttl:
+                return cached_response
+
+        params = {"instType": "SWAP", "instId": symbol}
+        response = self._okx_request("GET", "/api/v5/account/positions", params=params)
+        if response and response.get('code') == '0':
+            with self._positions_cache_lock:
+                self._positions_cache = (time.monotonic(), symbol, response)
+        return response
+
+    def _invalidate_positions_cache(self):
+        with self._positions_cache_lock:
+            self._positions_cache = (0.0, None, None)
+
     def _fetch_historical_data_okx(self, symbol, timeframe, start_ts_ms, end_ts_ms):
         try:
             path = "/api/v5/market/history-candles"
@@ -782,16 +1244,20 @@ class TradingBotEngine:
             self.log(f"Exception in _fetch_historical_data_okx: {e}", level="error")
             return []
 
-    def _sync_server_time(self):
-        """Synchronizes server time and updates instance offset."""
+    def _sync_server_time(self, force=False):
+        """Synchronizes server time and updates instance offset (cached for server_time_resync_seconds)."""
+        if not force and self.server_time_synced_at is not None and \
+                time.monotonic() - self.server_time_synced_at < self.server_time_resync_seconds:
+            return True
         try:
-            response = requests.get(f"{self.okx_rest_api_base_url}/api/v5/public/time", timeout=5)
+            response = self.http_session.get(f"{self.okx_rest_api_base_url}/api/v5/public/time", timeout=5)
             response.raise_for_status()
-            json_response = response.json()
+            json_response = json_loads(response.content)
             if json_response.get('code') == '0' and json_response.get('data'):
                 server_timestamp_ms = int(json_response['data'][0]['ts'])
                 local_timestamp_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
                 self.server_time_offset = server_timestamp_ms - local_timestamp_ms
+                self.server_time_synced_at = time.monotonic()
                 self.log(f"OKX server time synchronized. Offset: {self.server_time_offset}ms", level="info")
                 return True
             else:
@@ -804,25 +1270,48 @@ class TradingBotEngine:
             self.log(f"Unexpected error in _sync_server_time: {e}", level="error")
             return False
 
+    def _refresh_product_info(self):
+        """Pre-parse product_info into numeric attributes for the order paths."""
+        pi = self.product_info
+        self._pi_contract_size = safe_float(pi.get('contractSize'), 1.0)
+        if self._pi_contract_size <= 0: self._pi_contract_size = 1.0
+        self._pi_lot_size = safe_float(pi.get('qtyStepSize'), 1.0)
+        if self._pi_lot_size <= 0: self._pi_lot_size = 1.0
+        self._pi_min_qty = safe_float(pi.get('minOrderQty'), 1.0)
+        self._pi_qty_precision = safe_int(pi.get('qtyPrecision'), 0)
+
+    def _invalidate_product_info(self, symbol=None):
+        """Drops the cached instrument spec for symbol (or all symbols) so the next fetch hits REST."""
+        if symbol is None:
+            self._product_info_cache.clear()
+        else:
+            self._product_info_cache.pop(symbol, None)
+
     def _fetch_product_info(self, target_symbol):
         try:
-            path = "/api/v5/public/instruments"
-            params = {"instType": "SWAP", "instId": target_symbol}
-            response = self._okx_request("GET", path, params=params)
-
-            if response and response.get('code') == '0':
+            cached_ts, product_data = self._product_info_cache.get(target_symbol, (0.0, None))
+            if product_data is not None and time.monotonic() - cached_ts < self.PRODUCT_INFO_TTL:
+                response = None # Cache hit: specs change rarely, skip the instruments round-trip
+            else:
+                path = "/api/v5/public/instruments"
+                params = {"instType": "SWAP", "instId": target_symbol}
+                response = self._okx_request("GET", path, params=params)
                 product_data = None
-                if isinstance(response.get('data'), list):
-                    for item in response['data']:
-                        if item.get('instId') == target_symbol:
-                            product_data = item
-                            break
-                elif isinstance(response.get('data'), dict) and response.get('data').get('instId') == target_symbol:
-                    product_data = response.get('data')
 
-                if not product_data:
-                    self.log(f"Product {target_symbol} not found in OKX instruments response.", level="error")
-                    return False
+            if product_data is not None or (response and response.get('code') == '0'):
+                if product_data is None:
+                    if isinstance(response.get('data'), list):
+                        for item in response['data']:
+                            if item.get('instId') == target_symbol:
+                                product_data = item
+                                break
+                    elif isinstance(response.get('data'), dict) and response.get('data').get('instId') == target_symbol:
+                        product_data = response.get('data')
+
+                    if not product_data:
+                        self.log(f"Product {target_symbol} not found in OKX instruments response.", level="error")
+                        return False
+                    self._product_info_cache[target_symbol] = (time.monotonic(), product_data)
 
                 self.product_info['priceTickSize'] = safe_float(product_data.get('tickSz'))
                 self.product_info['qtyPrecision'] = int(np.abs(np.log10(safe_float(product_data.get('lotSz'))))) if safe_float(product_data.get('lotSz')) > 0 else 0
@@ -832,6 +1321,13 @@ class TradingBotEngine:
 
                 self.product_info['contractSize'] = safe_float(product_data.get('ctVal', '1'), 1.0)
 
+                # Specialize order formatters once per product instead of per order; printf-style
+                # formatting of a fixed spec skips str.format's field parsing
+                self._qty_fmt = ("%." + str(self.product_info['qtyPrecision']) + "f").__mod__
+                self._px_fmt = ("%." + str(self.product_info['pricePrecision']) + "f").__mod__
+                self._order_body_template = {"instId": target_symbol, "tdMode": self.config.get('mode', 'cross')}
+                self._refresh_product_info()
+
                 self.log(f"Product specifications for {target_symbol} initialized.", level="debug")
                 return True
             else:
@@ -899,6 +1395,90 @@ class TradingBotEngine:
             self.log(f"Exception in _okx_set_position_mode: {e}", level="error")
             return False
 
+    def _run_post_trade_task(self, fn, *args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            self.log(f"Error in post-trade task {getattr(fn, '__name__', fn)}: {e}", level="error")
+
+    def _submit_post_trade(self, fn, *args, delay=0.0, **kwargs):
+        """
+        Runs fn on the post-trade pool; when the pool is saturated it runs inline in the caller.
+        A delayed task is armed on a timer and submitted when it fires, so neither the caller nor a
+        pool worker ever sleeps through the delay.
+        """
+        if delay > 0:
+            timer = threading.Timer(delay, functools.partial(self._submit_post_trade, fn, *args, **kwargs))
+            timer.daemon = True
+            timer.start()
+            return
+        if not self._post_trade_slots.acquire(blocking=False):
+            self._run_post_trade_task(fn, *args, **kwargs)
+            return
+        try:
+            future = self._post_trade_pool.submit(self._run_post_trade_task, fn, *args, **kwargs)
+        except RuntimeError:
+            # Pool shut down (interpreter exiting)
+            self._post_trade_slots.release()
+            self._run_post_trade_task(fn, *args, **kwargs)
+            return
+        future.add_done_callback(lambda _f: self._post_trade_slots.release())
+
+    def _request_account_refresh(self):
+        # Mark account state dirty; the sync worker coalesces bursts into one refresh
+        self._sync_dirty.set()
+        if not self.sync_worker_thread or not self.sync_worker_thread.is_alive():
+            self.sync_worker_thread = threading.Thread(target=self._sync_worker_loop, daemon=True)
+            self.sync_worker_thread.start()
+
+    def _sync_worker_loop(self):
+        while not self.stop_event.is_set():
+            if not self._sync_dirty.wait(timeout=1):
+                continue
+            # Debounce window with a little jitter so refreshes don't line up across instances
+            time.sleep(0.25 + random.uniform(0, 0.05))
+            self._sync_dirty.clear()
+            try:
+                self._sync_account_data()
+                self._emit_socket_updates()
+            except Exception as e:
+                self.log(f"Error in account refresh: {e}", level="error")
+
+    def _request_tpsl_sync(self):
+        # Mark TP/SL stale; bursts of fills collapse into a single batch_modify_tpsl run
+        self._tpsl_dirty.set()
+        if not self.tpsl_worker_thread or not self.tpsl_worker_thread.is_alive():
+            self.tpsl_worker_thread = threading.Thread(target=self._tpsl_worker_loop, daemon=True)
+            self.tpsl_worker_thread.start()
+
+    def _tpsl_worker_loop(self):
+        while not self.stop_event.is_set():
+            if not self._tpsl_dirty.wait(timeout=1):
+                continue
+            time.sleep(0.15) # Debounce window
+            self._tpsl_dirty.clear()
+            try:
+                self.batch_modify_tpsl()
+            except Exception as e:
+                self.log(f"Error in TP/SL sync: {e}", level="error")
+
+    def _submit_action(self, fn, *args):
+        # Queue fn(*args) for the action worker, starting it on first use
+        self._action_queue.put((fn, args))
+        with self._action_worker_lock:
+            if not self.action_worker_thread or not self.action_worker_thread.is_alive():
+                self.action_worker_thread = threading.Thread(target=self._action_worker_loop, daemon=True)
+                self.action_worker_thread.start()
+
+    def _action_worker_loop(self):
+        # Not tied to stop_event: an exit queued during shutdown must still run
+        while True:
+            fn, args = self._action_queue.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                self.log(f"Error in queued action {getattr(fn, '__name__', fn)}: {e}", level="error")
+
     def _get_ws_url(self):
         # Dynamic URL: Production vs Demo
         if self.config.get('use_testnet'):
@@ -907,9 +1487,54 @@ class TradingBotEngine:
         return "wss://ws.okx.com:8443/ws/v5/public"
 
     def _on_websocket_message(self, ws_app, message):
+        # Producer side only: queue the raw frame, processing happens on the dispatch thread
+        self._ws_inbox.put(message)
+
+    def _start_ws_dispatch_thread(self):
+        if not self.ws_dispatch_thread or not self.ws_dispatch_thread.is_alive():
+            self.ws_dispatch_thread = threading.Thread(target=self._ws_dispatch_loop, daemon=True)
+            self.ws_dispatch_thread.start()
+
+    def _drain_ws_inbox(self, items):
+        while True:
+            try:
+                items.append(self._ws_inbox.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _ws_dispatch_loop(self):
+        """Processes queued WS frames in batches so a burst costs one UI emit instead of one per frame."""
+        while not self.stop_event.is_set():
+            try:
+                items = [self._ws_inbox.get(timeout=1)]
+            except queue.Empty:
+                continue
+            # Take whatever is already queued; a lone frame is processed immediately rather than waiting for a burst
+            self._drain_ws_inbox(items)
+
+            for message in items:
+                self._process_websocket_message(message)
+            self._emit_price_update()
+
+    def _emit_price_update(self):
+        # ---------------------------------------------------------
+        # REAL-TIME UI UPDATES (TRANSITIONAL)
+        # ---------------------------------------------------------
+        # Triggered once per dispatched batch to keep the dashboard responsive
+        try:
+            if self.latest_trade_price:
+                now = time.monotonic()
+                # Throttle emissions to max 2 per second to prevent UI flooding
+                if now - self.last_emit_time >= 0.5:
+                    self.last_emit_time = now
+                    self.emit('price_update', {'price': self.latest_trade_price, 'symbol': self.config['symbol']})
+        except Exception as e:
+            self.log(f"Exception emitting price update: {e}", level="error")
+
+    def _process_websocket_message(self, message):
         # Removed raw message logging to reduce clutter
         try:
-            msg = json.loads(message)
+            msg = json_loads(message)
             # self.log(f"DEBUG: _on_websocket_message received parsed message: {msg}", level="debug")
 
             # Handle event messages (subscribe)
@@ -922,39 +1547,43 @@ class TradingBotEngine:
                     if self.pending_subscriptions == self.confirmed_subscriptions:
                         self.log("All WebSocket subscriptions are ready.", level="debug")
                         self.ws_subscriptions_ready.set()
+                elif msg['event'] == 'unsubscribe': # Symbol switch on the live socket
+                    arg = msg.get('arg', {})
+                    self.log(f"Unsubscribed from {arg.get('channel')}:{arg.get('instId')}", level="debug")
                 else: # Log other event messages
                     self.log(f"Received non-subscribe event message: {msg}", level="warning")
                 # Do NOT return here, allow further processing if it's a data message that also has an event.
             
             if 'data' in msg:
-                channel = msg.get('arg', {}).get('channel', '')
+                arg = msg.get('arg', {})
+                # Frames for the previous symbol can still be in flight right after a live resubscribe
+                if arg.get('instId') != self.subscribed_symbol:
+                    return
+                channel = arg.get('channel', '')
                 data = msg.get('data', [])
 
+                # Inline float() on the per-tick fields instead of safe_float() to skip the extra call frame
                 if channel == 'trades' and data:
+                    last_trade = data[-1]
+                    try:
+                        px = float(last_trade['px'])
+                    except (KeyError, ValueError, TypeError):
+                        px = 0.0
                     with self.trade_data_lock:
-                        self.latest_trade_timestamp = int(data[-1].get('ts'))
-                        self.latest_trade_price = safe_float(data[-1].get('px'))
-                        self.last_price_update_time = time.time()
+                        self.latest_trade_timestamp = int(last_trade.get('ts'))
+                        self.latest_trade_price = px
+                        self.last_price_update_time = time.monotonic()
 
                 elif channel == 'tickers' and data:
                     # Process ticker data to update latest_trade_price
                     # The `last` field from ticker data represents the current price
-                    self.latest_trade_price = safe_float(data[0].get('last'))
-                    self.last_price_update_time = time.time()
+                    try:
+                        self.latest_trade_price = float(data[0]['last'])
+                    except (KeyError, ValueError, TypeError):
+                        self.latest_trade_price = 0.0
+                    self.last_price_update_time = time.monotonic()
                     # No need to update historical data store from tickers channel
 
-                # ---------------------------------------------------------
-                # REAL-TIME UI UPDATES (TRANSITIONAL)
-                # ---------------------------------------------------------
-                # Triggered on every price tick to keep the dashboard responsive
-                if self.latest_trade_price:
-                    now = time.time()
-                    # Throttle emissions to max 2 per second to prevent UI flooding
-                    if now - self.last_emit_time >= 0.5:
-                        self.last_emit_time = now
-                        self.emit('price_update', {'price': self.latest_trade_price, 'symbol': self.config['symbol']})
-                # ---------------------------------------------------------
-
         except json.JSONDecodeError:
             self.log(f"DEBUG: Non-JSON WebSocket message received: {message[:500]}", level="debug")
         except Exception as e:
@@ -979,12 +1608,59 @@ class TradingBotEngine:
             "op": "subscribe",
             "args": channels
         }
-        self.log(f"WS Sending public subscription request: {json.dumps(subscription_payload)}", level="debug")
-        self.ws.send(json.dumps(subscription_payload))
+        # Serialize once straight to UTF-8 bytes so websocket-client does not re-encode the str
+        payload = orjson.dumps(subscription_payload) if orjson else json.dumps(subscription_payload).encode('utf-8')
+        self.log(f"WS Sending public subscription request: {payload.decode('utf-8')}", level="debug")
+        self.ws.send(payload, opcode=websocket.ABNF.OPCODE_TEXT)
         self.log(f"WS Sent public subscription request for {len(channels)} channels.", level="debug")
         # Populate pending_subscriptions with the channels we just sent
         self.pending_subscriptions = {f"{arg['channel']}:{arg['instId']}" for arg in channels}
 
+    def _switch_ws_symbol(self, old_symbol, new_symbol):
+        """Moves the public and private streams to new_symbol on the open sockets; reconnects only if that fails."""
+        # Drop the old instrument's candles and price first so no entry check runs against the wrong market;
+        # moving subscribed_symbol first keeps in-flight old-symbol ticks from setting the price again
+        self.subscribed_symbol = new_symbol
+        with self.data_lock:
+            self.historical_data_store = {}
+            self._latest_candle_snapshot = {}
+        with self.trade_data_lock:
+            self.latest_trade_price = None
+
+        ws = self.ws
+        try:
+            if ws and ws.sock and ws.sock.connected:
+                ws.send(json_dumps_compact({"op": "unsubscribe", "args": [
+                    {"channel": "trades", "instId": old_symbol},
+                    {"channel": "tickers", "instId": old_symbol},
+                ]}))
+                self.confirmed_subscriptions.clear()
+                self._send_websocket_subscriptions() # Subscribes to self.config['symbol'], already new_symbol
+                # A reconnect re-runs the startup fetch; staying on the socket means reloading the candles here
+                self._load_startup_candles()
+            elif ws:
+                ws.close()
+        except Exception as e:
+            self.log(f"Public WebSocket resubscribe failed ({e}), reconnecting instead.", level="debug")
+            ws.close()
+
+        private_ws = self.private_ws
+        # Not subscribed yet: the login handler subscribes to the current config symbol on its own
+        if not private_ws or not self._orders_ws_ready.is_set():
+            return
+        self._orders_ws_ready.clear()
+        try:
+            private_ws.send(json_dumps_compact({"op": "unsubscribe", "args": [
+                {"channel": "orders", "instType": "SWAP", "instId": old_symbol}
+            ]}))
+            # The subscribe ack re-arms _orders_ws_ready and forces a REST reconcile for the new symbol
+            private_ws.send(json_dumps_compact({"op": "subscribe", "args": [
+                {"channel": "orders", "instType": "SWAP", "instId": new_symbol}
+            ]}))
+        except Exception as e:
+            self.log(f"Private WebSocket resubscribe failed ({e}), reconnecting instead.", level="debug")
+            private_ws.close()
+
     def _on_websocket_error(self, ws_app, error):
         self.log(f"OKX WebSocket error: {error}", level="error")
 
@@ -995,6 +1671,7 @@ class TradingBotEngine:
 
     def connect(self): # This method will be called from start()
         ws_url = self._get_ws_url()
+        self._start_ws_dispatch_thread()
         try:
             self.ws = websocket.WebSocketApp(
                 ws_url,
@@ -1004,113 +1681,283 @@ class TradingBotEngine:
                 on_close=self._on_websocket_close
             )
             self.emit('bot_status', {'running': True})
-            self.ws.run_forever()
+            self.ws.run_forever(**_WS_RUN_OPTS)
         except Exception as e:
             self.log(f"Exception initializing WebSocket: {e}", level="error")
 
+    def _get_private_ws_url(self):
+        if self.config.get('use_testnet'):
+            return "wss://wspap.okx.com:8443/ws/v5/private"
+        return "wss://ws.okx.com:8443/ws/v5/private"
 
-    def _fetch_initial_historical_data(self, symbol, timeframe, start_date_str, end_date_str):
-        with self.data_lock:
-            try:
-                start_dt = datetime.strptime(start_date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                start_ts_ms = int(start_dt.timestamp() * 1000)
-                end_dt = datetime.strptime(end_date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                end_ts_ms = int(end_dt.timestamp() * 1000)
-
-                raw_data = self._fetch_historical_data_okx(symbol, timeframe, start_ts_ms, end_ts_ms)
+    def _start_private_ws(self):
+        if not self.okx_api_key or not self.okx_api_secret or not self.okx_passphrase:
+            return
+        if not self.private_ws_thread or not self.private_ws_thread.is_alive():
+            self.private_ws_thread = threading.Thread(target=self._private_ws_loop, daemon=True)
+            self.private_ws_thread.start()
 
-                if raw_data:
-                    df = pd.DataFrame(raw_data, columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-                    df.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume'], inplace=True)
+    def _private_ws_loop(self):
+        # Reconnects until shutdown; REST polling covers the gaps while the stream is down
+        while not self.stop_event.is_set():
+            try:
+                self.private_ws = websocket.WebSocketApp(
+                    self._get_private_ws_url(),
+                    on_open=self._on_private_ws_open,
+                    on_message=self._on_private_ws_message,
+                    on_error=lambda ws_app, error: self.log(f"OKX private WebSocket error: {error}", level="debug"),
+                    on_close=self._on_private_ws_close
+                )
+                self.private_ws.run_forever(**_WS_RUN_OPTS)
+            except Exception as e:
+                self.log(f"Exception in private WebSocket loop: {e}", level="error")
+            self._orders_ws_ready.clear()
+            self.stop_event.wait(5)
+
+    def _on_private_ws_open(self, ws_app):
+        timestamp = str(int(time.time() + self.server_time_offset / 1000.0))
+        login = {"op": "login", "args": [{
+            "apiKey": self.okx_api_key,
+            "passphrase": self.okx_passphrase,
+            "timestamp": timestamp,
+            "sign": generate_okx_signature(self.okx_api_secret, timestamp, "GET", "/users/self/verify"),
+        }]}
+        ws_app.send(json_dumps_compact(login))
+        # OKX drops connections idle for 30s; the orders channel can be quiet for much longer
+        threading.Thread(target=self._private_ws_keepalive, args=(ws_app,), daemon=True).start()
+
+    def _private_ws_keepalive(self, ws_app):
+        while not self.stop_event.wait(20):
+            if ws_app is not self.private_ws or not ws_app.sock or not ws_app.sock.connected:
+                return
+            try:
+                ws_app.send("ping")
+            except Exception:
+                return
 
-                    if df.empty:
-                        self.log(f"No valid data for {timeframe}", level="error")
-                        return False
+    def _on_private_ws_close(self, ws_app, close_status_code, close_msg):
+        self._orders_ws_ready.clear()
+        self.log(f"OKX private WebSocket closed. Status: {close_status_code}, Msg: {close_msg}", level="debug")
 
-                    invalid_rows = df[(df['Low'] > df['High']) |
-                                    (df['Open'] < df['Low']) | (df['Open'] > df['High']) |
-                                    (df['Close'] < df['Low']) | (df['Close'] > df['High'])]
+    def _on_private_ws_message(self, ws_app, message):
+        if message == "pong":
+            return
+        try:
+            msg = json_loads(message)
+            event = msg.get('event')
+            if event == 'login':
+                if msg.get('code') == '0':
+                    ws_app.send(json_dumps_compact({"op": "subscribe", "args": [
+                        {"channel": "orders", "instType": "SWAP", "instId": self.config['symbol']}
+                    ]}))
+                else:
+                    self.log(f"Private WebSocket login failed: {msg.get('msg')}", level="warning")
+                return
+            if event == 'subscribe':
+                # The channel sends no snapshot: force one REST reconcile to seed the local book
+                self._last_rest_orders_sync = float('-inf')
+                self._orders_ws_ready.set()
+                self.log("Subscribed to private orders channel.", level="debug")
+                return
+            if event == 'error':
+                self.log(f"Private WebSocket error event: {msg.get('msg')}", level="warning")
+                return
+            if msg.get('arg', {}).get('channel') == 'orders' and msg.get('data'):
+                self._process_orders_push(msg['data'])
+        except Exception as e:
+            self.log(f"Exception in private WebSocket message: {e}", level="error")
 
-                    if not invalid_rows.empty:
-                        self.log(f"WARNING: Found {len(invalid_rows)} invalid OHLC rows", level="warning")
-                        df = df[(df['Low'] <= df['High'])]
+    def _merge_rest_open_orders(self, rest_orders, fetch_ms):
+        """
+        Merges a REST orders-pending snapshot into the pushed order book by ordId (caller holds _ws_orders_lock).
+        The snapshot may be older than pushes that arrived while it was in flight, so for each order the copy
+        with the newer uTime wins, orders closed by a newer push stay closed, and book entries missing from the
+        snapshot are kept only if they were updated after the fetch started. Returns the merged orders.
+        """
+        book = self._ws_open_orders
+        closed = self._ws_closed_orders
+        merged = {}
+        for order in rest_orders:
+            if order.get('reduceOnly') == 'true':
+                continue
+            ord_id = order.get('ordId')
+            u_time = safe_int(order.get('uTime'))
+            if closed.get(ord_id, -1) >= u_time:
+                continue
+            current = book.get(ord_id)
+            merged[ord_id] = current if current is not None and safe_int(current.get('uTime')) > u_time else order
+        for ord_id, order in book.items():
+            if ord_id not in merged and ord_id not in closed and safe_int(order.get('uTime')) > fetch_ms:
+                merged[ord_id] = order
+        # Tombstones only matter while a snapshot can still list the order
+        listed = {order.get('ordId') for order in rest_orders}
+        self._ws_closed_orders = {ord_id: u for ord_id, u in closed.items() if ord_id in listed}
+        self._ws_open_orders = merged
+        return list(merged.values())
+
+    def _process_orders_push(self, data):
+        """Applies an orders-channel push to the local book and to pending-entry tracking."""
+        symbol = self.config['symbol']
+        contract_size = self._pi_contract_size
+        terminal = []
+        with self._ws_orders_lock:
+            for order in data:
+                if order.get('instId') != symbol or order.get('reduceOnly') == 'true':
+                    continue
+                ord_id = order.get('ordId')
+                if order.get('state') in ('live', 'partially_filled'):
+                    self._ws_open_orders[ord_id] = order
+                else:
+                    self._ws_open_orders.pop(ord_id, None)
+                    self._ws_closed_orders[ord_id] = safe_int(order.get('uTime'))
+                    if order.get('state') in ('canceled', 'mmp_canceled', 'failed'):
+                        terminal.append(ord_id)
+        for order in data:
+            if order.get('state') == 'live' and order.get('reduceOnly') != 'true' and order.get('instId') == symbol:
+                self._adopt_pending_order(order, contract_size)
+        # Filled entries leave the book and are pruned by the next account sync, exactly as with the REST poll
+        if terminal:
+            self._drop_pending_entries(terminal)
+
+
+    def _load_startup_candles(self):
+        # Fetch historical data for the selected timeframe - Fetch 300 candles for indicator safety
+        timeframe = self.config.get('candlestick_timeframe', '1m')
+        interval_sec = self.intervals.get(timeframe, 60)
+        start_dt = datetime.now(timezone.utc) - timedelta(seconds=interval_sec * 300)
+        end_dt = datetime.now(timezone.utc)
+        return self._fetch_initial_historical_data(self.config['symbol'], timeframe, start_dt.strftime('%Y-%m-%d'), end_dt.strftime('%Y-%m-%d'))
 
-                    df['Datetime'] = pd.to_datetime(df['Timestamp'], unit='ms', utc=True)
-                    df = df.set_index('Datetime')
-                    df = df[~df.index.duplicated(keep='first')]
-                    df = df.sort_index()
+    def _fetch_initial_historical_data(self, symbol, timeframe, start_date_str, end_date_str):
+        try:
+            start_dt = parse_dt(start_date_str)
+            start_ts_ms = int(start_dt.timestamp() * 1000)
+            end_dt = parse_dt(end_date_str)
+            end_ts_ms = int(end_dt.timestamp() * 1000)
+
+            raw_data = self._fetch_historical_data_okx(symbol, timeframe, start_ts_ms, end_ts_ms)
+
+            if raw_data:
+                # Fill typed columns directly to skip per-column dtype inference on a list-of-lists
+                n = len(raw_data)
+                ts = np.empty(n, dtype=np.int64)
+                ohlcv = np.empty((n, 5), dtype=np.float64)
+                for i, row in enumerate(raw_data):
+                    ts[i] = int(row[0])
+                    ohlcv[i] = row[1:6]
+                df = pd.DataFrame({
+                    'Timestamp': ts,
+                    'Open': ohlcv[:, 0],
+                    'High': ohlcv[:, 1],
+                    'Low': ohlcv[:, 2],
+                    'Close': ohlcv[:, 3],
+                    'Volume': ohlcv[:, 4],
+                }, copy=False)
+                df.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume'], inplace=True)
+
+                if df.empty:
+                    self.log(f"No valid data for {timeframe}", level="error")
+                    return False
 
+                # Validate on the raw ndarray to skip per-Series pandas comparison overhead
+                o, h, l, c = df[['Open', 'High', 'Low', 'Close']].to_numpy(copy=False).T
+                high_low_bad = l > h
+                n_invalid = int((high_low_bad | (o < l) | (o > h) | (c < l) | (c > h)).sum())
+
+                if n_invalid:
+                    self.log(f"WARNING: Found {n_invalid} invalid OHLC rows", level="warning")
+                    df = df.iloc[~high_low_bad]
+
+                # Single stable sort + first-occurrence dedup on the int64 ms column, then build the index once
+                ts = df['Timestamp'].to_numpy(dtype='int64')
+                order = np.argsort(ts, kind='stable')
+                _, first = np.unique(ts[order], return_index=True)
+                keep = order[first]
+                df = df.take(keep)
+                df.index = pd.DatetimeIndex(ts[keep].astype('datetime64[ms]').astype('datetime64[ns]'), tz='UTC', name='Datetime')
+
+                # Network fetch and frame construction happen outside the lock; only publish under it
+                with self.data_lock:
                     self.historical_data_store[timeframe] = df
+                    if not df.empty:
+                        last = df.iloc[-1]
+                        self._latest_candle_snapshot[timeframe] = (float(last['Open']), float(last['High']), float(last['Low']), float(last['Close']))
 
-                    self.log(f"Loaded {len(df)} candles for {timeframe}", level="debug")
-                    return True
-                else:
-                    self.log(f"Failed to fetch data for {timeframe}", level="error")
-                    return False
-            except Exception as e:
-                self.log(f"Exception in _fetch_initial_historical_data: {e}", level="error")
+                self.log(f"Loaded {len(df)} candles for {timeframe}", level="debug")
+                return True
+            else:
+                self.log(f"Failed to fetch data for {timeframe}", level="error")
                 return False
+        except Exception as e:
+            self.log(f"Exception in _fetch_initial_historical_data: {e}", level="error")
+            return False
 
-    def _okx_place_order(self, symbol, side, qty, price=None, order_type="Market",
-                        time_in_force=None, reduce_only=False,
-                        stop_loss_price=None, take_profit_price=None, posSide=None, verbose=True, tdMode=None):
-        try:
-            path = "/api/v5/trade/order"
-            price_precision = self.product_info.get('pricePrecision', 4)
-            qty_precision = self.product_info.get('qtyPrecision', 8)
+    def _build_order_body(self, symbol, side, qty, price=None, order_type="Market",
+                          time_in_force=None, reduce_only=False,
+                          stop_loss_price=None, take_profit_price=None, posSide=None, tdMode=None, clOrdId=None):
+        """Builds a /trade/order request body (shared by single and batch placement)."""
+        order_qty_str = self._qty_fmt(qty)
 
-            order_qty_str = f"{qty:.{qty_precision}f}"
-            
-            # Use provided tdMode or default to config
-            trade_mode = tdMode if tdMode else self.config.get('mode', 'cross')
+        # Use provided tdMode or default to config
+        trade_mode = tdMode if tdMode else self.config.get('mode', 'cross')
 
-            body = {
-                "instId": symbol,
-                "tdMode": trade_mode,
-                "side": side.lower(),
-                "ordType": order_type.lower(),
-                "sz": order_qty_str,
-            }
+        template = self._order_body_template
+        if template.get("instId") == symbol and template.get("tdMode") == trade_mode:
+            body = template.copy()
+        else:
+            body = {"instId": symbol, "tdMode": trade_mode}
+        body["side"] = side.lower()
+        body["ordType"] = order_type.lower()
+        body["sz"] = order_qty_str
 
-            if (self.config.get('hedge_mode', False) or self.config.get('okx_pos_mode') == 'long_short_mode') and posSide:
-                body["posSide"] = posSide
+        if (self.config.get('hedge_mode', False) or self.config.get('okx_pos_mode') == 'long_short_mode') and posSide:
+            body["posSide"] = posSide
 
-            if order_type.lower() == "limit" and price is not None:
-                body["px"] = f"{price:.{price_precision}f}"
+        if order_type.lower() == "limit" and price is not None:
+            body["px"] = self._px_fmt(price)
 
-            if time_in_force:
-                if time_in_force == "GoodTillCancel":
-                    body["timeInForce"] = "GTC"
-                else:
-                    body["timeInForce"] = time_in_force
+        if time_in_force:
+            if time_in_force == "GoodTillCancel":
+                body["timeInForce"] = "GTC"
+            else:
+                body["timeInForce"] = time_in_force
 
-            if reduce_only:
-                body["reduceOnly"] = True
+        if reduce_only:
+            body["reduceOnly"] = True
 
-            # Attach TP/SL via attachAlgoOrds (Correct V5 Structure)
-            attach_algo_list = []
+        if clOrdId:
+            body["clOrdId"] = clOrdId
+
+        # Attach TP/SL via attachAlgoOrds (Correct V5 Structure)
+        has_tp = bool(take_profit_price) and safe_float(take_profit_price) > 0
+        has_sl = bool(stop_loss_price) and safe_float(stop_loss_price) > 0
+
+        if has_tp or has_sl:
             algo_details = {}
-            has_algo = False
-            
             # Ensure posSide is passed to algo if present in parent order (Critical for Long/Short mode)
             if "posSide" in body:
                 algo_details["posSide"] = body["posSide"]
-
-            if take_profit_price and safe_float(take_profit_price) > 0:
+            if has_tp:
+                algo_details.update(self._TP_ALGO_STATIC) # Market TP
                 algo_details["tpTriggerPx"] = str(take_profit_price)
-                algo_details["tpOrdPx"] = "-1" # Market TP
-                algo_details["tpTriggerPxType"] = "last"
-                has_algo = True
-
-            if stop_loss_price and safe_float(stop_loss_price) > 0:
+            if has_sl:
+                algo_details.update(self._SL_ALGO_STATIC) # Market SL
                 algo_details["slTriggerPx"] = str(stop_loss_price)
-                algo_details["slOrdPx"] = "-1" # Market SL
-                algo_details["slTriggerPxType"] = "last"
-                has_algo = True
-                
-            if has_algo:
-                attach_algo_list.append(algo_details)
-                body["attachAlgoOrds"] = attach_algo_list
+            body["attachAlgoOrds"] = [algo_details]
+
+        return body
+
+    def _okx_place_order(self, symbol, side, qty, price=None, order_type="Market",
+                        time_in_force=None, reduce_only=False,
+                        stop_loss_price=None, take_profit_price=None, posSide=None, verbose=True, tdMode=None,
+                        clOrdId=None):
+        try:
+            path = "/api/v5/trade/order"
+            body = self._build_order_body(symbol, side, qty, price=price, order_type=order_type,
+                                          time_in_force=time_in_force, reduce_only=reduce_only,
+                                          stop_loss_price=stop_loss_price, take_profit_price=take_profit_price,
+                                          posSide=posSide, tdMode=tdMode, clOrdId=clOrdId)
+            order_qty_str = body["sz"]
 
             self.log(f"DEBUG: Order placement request body: {body}", level="debug")
             if verbose:
@@ -1121,17 +1968,13 @@ class TradingBotEngine:
             if response and response.get('code') == '0':
                 order_data = response.get('data', [])
                 if order_data and order_data[0].get('ordId'):
+                    # Positions may change with this order; never size a close from a pre-order read
+                    self._invalidate_positions_cache()
                     if verbose:
                         self.log(f"[OK] Order placed: OrderID={order_data[0]['ordId']}", level="info")
                     
                     # Trigger immediate account refresh for UI responsiveness
-                    def _update_after_reconnect():
-                        try:
-                            self._sync_account_data()
-                            self._emit_socket_updates()
-                        except Exception as e:
-                            self.log(f"Error in reconnect update: {e}", level="error")
-                    threading.Thread(target=_update_after_reconnect, daemon=True).start()
+                    self._request_account_refresh()
                     return order_data[0]
                 else:
                     self.log(f"[FAIL] Order placement failed: No order ID in response. Response: {response}", level="error")
@@ -1144,12 +1987,134 @@ class TradingBotEngine:
             self.log(f"Exception in _okx_place_order: {e}", level="error")
             return None
 
+    def _new_clordid(self, tag):
+        """Fresh client order id for one placement; reuse it for every retry of that placement."""
+        return f"{tag}{self._clordid_token}{next(self._clordid_seq)}"
+
+    def _okx_find_order_by_clordid(self, symbol, cl_ord_id):
+        """Looks up an order by clOrdId. Returns its data dict, False if OKX has no such order, None if unknown."""
+        response = self._okx_request("GET", "/api/v5/trade/order", params={"instId": symbol, "clOrdId": cl_ord_id})
+        if not response:
+            return None
+        data = response.get('data', [])
+        if response.get('code') == '0' and data and data[0].get('ordId'):
+            return data[0]
+        if response.get('code') == '51603': # Order does not exist
+            return False
+        return None
+
+    def _okx_place_batch_orders(self, symbol, orders_list):
+        """
+        Places orders via /trade/batch-orders (20 per request). Each item of orders_list holds
+        _build_order_body keyword args, including a clOrdId. Returns (results, retry_indices): results is
+        aligned with orders_list (order data dict or None); retry_indices lists the items that are known not
+        to exist on OKX and whose failure can succeed on retry. Items of a chunk that got no response are
+        reconciled by clOrdId instead of being assumed lost, since OKX may have accepted the request.
+        """
+        path = "/api/v5/trade/batch-orders"
+        results = [None] * len(orders_list)
+        retry_indices = []
+        for i in range(0, len(orders_list), 20):
+            chunk = orders_list[i:i + 20]
+            try:
+                bodies = [self._build_order_body(symbol, **order) for order in chunk]
+                self.log(f"DEBUG: Batch order request body: {bodies}", level="debug")
+                response = self._okx_request("POST", path, body_dict=bodies)
+                if not response:
+                    self.log("Batch order placement got no response, reconciling by clOrdId...", level="warning")
+                    for j, order in enumerate(chunk):
+                        found = self._okx_find_order_by_clordid(symbol, order['clOrdId'])
+                        if found:
+                            results[i + j] = found
+                        elif found is False:
+                            retry_indices.append(i + j)
+                        else:
+                            self.log(f"[FAIL] Batch order {i + j + 1} state unknown; not re-placing", level="error")
+                    continue
+                # Per-item sCode is returned even when the top-level code is a partial failure ('2')
+                for j, item in enumerate(response.get('data', [])[:len(chunk)]):
+                    if item.get('sCode') == '0' and item.get('ordId'):
+                        results[i + j] = item
+                    elif item.get('sCode') == '51016':
+                        # Duplicated clOrdId: an earlier attempt of this same request (transport retry) landed
+                        results[i + j] = self._okx_find_order_by_clordid(symbol, chunk[j]['clOrdId']) or None
+                    else:
+                        self.log(f"[FAIL] Batch order {i + j + 1} rejected: {item.get('sMsg')}", level="warning")
+                        if item.get('sCode') in self.RETRYABLE_SCODES:
+                            retry_indices.append(i + j)
+            except Exception as e:
+                self.log(f"Exception in _okx_place_batch_orders: {e}", level="error")
+
+        if any(results):
+            self._invalidate_positions_cache()
+            self._request_account_refresh()
+        return results, retry_indices
+
+    def _okx_close_position(self, symbol, pos_side, mgn_mode=None):
+        """Market-closes one position leg via /trade/close-position. Returns True on success."""
+        try:
+            path = "/api/v5/trade/close-position"
+            body = {
+                "instId": symbol,
+                "posSide": pos_side or 'net',
+                # Use the position's own margin mode so we address the correct margin account
+                "mgnMode": mgn_mode or self.config.get('mode', 'cross'),
+                # OKX rejects close-position while close orders for the leg are pending; have it cancel them
+                # itself rather than racing the concurrent batch_cancel_orders sweep
+                "autoCxl": True,
+            }
+            response = self._okx_request("POST", path, body_dict=body)
+            if response and response.get('code') == '0':
+                self._invalidate_positions_cache()
+                return True
+            self.log(f"Close position failed ({pos_side}): {response.get('msg') if response else 'No response'}", level="warning")
+            return False
+        except Exception as e:
+            self.log(f"Exception in _okx_close_position: {e}", level="error")
+            return False
+
+    def _okx_find_algo_by_clordid(self, algo_cl_ord_id):
+        """Looks up an algo order by algoClOrdId. Returns its data dict, or None if it can't be found."""
+        response = self._okx_request("GET", "/api/v5/trade/order-algo", params={"algoClOrdId": algo_cl_ord_id})
+        data = response.get('data', []) if response else []
+        if response and response.get('code') == '0' and data and data[0].get('algoId'):
+            return data[0]
+        return None
+
+    def _algo_body_template(self, symbol, td_mode, pos_side, side, trig_px_type, kind):
+        """Constant fields of a market TP ('tp') or SL ('sl') conditional algo body, built once per combination."""
+        key = (symbol, td_mode, pos_side, side, trig_px_type, kind)
+        base = self._algo_template_cache.get(key)
+        if base is None:
+            base = MappingProxyType({
+                "instId": symbol,
+                "tdMode": td_mode,
+                "side": side,
+                "posSide": pos_side,
+                "ordType": "conditional",
+                kind + "TriggerPxType": trig_px_type,
+                kind + "OrdPx": "-1",
+                "reduceOnly": "true"
+            })
+            self._algo_template_cache[key] = base
+        return base
+
     def _okx_place_algo_order(self, body, verbose=True):
         try:
             path = "/api/v5/trade/order-algo"
             if verbose:
                 self.log(f"Placing algo order", level="info")
+            # The body (and its algoClOrdId) is reused across _okx_request's retries, so a POST that OKX
+            # accepted but whose reply was lost surfaces as a duplicate id and is resolved by lookup below
             response = self._okx_request("POST", path, body_dict=body)
+            algo_cl_ord_id = body.get('algoClOrdId')
+            s_code = ((response or {}).get('data') or [{}])[0].get('sCode')
+            if algo_cl_ord_id and (not response or s_code in ('51016', '51065')): # No reply / algoClOrdId already exists
+                existing = self._okx_find_algo_by_clordid(algo_cl_ord_id)
+                if existing:
+                    if verbose:
+                        self.log(f"[OK] Algo order {algo_cl_ord_id} already live ({existing.get('algoId')})", level="info")
+                    return existing
             if response and response.get('code') == '0':
                 data = response.get('data', [])
                 if data and (data[0].get('algoId') or data[0].get('ordId')):
@@ -1166,6 +2131,15 @@ class TradingBotEngine:
             self.log(f"Exception in _okx_place_algo_order: {e}", level="debug")
             return None
 
+    def _okx_batch_place_algo_order(self, bodies, verbose=True):
+        """Places several algo orders concurrently. Returns results in the same order as bodies."""
+        if not bodies:
+            return []
+        if len(bodies) == 1:
+            return [self._okx_place_algo_order(bodies[0], verbose=verbose)]
+        with ThreadPoolExecutor(max_workers=len(bodies)) as executor:
+            return list(executor.map(lambda body: self._okx_place_algo_order(body, verbose=verbose), bodies))
+
     def _okx_cancel_order(self, symbol, order_id, reason=None):
         try:
             path = "/api/v5/trade/cancel-order"
@@ -1218,6 +2192,58 @@ class TradingBotEngine:
             self.log(f"Exception in _okx_cancel_algo_order: {e}", level="error")
             return False
 
+    def _okx_cancel_algo_orders_batch(self, symbol, algo_ids):
+        """Cancels algo orders via /cancel-algos in chunks of 10. Returns the number cancelled."""
+        path = "/api/v5/trade/cancel-algos"
+        cancelled_count = 0
+        for i in range(0, len(algo_ids), 10):
+            chunk = [{"instId": symbol, "algoId": aid} for aid in algo_ids[i:i + 10]]
+            try:
+                self.log(f"Batch cancelling {len(chunk)} OKX algo orders...", level="debug")
+                response = self._okx_request("POST", path, body_dict=chunk)
+                if not response:
+                    self.log("Failed to batch cancel algo orders (OK, continuing): No response", level="debug")
+                    continue
+                for item in response.get('data', []):
+                    s_code = item.get('sCode')
+                    if s_code == '0':
+                        cancelled_count += 1
+                    elif s_code == '51001':
+                        self.log(f"Algo order {str(item.get('algoId'))[:12]} already filled/cancelled (OK)", level="debug")
+                    else:
+                        self.log(f"Failed to cancel algo order {str(item.get('algoId'))[:12]} (OK, continuing): {item.get('sMsg')}", level="debug")
+            except Exception as e:
+                self.log(f"Exception in _okx_cancel_algo_orders_batch: {e}", level="debug")
+        return cancelled_count
+
+    def _okx_cancel_batch_orders(self, symbol, order_ids, reason=None):
+        """Cancels orders via /cancel-batch-orders in chunks of 20. Returns the number cancelled."""
+        path = "/api/v5/trade/cancel-batch-orders"
+        cancelled_count = 0
+        for i in range(0, len(order_ids), 20):
+            chunk = [{"instId": symbol, "ordId": oid} for oid in order_ids[i:i + 20]]
+            try:
+                log_msg = f"Batch cancelling {len(chunk)} OKX orders..."
+                if reason:
+                    log_msg = f"Batch cancelling {len(chunk)} OKX orders ({reason})..."
+                self.log(log_msg, level="info")
+                response = self._okx_request("POST", path, body_dict=chunk)
+                if not response:
+                    self.log("Failed to batch cancel orders (OK, continuing): No response", level="debug")
+                    continue
+                # Per-item codes are returned even when the top-level code is a partial failure ('2')
+                for item in response.get('data', []):
+                    s_code = item.get('sCode')
+                    if s_code == '0':
+                        cancelled_count += 1
+                    elif s_code == '51001':
+                        self.log(f"Order {str(item.get('ordId'))[:12]} already filled/cancelled (OK)", level="debug")
+                    else:
+                        self.log(f"Failed to cancel order {str(item.get('ordId'))[:12]} (OK, continuing): {item.get('sMsg')}", level="debug")
+            except Exception as e:
+                self.log(f"Exception in _okx_cancel_batch_orders: {e}", level="debug")
+        return cancelled_count
+
     def _close_all_entry_orders(self):
         try:
             self.log("Attempting to close unfilled linear entry orders...", level="info")
@@ -1226,24 +2252,18 @@ class TradingBotEngine:
             params = {"instType": "SWAP", "instId": self.config['symbol']}
             response = self._okx_request("GET", path, params=params)
 
-            if not response or response.get('code') == '0':
+            if not response or response.get('code') != '0':
                 self.log("No orders found or API error (OK if no orders)", level="info")
                 return True
 
             orders = response.get('data', [])
-            cancelled_count = 0
+            order_ids = [order.get('ordId') for order in orders
+                         if order.get('side') == 'buy' and order.get('ordId')
+                         and order.get('state') not in ('filled', 'canceled', 'rejected')]
 
-            for order in orders:
-                try:
-                    order_id = order.get('ordId')
-                    status = order.get('state')
-                    side = order.get('side')
-                    if side == 'buy' and status not in ['filled', 'canceled', 'rejected']:
-                        if self._okx_cancel_order(self.config['symbol'], order_id):
-                            cancelled_count += 1
-                            time.sleep(0.1)
-                except Exception as e:
-                    self.log(f"Error processing OKX order: {e}", level="error")
+            cancelled_count = 0
+            if order_ids:
+                cancelled_count = self._okx_cancel_batch_orders(self.config['symbol'], order_ids)
 
             if cancelled_count > 0:
                 self.log(f"[OK] Closed {cancelled_count} unfilled linear entry orders", level="info")
@@ -1293,7 +2313,7 @@ class TradingBotEngine:
                 time.sleep(3)
 
                 self.log(f"Step 4: Market closing remaining {side.upper()} position...", level="info")
-                close_side = "Sell" if side == 'long' else "Buy"
+                close_side = _SIDE_TABLE[side]['close']
                 exit_order_response = self._okx_place_order(self.config['symbol'], close_side, open_qty, order_type="Market", reduce_only=True, posSide=side)
 
                 if exit_order_response and exit_order_response.get('ordId'):
@@ -1380,6 +2400,28 @@ class TradingBotEngine:
             self.log(f"Exception in _handle_eod_exit (OKX): {e} (continuing)", level="error")
             self._cancel_all_exit_orders_and_reset("EOD Exit - forced")
 
+    def _publish_pos_snapshot(self):
+        """Rebuilds the immutable per-side position snapshot; runs with position_lock held for writing."""
+        snap = {}
+        for s in ('long', 'short'):
+            details = self.position_details.get(s) or {}
+            exits = self.position_exit_orders.get(s) or {}
+            snap[s] = MappingProxyType({
+                'in_position': self.in_position[s],
+                'entry_price': self.position_entry_price[s],
+                'qty': self.position_qty[s],
+                'take_profit': self.current_take_profit[s],
+                'stop_loss': self.current_stop_loss[s],
+                'sl_id': exits.get('sl'),
+                'tp_id': exits.get('tp'),
+                'notional': abs(safe_float(details.get('notionalUsd', 0))),
+                'lever': safe_float(details.get('lever', 1.0), 1.0),
+                'liq': self.position_liq[s],
+                'mgn_mode': details.get('mgnMode', 'cross'),
+                'pos_side': details.get('posSide', 'net'),
+            })
+        self._pos_snapshot = MappingProxyType(snap)
+
     def _handle_order_update(self, orders_data):
         with self.position_lock:
             current_pending_id = self.pending_entry_order_id
@@ -1391,10 +2433,10 @@ class TradingBotEngine:
         with self.position_lock:
              # Snapshot current states for directional mapping 
              active_exit_ids = {
-                 'long': self.position_exit_orders.get('long', {}),
-                 'short': self.position_exit_orders.get('short', {})
+                 'long': dict(self.position_exit_orders.get('long', {})),
+                 'short': dict(self.position_exit_orders.get('short', {}))
              }
-             pending_entry_ids = list(self.pending_entry_ids)
+        pending_entry_ids = self.pending_entry_ids # Immutable snapshot (published copy-on-write)
              
         for order in orders_data:
             if not isinstance(order, dict): continue
@@ -1419,23 +2461,25 @@ class TradingBotEngine:
                 with self.sl_hit_lock:
                     if not self.sl_hit_triggered:
                         self.sl_hit_triggered = True
-                        threading.Timer(0.1, lambda s=side_key: self._handle_sl_hit(side=s)).start()
+                        self._submit_post_trade(self._handle_sl_hit, side=side_key, delay=0.1)
                 return
 
             # 2. ENTRY FILLED
             if order_id in pending_entry_ids:
                 cum_qty = safe_float(order.get('accFillSz', 0))
-                with self.position_lock:
-                    if order_id in self.pending_entry_order_details:
-                        self.pending_entry_order_details[order_id]['status'] = status
-                        self.pending_entry_order_details[order_id]['cum_qty'] = cum_qty
+                with self.pending_lock:
+                    current = self.pending_entry_order_details.get(order_id)
+                    if current is not None:
+                        details = dict(self.pending_entry_order_details)
+                        details[order_id] = {**current, 'status': status, 'cum_qty': cum_qty}
+                        self.pending_entry_order_details = details
 
                 if status in ['filled', 'partially_filled'] or cum_qty > 0:
                     self.log(f"🎉 ENTRY FILLED [{side_key.upper()}]: {cum_qty} {self.config['symbol']}", level="info")
                     if status == 'filled':
-                        threading.Timer(2.0, lambda oid=order_id: self._confirm_and_set_active_position(oid)).start()
+                        self._submit_post_trade(self._confirm_and_set_active_position, order_id, delay=2.0)
                     else:
-                        threading.Timer(5.0, lambda oid=order_id: self._confirm_and_set_active_position(oid)).start()
+                        self._submit_post_trade(self._confirm_and_set_active_position, order_id, delay=5.0)
                     return
                 elif status in ['canceled', 'failed']:
                     self._reset_entry_state(f"Entry order {status}")
@@ -1446,7 +2490,7 @@ class TradingBotEngine:
                 with self.tp_hit_lock:
                     if not self.tp_hit_triggered:
                         self.tp_hit_triggered = True
-                        threading.Timer(0.1, lambda s=side_key: self._handle_tp_hit(side=s)).start()
+                        self._submit_post_trade(self._handle_tp_hit, side=side_key, delay=0.1)
                 return
 
     def _detect_sl_from_position_update(self, positions_msg):
@@ -1462,16 +2506,16 @@ class TradingBotEngine:
 
                 size_rv = safe_float(pos.get('pos', 0))
                 
-                with self.position_lock:
-                    was_in = self.in_position[side_key]
-                    exp_qty = self.position_qty[side_key]
+                side_snap = self._pos_snapshot[side_key]
+                was_in = side_snap['in_position']
+                exp_qty = side_snap['qty']
 
                 if was_in and size_rv == 0 and abs(exp_qty) > 0:
                     self.log(f"🛑 SL DETECTED [{side_key.upper()}] via WebSocket Position Update!", level="info")
                     with self.sl_hit_lock:
                         if not self.sl_hit_triggered:
                             self.sl_hit_triggered = True
-                            threading.Timer(0.1, lambda s=side_key: self._handle_sl_hit(side=s)).start()
+                            self._submit_post_trade(self._handle_sl_hit, side=side_key, delay=0.1)
 
 
     def _handle_sl_hit(self, side='long'):
@@ -1496,13 +2540,7 @@ class TradingBotEngine:
             self._cancel_all_exit_orders_and_reset(f"SL hit - {side} closed by exchange", side=side)
             
             # Trigger immediate account refresh for UI responsiveness
-            def _update_after_init():
-                try:
-                    self._sync_account_data()
-                    self._emit_socket_updates()
-                except Exception as e:
-                    self.log(f"Error in init update: {e}", level="error")
-            threading.Thread(target=_update_after_init, daemon=True).start()
+            self._request_account_refresh()
 
             with self.sl_hit_lock:
                 self.sl_hit_triggered = False
@@ -1517,6 +2555,12 @@ class TradingBotEngine:
         try:
             self.log(f"Confirming OKX position for filled order ID: {filled_order_id}", level="debug")
 
+            # Snapshot config/product values once for this call
+            tp_off_f = self._c_tp_price_offset
+            sl_off_f = self._c_sl_price_offset
+            qty_fmt = self._qty_fmt
+            px_fmt = self._px_fmt
+
             path = "/api/v5/account/positions"
             params = {"instType": "SWAP", "instId": self.config['symbol']}
             response = self._okx_request("GET", path, params=params)
@@ -1556,33 +2600,15 @@ class TradingBotEngine:
                 return
 
 
-            tp_price = 0.0
-            sl_price = 0.0
-            tp_off = self.config.get('tp_price_offset', 0)
-            sl_off = self.config.get('sl_price_offset', 0)
-
-            if actual_side == 'long':
-                if tp_off and safe_float(tp_off) > 0:
-                    tp_price = actual_entry_price + safe_float(tp_off)
-                else:
-                    self.log(f"Confirm Pos: TP offset is null or 0 for {actual_side.upper()}. Skipping TP calc.", level="info")
-
-                if sl_off and safe_float(sl_off) > 0:
-                    sl_price = actual_entry_price - safe_float(sl_off)
-                else:
-                    self.log(f"Confirm Pos: SL offset is null or 0 for {actual_side.upper()}. Skipping SL calc.", level="info")
-                exit_order_side = "sell"
-            else: # short
-                if tp_off and safe_float(tp_off) > 0:
-                    tp_price = actual_entry_price - safe_float(tp_off)
-                else:
-                    self.log(f"Confirm Pos: TP offset is null or 0 for {actual_side.upper()}. Skipping TP calc.", level="info")
-
-                if sl_off and safe_float(sl_off) > 0:
-                    sl_price = actual_entry_price + safe_float(sl_off)
-                else:
-                    self.log(f"Confirm Pos: SL offset is null or 0 for {actual_side.upper()}. Skipping SL calc.", level="info")
-                exit_order_side = "buy"
+            side_info = _SIDE_TABLE[actual_side]
+            sign = side_info['sign']
+            exit_order_side = side_info['exit']
+            tp_price = actual_entry_price + sign * tp_off_f if tp_off_f > 0 else 0.0
+            sl_price = actual_entry_price - sign * sl_off_f if sl_off_f > 0 else 0.0
+            if tp_off_f <= 0:
+                self.log(f"Confirm Pos: TP offset is null or 0 for {actual_side.upper()}. Skipping TP calc.", level="info")
+            if sl_off_f <= 0:
+                self.log(f"Confirm Pos: SL offset is null or 0 for {actual_side.upper()}. Skipping SL calc.", level="info")
             
             with self.position_lock:
                 self.in_position[actual_side] = True
@@ -1590,8 +2616,7 @@ class TradingBotEngine:
                 self.position_qty[actual_side] = actual_qty
                 self.current_take_profit[actual_side] = tp_price
                 self.current_stop_loss[actual_side] = sl_price
-                self.pending_entry_order_id = None
-                self.position_exit_orders[actual_side] = {}
+                self.position_exit_orders[actual_side].clear()
 
                 # Emit position update for this side
                 self.emit('position_update', {
@@ -1602,6 +2627,8 @@ class TradingBotEngine:
                     'current_stop_loss': self.current_stop_loss[actual_side],
                     'side': actual_side 
                 })
+            with self.pending_lock:
+                self.pending_entry_order_id = None
 
             self.log(f"OKX {actual_side.upper()} POSITION OPENED", level="info")
             self.log(f"Entry: ${actual_entry_price:.2f} | Qty: {actual_qty}", level="info")
@@ -1610,95 +2637,101 @@ class TradingBotEngine:
             # Check for existing TP/SL orders (Atomic Fallback Check)
             existing_tp = False
             existing_sl = False
+            existing_tp_id = None
+            existing_sl_id = None
             try:
                 algo_path = "/api/v5/trade/orders-algo-pending"
                 algo_params = {"instId": self.config['symbol'], "ordType": "conditional"}
                 algo_res = self._okx_request("GET", algo_path, params=algo_params)
                 if algo_res and algo_res.get('code') == '0':
+                    close_side = 'sell' if actual_side == 'long' else 'buy'
                     for ord in algo_res.get('data', []):
                          # Check if order is for this position side (Long/Short)
-                         # OKX 'posSide' in algo order details usually matches 'long'/'short' or 'net'
                          # We check direction: Long Pos -> Sell Order, Short Pos -> Buy Order
-                         if actual_side == 'long' and ord['side'] == 'sell':
-                             if ord.get('slTriggerPx') and safe_float(ord['slTriggerPx']) > 0: existing_sl = True
-                             if ord.get('tpTriggerPx') and safe_float(ord['tpTriggerPx']) > 0: existing_tp = True
-                         elif actual_side == 'short' and ord['side'] == 'buy':
-                             if ord.get('slTriggerPx') and safe_float(ord['slTriggerPx']) > 0: existing_sl = True
-                             if ord.get('tpTriggerPx') and safe_float(ord['tpTriggerPx']) > 0: existing_tp = True
+                         if ord.get('side') != close_side:
+                             continue
+                         if ord.get('slTriggerPx') and safe_float(ord['slTriggerPx']) > 0:
+                             existing_sl = True
+                             existing_sl_id = ord.get('algoId')
+                         if ord.get('tpTriggerPx') and safe_float(ord['tpTriggerPx']) > 0:
+                             existing_tp = True
+                             existing_tp_id = ord.get('algoId')
                 
                 self.log(f"Atomic TP/SL Check: TP={'Found' if existing_tp else 'Missing'}, SL={'Found' if existing_sl else 'Missing'}", level="debug")
 
             except Exception as e:
                  self.log(f"Failed to check existing algo orders: {e}", level="warning")
 
-            price_precision = self.product_info.get('pricePrecision', 4)
-            qty_precision = self.product_info.get('qtyPrecision', 8)
-
             # Place TP and SL as algo (conditional) orders via /api/v5/trade/order-algo
             # ONLY IF MISSING (Smart Fallback) and IF OFFSET IS CONFIGURED
+            algo_requests = [] # [(kind, body)]
             if not existing_tp:
-                if tp_off and safe_float(tp_off) > 0:
-                    tp_body = {
+                if tp_off_f > 0:
+                    tp_sz = qty_fmt(abs(actual_qty) * self._tp_amount_frac)
+                    tp_px = px_fmt(tp_price)
+                    algo_requests.append(('tp', {
                         "instId": self.config['symbol'],
                         "tdMode": self.config.get('mode', 'cross'),
                         "side": exit_order_side,
                         "posSide": actual_side, 
                         "ordType": "conditional",
-                        "sz": f"{(abs(actual_qty) * (self.config.get('tp_amount', 100) / 100)):.{qty_precision}f}",
-                        "tpTriggerPx": f"{tp_price:.{price_precision}f}",
-                        "tpOrdPx": "-1" if self.config.get('tp_mode', 'market') == 'market' else f"{tp_price:.{price_precision}f}",
-                        "reduceOnly": "true"
-                    }
-
-                    tp_order = self._okx_place_algo_order(tp_body)
-                    if tp_order and (tp_order.get('algoId') or tp_order.get('ordId')):
-                        algo_id = tp_order.get('algoId') or tp_order.get('ordId')
-                        with self.position_lock:
-                            self.position_exit_orders[actual_side]['tp'] = algo_id
-                        self.log(f"[OK] TP algo order placed for {actual_side.upper()} at ${tp_price:.2f}", level="info")
-                    else:
-                        self.log(f"❌ Failed to place TP algo order: {tp_order}", level="error")
-                        self._execute_trade_exit(f"Failed to place TP for {actual_side}", side=actual_side)
-                        return
+                        "sz": tp_sz,
+                        "tpTriggerPx": tp_px,
+                        "tpOrdPx": "-1" if self.config.get('tp_mode', 'market') == 'market' else tp_px,
+                        "reduceOnly": "true",
+                        "algoClOrdId": self._new_clordid('t')
+                    }))
                 else:
                     self.log(f"Skipping TP placement for {actual_side.upper()} (No offset configured)", level="info")
             else:
                 self.log("TP algo order already exists (Atomic). Skipping redundant placement.", level="info")
-                algo_id = tp_order.get('ordId') # Handle the fake/atomic id
-                with self.position_lock:
-                    self.position_exit_orders[actual_side]['tp'] = algo_id
 
             if not existing_sl:
-                if sl_off and safe_float(sl_off) > 0:
-                    sl_body = {
+                if sl_off_f > 0:
+                    sl_sz = qty_fmt(abs(actual_qty) * self._sl_amount_frac)
+                    sl_px = px_fmt(sl_price)
+                    algo_requests.append(('sl', {
                         "instId": self.config['symbol'],
                         "tdMode": self.config.get('mode', 'cross'),
                         "side": exit_order_side,
                         "posSide": actual_side,
                         "ordType": "conditional",
-                        "sz": f"{(abs(actual_qty) * (self.config.get('sl_amount', 100) / 100)):.{qty_precision}f}",
-                        "slTriggerPx": f"{sl_price:.{price_precision}f}",
+                        "sz": sl_sz,
+                        "slTriggerPx": sl_px,
                         "slOrdPx": "-1", # market
-                        "reduceOnly": "true"
-                    }
-
-                    sl_order = self._okx_place_algo_order(sl_body)
-                    if sl_order and (sl_order.get('algoId') or sl_order.get('ordId')):
-                        algo_id = sl_order.get('algoId') or sl_order.get('ordId')
-                        with self.position_lock:
-                            self.position_exit_orders[actual_side]['sl'] = algo_id
-                        self.log(f"[OK] SL algo order placed for {actual_side.upper()} at ${sl_price:.2f}", level="info")
-                    else:
-                        self.log(f"❌ Failed to place SL algo order: {sl_order}", level="error")
-                        self._execute_trade_exit(f"Failed to place SL for {actual_side}", side=actual_side)
-                        return
+                        "reduceOnly": "true",
+                        "algoClOrdId": self._new_clordid('s')
+                    }))
                 else:
                     self.log(f"Skipping SL placement for {actual_side.upper()} (No offset configured)", level="info")
             else:
                  self.log("SL algo order already exists (Atomic). Skipping redundant placement.", level="info")
-                 algo_id = sl_order.get('ordId')
-                 with self.position_lock:
-                     self.position_exit_orders[actual_side]['sl'] = algo_id
+
+            # TP and SL go out together; results are recorded under a single lock acquisition
+            results = self._okx_batch_place_algo_order([body for _, body in algo_requests])
+            failed_kind = None
+            with self.position_lock:
+                if existing_tp_id:
+                    self.position_exit_orders[actual_side]['tp'] = existing_tp_id
+                if existing_sl_id:
+                    self.position_exit_orders[actual_side]['sl'] = existing_sl_id
+                for (kind, _), algo_order in zip(algo_requests, results):
+                    algo_id = algo_order and (algo_order.get('algoId') or algo_order.get('ordId'))
+                    if algo_id:
+                        self.position_exit_orders[actual_side][kind] = algo_id
+                    elif failed_kind is None:
+                        failed_kind = kind
+
+            for (kind, _), algo_order in zip(algo_requests, results):
+                kind_price = tp_price if kind == 'tp' else sl_price
+                if algo_order and (algo_order.get('algoId') or algo_order.get('ordId')):
+                    self.log(f"[OK] {kind.upper()} algo order placed for {actual_side.upper()} at ${kind_price:.2f}", level="info")
+                else:
+                    self.log(f"❌ Failed to place {kind.upper()} algo order: {algo_order}", level="error")
+
+            if failed_kind:
+                self._execute_trade_exit(f"Failed to place {failed_kind.upper()} for {actual_side}", side=actual_side)
+                return
 
         except Exception as e:
             self.log(f"Exception in _confirm_and_set_active_position (OKX): {e}", level="error")
@@ -1710,20 +2743,22 @@ class TradingBotEngine:
         and closes/cancels everything to leave NOTHING behind.
         """
         with self.exit_lock:
+            self._exit_queued = False # Cleared atomically with the in-progress check, so no trigger slips between them
             if self.authoritative_exit_in_progress:
                 self.log(f"Join: Authoritative exit already in progress. Ignoring trigger: {reason}", level="debug")
                 return
             self.authoritative_exit_in_progress = True
 
+        closed_any = False
         try:
             target_symbol = self.config['symbol']
             self.log(f"=== EMERGENCY EXIT === Reason: {reason} | Symbol: {target_symbol}", level="info")
 
             # 1. Fetch CURRENT positions directly from exchange
-            path = "/api/v5/account/positions"
-            params = {"instType": "SWAP", "instId": target_symbol}
-            response = self._okx_request("GET", path, params=params)
+            self._invalidate_positions_cache()
+            response = self._get_positions_cached(target_symbol)
 
+            legs = []
             if response and response.get('code') == '0':
                 positions_data = response.get('data', [])
                 for pos in positions_data:
@@ -1742,32 +2777,35 @@ class TradingBotEngine:
                                 self.total_trade_loss += abs(unrealized_pnl)
                             self.net_trade_profit = self.total_trade_profit - self.total_trade_loss
                             
-                            # Determine close side (If qty > 0 [Long], Sell. If qty < 0 [Short], Buy)
-                            close_side = "Sell" if pos_qty > 0 else "Buy"
-                            
                             self.log(f"Force closing {pos_side_raw.upper()} position: {abs(pos_qty)} {target_symbol} @ Market (Mode: {mgn_mode})", level="info")
-                            # Pass mgn_mode as tdMode to ensure we address the position in the correct margin account
-                            exit_order = self._okx_place_order(target_symbol, close_side, abs(pos_qty), order_type="Market", reduce_only=True, posSide=pos_side_raw, tdMode=mgn_mode)
-                            
-                            if exit_order and exit_order.get('ordId'):
-                                self.log(f"[OK] Position closed. Order ID: {exit_order.get('ordId')}", level="info")
-                                self.log(f"[DONE] Close Position (Auth): {pos_side_raw.upper()} {target_symbol} | Reason: {reason}", level="info")
-                                self.log(f"[PROFIT] Realized PnL: ${unrealized_pnl:.2f} | Session Total: ${self.net_trade_profit:.2f}", level="info")
-                            else:
-                                self.log(f"⚠️ Market exit for {pos_side_raw.upper()} failed or rejected.", level="warning")
-
-
-            # 2. Batch Cancel ALL pending orders for this symbol (Limit & Algo)
-            # We call batch_cancel_orders which performs the exchange-wide sweep
-            self.batch_cancel_orders()
+                            legs.append((pos_side_raw, mgn_mode, unrealized_pnl))
+
+            # 2. Close every leg via /close-position and batch cancel ALL pending orders (Limit & Algo) concurrently.
+            # batch_cancel_orders performs the exchange-wide sweep.
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                close_futures = [(leg, executor.submit(self._okx_close_position, target_symbol, leg[0], leg[1])) for leg in legs]
+                cancel_future = executor.submit(self.batch_cancel_orders)
+
+                for (pos_side_raw, mgn_mode, unrealized_pnl), future in close_futures:
+                    if future.result():
+                        closed_any = True
+                        self.log(f"[OK] Position closed ({pos_side_raw.upper()}).", level="info")
+                        self.log(f"[DONE] Close Position (Auth): {pos_side_raw.upper()} {target_symbol} | Reason: {reason}", level="info")
+                        self.log(f"[PROFIT] Realized PnL: ${unrealized_pnl:.2f} | Session Total: ${self.net_trade_profit:.2f}", level="info")
+                    else:
+                        self.log(f"⚠️ Market exit for {pos_side_raw.upper()} failed or rejected.", level="warning")
+                cancel_future.result()
 
             # 3. Synchronize internal state to avoid ghost tracking
             with self.position_lock:
-                self.in_position = {'long': False, 'short': False}
-                self.position_qty = {'long': 0.0, 'short': 0.0}
-                self.position_entry_price = {'long': 0.0, 'short': 0.0}
-                self.position_exit_orders = {'long': {}, 'short': {}}
-                self.pending_entry_ids = []
+                # Mutate in place so readers holding a reference never see a swapped-out dict
+                for s in ('long', 'short'):
+                    self.in_position[s] = False
+                    self.position_qty[s] = 0.0
+                    self.position_entry_price[s] = 0.0
+                    self.position_exit_orders[s].clear()
+            with self.pending_lock:
+                self.pending_entry_ids = frozenset()
                 self.pending_entry_order_details = {}
 
         except Exception as e:
@@ -1775,72 +2813,55 @@ class TradingBotEngine:
         finally:
             with self.exit_lock:
                 self.authoritative_exit_in_progress = False
+            # Reconcile balances/PnL only when a leg was actually closed (false-alarm exits skip it)
+            if closed_any:
+                self._request_account_refresh()
             self.log("=== EMERGENCY EXIT COMPLETE === Account cleared for symbol.", level="info")
 
     def _check_auto_add_position_step(self, current_price, current_side, remaining_budget):
+        # Cheap early exits first: plain dict reads, no lock (a stale False/0 only delays to the next tick)
+        if not self.in_position.get(current_side):
+            return # No position to add to
+
         # Log condition check (User Request)
         # Only log if monitoring tick allows to avoid spam, but client wants VISIBILITY.
         if self.monitoring_tick % 6 == 0:
             self.log("Check Add Position Condition")
 
+        if time.monotonic() < self._auto_add_cooldown_until:
+            return # Still cooling down after the last add
+
         # GAP-BASED AUTO-ADD LOGIC
         # Trigger: Market Price is [GAP] more than Average Entry Price.
         # Sizing: Step 1 = 1x Price, Step 2 = 2x Price (if scaling enabled).
-        
-        gap_threshold = self.config.get('add_pos_gap_threshold', 5.0)
-        
+
         # 1. Get Average Entry Price
-        avg_entry = 0.0
-        with self.position_lock:
-            if current_side == 'long':
-                avg_entry = self.position_entry_price.get('long', 0.0)
-            else:
-                avg_entry = self.position_entry_price.get('short', 0.0)
-        
+        avg_entry = self.position_entry_price.get(current_side, 0.0)
         if avg_entry <= 0: return # No position to add to
 
         # 2. Check Gap (Strict Loss Condition for Averaging Down)
         # User Requirement: "For short: When PnL is loss... if market > entry gap 5... add orders"
         # This means we ONLY trigger if price moves AGAINST the position.
-
-        gap_magnitude = 0.0
-        is_loss_gap = False
-
-        if current_side == 'long':
-            # Long: Loss if Market < Entry. Gap = Entry - Market
-            if current_price < avg_entry:
-                gap_magnitude = avg_entry - current_price
-                is_loss_gap = True
-        else: # short
-            # Short: Loss if Market > Entry. Gap = Market - Entry
-            if current_price > avg_entry:
-                gap_magnitude = current_price - avg_entry
-                is_loss_gap = True
-
-        # If it's a profit gap (or flat), we do NOT add.
-        if not is_loss_gap:
-            # self.log(f"[DEBUG] Position in Profit or Zero Gap. No Averaging Down.", level="debug")
+        # Long: Gap = Entry - Market; Short: Gap = Market - Entry. Profit or flat gives <= 0 and never adds.
+        gap_magnitude = avg_entry - current_price if current_side == 'long' else current_price - avg_entry
+        if gap_magnitude <= 0:
             return
 
+        gap_threshold = self._c_add_pos_gap_threshold
         if gap_magnitude < gap_threshold:
-             # self.log(f"[DEBUG] Gap {gap_magnitude:.2f} < {gap_threshold}. No Add.", level="debug")
              return # No gap trigger
 
+        # One published snapshot of this side serves every position read below
+        side_snap = self._pos_snapshot[current_side]
+
         # 3. Mode 1 Specific Check: Stop adding if PnL already near zero
         # Requirement: "Run max 6 loops to make PnL near 0" - stop when goal achieved
-        if self.config.get('use_add_pos_above_zero', False):
-            trade_fee_pct = self.config.get('trade_fee_percentage', 0.07)
-            
+        if self._c_use_add_pos_above_zero:
             # Calculate current position size for fee calculation
-            current_total_notional = 0.0
-            with self.position_lock:
-                if current_side == 'long':
-                    current_total_notional = self.okx_position_notional.get('long', 0)
-                else:
-                    current_total_notional = self.okx_position_notional.get('short', 0)
+            current_total_notional = side_snap['notional']
             
             if current_total_notional > 0:
-                current_size_fee = current_total_notional * (trade_fee_pct / 100.0)
+                current_size_fee = current_total_notional * self._c_trade_fee_pct
                 near_zero_threshold = max(1.0, current_size_fee * 0.1)
                 
                 # If PnL is already near zero, don't add more
@@ -1849,24 +2870,18 @@ class TradingBotEngine:
                     return
 
         # 4. Check Max Loops
-        max_loops = self.config.get('add_pos_max_count', 10)
+        max_loops = self._c_add_pos_max_count
         if self.auto_add_step_count >= max_loops:
              self.log(f"Auto-Add Check SKIPPED: Max Loops Reached ({self.auto_add_step_count} >= {max_loops})", level="warning")
              return
 
         # 5. Calculate Add Amount (Percentage of Current Size)
         # Requirement: "Order amount is the Newest Size Amount 30%"
-        size_pct = self.config.get('add_pos_size_pct', 30.0) / 100.0
+        size_pct = self._c_add_pos_size_frac
         
         # We need CURRENT TOTAL SIZE (Notional)
-        current_total_notional = 0.0
-        with self.position_lock:
-             if current_side == 'long':
-                 # Calculate from currently tracked position
-                 current_total_notional = abs(safe_float(self.position_details.get('long', {}).get('notionalUsd', 0))) 
-                 # Or use okx_pos_notional passed in?
-             else:
-                 current_total_notional = abs(safe_float(self.position_details.get('short', {}).get('notionalUsd', 0)))
+        # Calculate from currently tracked position
+        current_total_notional = side_snap['notional']
         
         # Fallback if position detail is missing but we are here (shouldn't happen much)
         if current_total_notional == 0:
@@ -1889,13 +2904,7 @@ class TradingBotEngine:
         # So Capital 2nd tracks MARGIN ("Real Money Used"), not Notional.
         
         # Get leverage
-        current_leverage = 1.0
-        with self.position_lock:
-            if current_side == 'long':
-                current_leverage = self.position_details.get('long', {}).get('lever', 1.0)
-            else:
-                current_leverage = self.position_details.get('short', {}).get('lever', 1.0)
-        current_lever_float = safe_float(current_leverage, 1.0)
+        current_lever_float = side_snap['lever']
         if current_lever_float <= 0: current_lever_float = 1.0
 
         margin_cost = add_notional / current_lever_float
@@ -1907,24 +2916,22 @@ class TradingBotEngine:
         #      self.log(f"Auto-Add Check SKIPPED: Required Margin ${margin_cost:.2f} > Budget ${remaining_budget:.2f}", level="warning")
         #      return
 
+        # Snapshot the pre-add position so Step 2 can derive the new average from the add fill alone
+        pre_add = (side_snap['qty'], side_snap['entry_price'])
+
         # Execute Market Order
-        target_side = "Buy" if current_side == 'long' else "Sell"
+        target_side = _SIDE_TABLE[current_side]['add']
         
         # Qty = Notional / Price / ContractSize
-        contract_size = safe_float(self.product_info.get('contractSize', 1.0))
-        if contract_size <= 0: contract_size = 1.0
+        contract_size = self._pi_contract_size
         
         qty_contracts = add_notional / (current_price * contract_size)
         
-        # Format Qty
-        qty_precision = safe_int(self.product_info.get('lotSzPrecision', '0'))
-        is_integer_qty = self.product_info.get('lotSz', '1') == '1' and '.' not in self.product_info.get('lotSz', '1')
-        
-        if is_integer_qty:
+        # Format Qty (lot size / min size / precision pre-parsed in _refresh_product_info)
+        if self._pi_lot_size == 1.0:
             qty_str = str(max(1, int(qty_contracts)))
         else:
-            min_sz = safe_float(self.product_info.get('minSz', 0.001))
-            qty_str = f"{max(min_sz, qty_contracts):.{qty_precision}f}"
+            qty_str = self._qty_fmt(max(self._pi_min_qty, qty_contracts))
             
         self.log(f"Auto-Add Check Triggering Gap Add (Step {step_count}). Gap: {gap_magnitude:.2f} > {gap_threshold}. Cost: ${margin_cost:.2f} (Notional: ${add_notional:.2f}, Qty: {qty_str})", level="warning")
         
@@ -1943,112 +2950,127 @@ class TradingBotEngine:
             self.cumulative_margin_used += margin_cost # Track Margin
             self.auto_add_step_count += 1
             
-            # Cooldown
-            time.sleep(1)
+            # Cooldown (non-blocking: the trading loop keeps ticking, further adds are gated)
+            self._auto_add_cooldown_until = time.monotonic() + 1.0
             
-            # Step 2: Ensure Exit Orders are updated immediately
-            threading.Thread(target=self._update_exit_orders, args=(current_side,), daemon=True).start()
+            # Step 2: Ensure Exit Orders are updated once the cooldown has elapsed
+            exit_update = threading.Timer(1.0, self._update_exit_orders, args=(current_side, order_response.get('ordId'), pre_add))
+            exit_update.daemon = True
+            exit_update.start()
         else:
             self.log(f"[FAIL] Auto-Add Step {step_count} Failed: {order_response}", level="error")
 
-    def _update_exit_orders(self, side):
+    def _update_exit_orders(self, side, new_ord_id=None, pre_add=None):
         """
         Step 2 of Auto-Add: Calculate new avg price and place Limit Exit (TP).
+        When the add order id and the pre-add (qty, avg) are known, the new average is derived from the
+        order's fill instead of re-reading positions.
         """
         try:
             time.sleep(2) # Wait for fill
-            
-            # 1. Fetch latest position data
-            path = "/api/v5/account/positions"
-            params = {"instType": "SWAP", "instId": self.config['symbol']}
-            response = self._okx_request("GET", path, params=params)
-             
-            if response and response.get('code') == '0':
-                positions_data = response.get('data', [])
-                target_pos = None
-                for pos in positions_data:
-                    pos_side = pos.get('posSide', 'net')
-                    if side == 'long' and (pos_side == 'long' or (pos_side == 'net' and float(pos['pos']) > 0)):
-                        target_pos = pos
-                        break
-                    elif side == 'short' and (pos_side == 'short' or (pos_side == 'net' and float(pos['pos']) < 0)):
-                        target_pos = pos
-                        break
-                
-                if target_pos:
-                    avg_px = safe_float(target_pos.get('avgPx'))
-                    # Calculate TP Price
-                    # Mode 1: Break Even (AvP + Fee/Size?) -> Just AvP for now or small profit
-                    # Mode 2: Profit Multiplier
-                    
-                    tp_price = 0.0
-                    if side == 'long':
-                        # Mode 1: Fixed Offset (Priority)
-                        # Target = Avg + Offset
-                        step2_offset = safe_float(self.config.get('add_pos_step2_offset', 0.0))
-                        
-                        if step2_offset > 0:
-                            tp_price = avg_px + step2_offset
-                        else:
-                            # Mode 2: Profit Multiplier
-                            profit_mult = self.config.get('add_pos_profit_multiplier', 1.5)
-                            trade_fee_pct = self.config.get('trade_fee_percentage', 0.07)
-                            size_notional = safe_float(target_pos.get('notionalUsd'))
-                            target_profit = (size_notional * (trade_fee_pct/100.0)) * profit_mult
-                            
-                            pos_contracts = safe_float(target_pos.get('pos'))
-                            delta = target_profit / (pos_contracts * 1.0) # Approx
-                            tp_price = avg_px + delta
-                        
-                    else: # Short
-                        step2_offset = safe_float(self.config.get('add_pos_step2_offset', 0.0))
-                        
-                        if step2_offset > 0:
-                            tp_price = avg_px - step2_offset
-                        else:
-                            profit_mult = self.config.get('add_pos_profit_multiplier', 1.5)
-                            trade_fee_pct = self.config.get('trade_fee_percentage', 0.08)
-                            size_notional = safe_float(target_pos.get('notionalUsd'))
-                            target_profit = (size_notional * (trade_fee_pct/100.0)) * profit_mult
-                            
-                            pos_contracts = abs(safe_float(target_pos.get('pos')))
-                            delta = target_profit / (pos_contracts * 1.0)
-                            tp_price = avg_px - delta # Lower for short
-
-                # Sanity check
-                if tp_price > 0:
-                    self.log(f"=== AUTO-ADD STEP 2 (CLOSE) ===", level="info")
-                    if safe_float(self.config.get('add_pos_step2_offset', 0.0)) > 0:
-                         self.log(f"Logic used: Fixed Offset (${safe_float(self.config.get('add_pos_step2_offset', 0.0))})", level="info")
-                    else:
-                         self.log(f"Logic used: Profit Multiplier ({self.config.get('add_pos_profit_multiplier', 1.5)}x Fees)", level="info")
-                    
-                    self.log(f"New Avg Entry: {avg_px} -> Setting Limit Exit at {tp_price:.4f}", level="info")
-                    
-                    # Sync internal state so closure detection knows this is a Mode 2 exit
-                    with self.position_lock:
-                        self.current_take_profit[side] = tp_price
 
-                    # Place Limit Close
-                    close_side = "Sell" if side == 'long' else "Buy"
-                    qty = abs(safe_float(target_pos.get('pos')))
-                    
-                    # Reduce Only to strictly close
-                    self._okx_place_order(
-                        self.config['symbol'],
-                        close_side,
-                        qty,
-                        price=tp_price,
-                        order_type="Limit",
-                        reduce_only=True,
-                        verbose=True
-                    )
+            # Config snapshot for this step
+            step2_offset = safe_float(self.config.get('add_pos_step2_offset', 0.0))
+            profit_mult = self.config.get('add_pos_profit_multiplier', 1.5)
+
+            # 1. Derive the post-add position from the add order's fill (falls back to a positions read)
+            target_pos = self._position_after_add_fill(new_ord_id, *pre_add) if new_ord_id and pre_add else None
+            if target_pos is None:
+                response = self._get_positions_cached()
+                if response and response.get('code') == '0':
+                    for pos in response.get('data', []):
+                        pos_side = pos.get('posSide', 'net')
+                        if side == 'long' and (pos_side == 'long' or (pos_side == 'net' and float(pos['pos']) > 0)):
+                            target_pos = pos
+                            break
+                        elif side == 'short' and (pos_side == 'short' or (pos_side == 'net' and float(pos['pos']) < 0)):
+                            target_pos = pos
+                            break
+
+            if not target_pos:
+                self.log(f"Auto-Add Step 2: no {side.upper()} position found. Skipping exit update.", level="warning")
+                return
+
+            avg_px = safe_float(target_pos.get('avgPx'))
+            # Calculate TP Price
+            # Mode 1: Break Even (AvP + Fee/Size?) -> Just AvP for now or small profit
+            # Mode 2: Profit Multiplier
+
+            sign = _SIDE_TABLE[side]['sign'] # +1 long (TP above avg), -1 short (TP below avg)
+            if step2_offset > 0:
+                # Mode 1: Fixed Offset (Priority). Target = Avg +/- Offset
+                tp_price = avg_px + sign * step2_offset
+            else:
+                # Mode 2: Profit Multiplier
+                size_notional = safe_float(target_pos.get('notionalUsd'))
+                target_profit = (size_notional * self._c_trade_fee_pct) * profit_mult
+
+                pos_contracts = abs(safe_float(target_pos.get('pos')))
+                delta = target_profit / (pos_contracts * 1.0) # Approx
+                tp_price = avg_px + sign * delta
+
+            # Sanity check
+            if tp_price > 0:
+                self.log(f"=== AUTO-ADD STEP 2 (CLOSE) ===", level="info")
+                if step2_offset > 0:
+                     self.log(f"Logic used: Fixed Offset (${step2_offset})", level="info")
                 else:
-                     self.log(f"Auto-Add Check Calculated TP Price Invalid: {tp_price}", level="error")
+                     self.log(f"Logic used: Profit Multiplier ({profit_mult}x Fees)", level="info")
+
+                self.log(f"New Avg Entry: {avg_px} -> Setting Limit Exit at {tp_price:.4f}", level="info")
+
+                # Sync internal state so closure detection knows this is a Mode 2 exit
+                with self.position_lock:
+                    self.current_take_profit[side] = tp_price
+
+                # Place Limit Close
+                close_side = _SIDE_TABLE[side]['close']
+                qty = abs(safe_float(target_pos.get('pos')))
+
+                # Reduce Only to strictly close
+                self._okx_place_order(
+                    self.config['symbol'],
+                    close_side,
+                    qty,
+                    price=tp_price,
+                    order_type="Limit",
+                    reduce_only=True,
+                    verbose=True
+                )
+            else:
+                 self.log(f"Auto-Add Check Calculated TP Price Invalid: {tp_price}", level="error")
 
         except Exception as e:
             self.log(f"Error in _update_exit_orders: {e}", level="error")
 
+    def _position_after_add_fill(self, ord_id, prev_qty, prev_avg):
+        """
+        Builds a minimal position dict (avgPx, pos, notionalUsd) from the add order's fill and the position
+        snapshot taken before the add. Returns None if the order is not fully filled yet or inputs are missing.
+        """
+        response = self._okx_request("GET", "/api/v5/trade/order", params={"instId": self.config['symbol'], "ordId": ord_id})
+        if not response or response.get('code') != '0' or not response.get('data'):
+            return None
+        order = response['data'][0]
+        if order.get('state') != 'filled':
+            return None
+
+        fill_px = safe_float(order.get('avgPx'))
+        fill_contracts = safe_float(order.get('accFillSz'))
+        contract_size = self._pi_contract_size
+        prev_qty = abs(prev_qty) # base units
+        if fill_px <= 0 or fill_contracts <= 0 or prev_qty <= 0 or prev_avg <= 0:
+            return None
+
+        fill_qty = fill_contracts * contract_size
+        new_qty = prev_qty + fill_qty
+        new_avg = (prev_avg * prev_qty + fill_px * fill_qty) / new_qty
+        return {
+            'avgPx': new_avg,
+            'pos': new_qty / contract_size, # contracts, positive for both sides (short path uses abs)
+            'notionalUsd': new_qty * new_avg,
+        }
+
     def _cancel_all_exit_orders_and_reset(self, reason, side=None):
         # Determine sides to reset
         sides_to_reset = [side] if side else ['long', 'short']
@@ -2062,7 +3084,7 @@ class TradingBotEngine:
                 self.position_qty[s] = 0.0
                 self.current_take_profit[s] = 0.0
                 self.current_stop_loss[s] = 0.0
-                self.position_exit_orders[s] = {}
+                self.position_exit_orders[s].clear()
                 self.entry_reduced_tp_flag[s] = False
 
                 for order_id in orders_to_cancel:
@@ -2081,9 +3103,7 @@ class TradingBotEngine:
     def _check_and_close_any_open_position(self):
         try:
             self.log("Checking for any open OKX positions to close...", level="debug")
-            path = "/api/v5/account/positions"
-            params = {"instType": "SWAP", "instId": self.config['symbol']}
-            response = self._okx_request("GET", path, params=params)
+            response = self._get_positions_cached()
 
             any_closed = False
             if response and response.get('code') == '0':
@@ -2122,42 +3142,29 @@ class TradingBotEngine:
             return False
 
     def _reset_entry_state(self, reason):
-        with self.position_lock:
+        with self.pending_lock:
             self.pending_entry_order_id = None
-            self.entry_reduced_tp_flag = False
             self.pending_entry_order_details = {}
+        with self.position_lock:
+            self.entry_reduced_tp_flag['long'] = False
+            self.entry_reduced_tp_flag['short'] = False
         with self.entry_order_sl_lock:
             self.entry_order_with_sl = None
         self.log(f"Entry state reset. Reason: {reason}", level="info")
 
-
-        self.log("=" * 80, level="info")
-        self.log(f"POSITION CLOSED - Reason: {reason}", level="info")
-        self.log("=" * 80, level="info")
-
-        for order_id in orders_to_cancel:
-            if order_id:
-                try:
-                    self._okx_cancel_algo_order(self.config['symbol'], order_id)
-                    time.sleep(0.1)
-                except Exception as e:
-                    self.log(f"Error cancelling order: {e} (OK, continuing)", level="error")
-
-        # Account information is no longer updated in real-time via private WebSocket.
-
     def _get_latest_data_and_indicators(self):
         try:
-            with self.trade_data_lock: # Use trade_data_lock for latest_trade_price
-                current_price = self.latest_trade_price
-                if current_price is None:
-                    if self.is_running:
-                        self.log(f"Could not get current market price from WebSocket. Waiting for data.", level="warning")
-                    return None
-                
-                # Check price age for logging/diagnostics
-                price_age = time.time() - self.last_price_update_time
-                if price_age > 1.0:
-                    self.log(f"Price data is {price_age:.1f}s old. Checking connection...", level="debug")
+            # Single attribute load; the WS thread rebinds latest_trade_price atomically
+            current_price = self.latest_trade_price
+            if current_price is None:
+                if self.is_running:
+                    self.log(f"Could not get current market price from WebSocket. Waiting for data.", level="warning")
+                return None
+            
+            # Check price age for logging/diagnostics
+            price_age = time.monotonic() - self.last_price_update_time
+            if price_age > 1.0 and self._debug_enabled:
+                self.log(f"Price data is {price_age:.1f}s old. Checking connection...", level="debug")
 
             return {
                 'current_price': current_price,
@@ -2172,52 +3179,26 @@ class TradingBotEngine:
         # Fetch the latest completed candle for the primary timeframe (e.g., '1m')
         # This assumes you have historical data being updated.
         timeframe = self.config.get('candlestick_timeframe', '1m')
-        with self.data_lock:
-            df = self.historical_data_store.get(timeframe)
-            if df is None or df.empty:
-                self.log(f"No historical data for {timeframe} to check candlestick conditions.", "warning")
-                return True, "No Data (Default Pass)" # Default to true if data is not available to not block trades
-
-            latest_candle = df.iloc[-1]
-            o = latest_candle['Open']
-            h = latest_candle['High']
-            l = latest_candle['Low']
-            c = latest_candle['Close']
-
+        # Lock-free read: the writer publishes an immutable tuple alongside each DataFrame swap
+        snap = self._latest_candle_snapshot.get(timeframe)
+        if snap is None:
+            self.log(f"No historical data for {timeframe} to check candlestick conditions.", "warning")
+            return True, "No Data (Default Pass)" # Default to true if data is not available to not block trades
+        o, h, l, c = snap
+
+        checks = self._candle_checks
+        if not checks:
+            return True, "Skipped"
+
+        # Open-Close, High-Low and High-Close changes; bounds come pre-resolved from config
+        changes = (abs(o - c), h - l, abs(h - c))
+        all_passed = True
         status_parts = []
-        
-        # Check Open-Close Change
-        oc_pass = True
-        if self.config.get('use_chg_open_close'):
-            chg_open_close = abs(o - c)
-            min_chg = self.config.get('min_chg_open_close', 0)
-            max_chg = self.config.get('max_chg_open_close', 0)
-            if not (min_chg <= chg_open_close <= max_chg):
-                 oc_pass = False
-            status_parts.append(f"open-close={'Passed' if oc_pass else 'Fail'}")
-
-        # Check High-Low Change
-        hl_pass = True
-        if self.config.get('use_chg_high_low'):
-            chg_high_low = h - l
-            min_chg = self.config.get('min_chg_high_low', 0)
-            max_chg = self.config.get('max_chg_high_low', 0)
-            if not (min_chg <= chg_high_low <= max_chg):
-                hl_pass = False
-            status_parts.append(f"High-Low={'Passed' if hl_pass else 'Fail'}")
-
-        # Check High-Close Change
-        hc_pass = True
-        if self.config.get('use_chg_high_close'):
-            chg_high_close = abs(h - c)
-            min_chg = self.config.get('min_chg_high_close', 0)
-            max_chg = self.config.get('max_chg_high_close', 0)
-            if not (min_chg <= chg_high_close <= max_chg):
-                hc_pass = False
-            status_parts.append(f"High-Close={'Passed' if hc_pass else 'Fail'}")
-
-        all_passed = oc_pass and hl_pass and hc_pass
-        status_str = "; ".join(status_parts) if status_parts else "Skipped"
+        for label, idx, min_chg, max_chg in checks:
+            passed = min_chg <= changes[idx] <= max_chg
+            all_passed = all_passed and passed
+            status_parts.append(f"{label}={'Passed' if passed else 'Fail'}")
+        status_str = "; ".join(status_parts)
         
         return all_passed, status_str
 
@@ -2243,11 +3224,40 @@ class TradingBotEngine:
     def _check_entry_conditions(self, market_data, log_prefix=""):
         # Max Amount = Max Allowed Used (USDT)
         # Remaining = (Max Amount * Leverage) - Used Notional
-        leverage = float(self.config.get('leverage', 1))
-        if leverage <= 0: leverage = 1.0
+        current_price = market_data['current_price']
+        direction_mode = self._c_direction
+        long_safety = self._c_long_safety_line_price
+        short_safety = self._c_short_safety_line_price
+        entry_price_offset = self._c_entry_price_offset
+
+        # Possible directions to check
+        if direction_mode == 'both':
+            directions_to_eval = ('long', 'short')
+        else:
+            directions_to_eval = (direction_mode,)
+
+        # Safety-line pass first: it only needs the price, so when no direction
+        # is eligible we skip the equity lock, capacity math and candle check.
+        eligible = []
+        for d in directions_to_eval:
+            if d == 'long':
+                safety_p = long_safety
+                passed = (current_price < long_safety)
+            else: # short
+                safety_p = short_safety
+                passed = (current_price > short_safety)
+
+            self.log_lazy("info", lambda: f"{log_prefix}Entry-1:{d.upper()} Market {current_price:.2f}, Safety:{safety_p}, {'Passed' if passed else 'NOT Passed'}")
+            if passed:
+                eligible.append(d)
+
+        if not eligible:
+            return []
+
+        leverage = self._c_leverage
         
         # Safety Clamp: max_allowed_used must be capped by total_equity (Total Capital)
-        max_allowed_config = float(self.config.get('max_allowed_used', 1000.0))
+        max_allowed_config = self._c_max_allowed_used
         with self.account_info_lock:
             equity = self.total_equity
         
@@ -2260,39 +3270,23 @@ class TradingBotEngine:
         elif equity > 0 and max_allowed_config <= equity:
             self._max_allowed_clamped_logged = False
 
-        rate_divisor = self.config.get('rate_divisor', 1)
-        if rate_divisor <= 0: rate_divisor = 1
-        max_amount_per_loop = max_amount_usdt / rate_divisor
+        max_amount_per_loop = max_amount_usdt / self._c_rate_divisor
         max_notional_capacity = max_amount_per_loop * leverage
         
-        min_notional_per_order = self.config.get('min_order_amount', 100)
+        min_notional_per_order = self._c_min_order_amount
         
-        with self.position_lock:
+        with self.notional_lock:
             # High-Precision Remaining Calculation
             remaining_notional = max_notional_capacity - self.used_amount_notional
             
-            if remaining_notional < min_notional_per_order:
-                self.log(f"{log_prefix}Entry-3:Remaining Capacity: {remaining_notional:.2f} < Min {min_notional_per_order}: NOT Passed", level="info")
-                return []
+        if remaining_notional < min_notional_per_order:
+            self.log(f"{log_prefix}Entry-3:Remaining Capacity: {remaining_notional:.2f} < Min {min_notional_per_order}: NOT Passed", level="info")
+            return []
 
-        target_amount = self.config.get('target_order_amount', 100)
+        target_amount = self._c_target_order_amount
 
         # User is responsible for setting Max Allowed within their balance limits
         # Bot focuses only on remaining capacity
-        current_price = market_data['current_price']
-        direction_mode = self.config.get('direction', 'long')
-        long_safety = self.config.get('long_safety_line_price', 0)
-        short_safety = self.config.get('short_safety_line_price', float('inf'))
-        entry_price_offset = self.config.get('entry_price_offset', 0)
-
-        valid_entries = []
-        
-        # Possible directions to check
-        directions_to_eval = []
-        if direction_mode == 'both':
-            directions_to_eval = ['long', 'short']
-        else:
-            directions_to_eval = [direction_mode]
 
         # Shared Candlestick check (if enabled)
         candlestick_passed = True
@@ -2300,40 +3294,20 @@ class TradingBotEngine:
         if self.config.get('use_candlestick_conditions', False):
             candlestick_passed, candlestick_msg = self._check_candlestick_conditions(market_data)
 
-        for d in directions_to_eval:
-            passed = False
-            signal = 0
-            safety_p = 0.0
-            limit_p = 0.0
-            
-            if d == 'long':
-                safety_p = long_safety
-                passed = (current_price < long_safety)
-                signal = 1
-                limit_p = current_price - entry_price_offset
-            else: # short
-                safety_p = short_safety
-                passed = (current_price > short_safety)
-                signal = -1
-                limit_p = current_price + entry_price_offset
+        if not candlestick_passed:
+            self.log(f"{log_prefix}Entry-2:Candlestick {candlestick_msg}: NOT Passed", level="info")
+            return []
 
-            self.log(f"{log_prefix}Entry-1:{d.upper()} Market {current_price:.2f}, Safety:{safety_p}, {'Passed' if passed else 'NOT Passed'}", level="info")
-            
-            if passed:
-                if candlestick_passed:
-                    valid_entries.append({'signal': signal, 'limit_price': limit_p, 'side': d})
-                    if candlestick_msg != "Skipped":
-                         self.log(f"{log_prefix}Entry-2:{candlestick_msg}", level="info")
-                else:
-                    self.log(f"{log_prefix}Entry-2:Candlestick {candlestick_msg}: NOT Passed", level="info")
-        
-        # Log final verification for consistency if nothing passed
-        if not valid_entries:
-             return []
+        valid_entries = []
+        for d in eligible:
+            signal = _SIDE_TABLE[d]['sign']
+            valid_entries.append({'signal': signal, 'limit_price': current_price - entry_price_offset * signal, 'side': d})
+            if candlestick_msg != "Skipped":
+                self.log(f"{log_prefix}Entry-2:{candlestick_msg}", level="info")
 
         # Check explicit target/min logs for the first valid one to keep user dashboard tidy
-        self.log(f"{log_prefix}Entry-3:Remaining: {remaining_notional:.2f} > Target {target_amount}: Passed", level="info")
-        self.log(f"{log_prefix}Entry-4:Remaining: {remaining_notional:.2f} > Min {min_notional_per_order}: Passed", level="info")
+        self.log_lazy("info", lambda: f"{log_prefix}Entry-3:Remaining: {remaining_notional:.2f} > Target {target_amount}: Passed")
+        self.log_lazy("info", lambda: f"{log_prefix}Entry-4:Remaining: {remaining_notional:.2f} > Min {min_notional_per_order}: Passed")
 
         return valid_entries
 
@@ -2345,45 +3319,61 @@ class TradingBotEngine:
         with self.account_info_lock:
             current_available_balance = self.available_balance
 
-        batch_offset = self.config['batch_offset']
+        batch_offset = self._c_batch_offset
         self.batch_counter += 1
         
         self.log(f"Place Order Batch {self.batch_counter}", level="info")
-        
+
+        side_name = "Buy" if signal == 1 else "Sell"
+        p_side_entry = "long" if signal == 1 else "short"
+        side_str = 'Long' if signal == 1 else 'Short'
+        sign = 1 if signal == 1 else -1 # LONG / SHORT
+        planned = [] # _build_order_body kwargs per order
+        planned_notional = 0.0 # Notional of orders planned in this batch, not yet visible in used_amount_notional
+
+        # Loop invariants: config, equity and product values don't change while the batch is planned
+        leverage = self._c_leverage
+
+        # Safety Clamp: max_allowed_used must be capped by total_equity (Total Capital)
+        max_allowed_config = self._c_max_allowed_used
+        with self.account_info_lock:
+            equity = self.total_equity
+
+        max_amount_usdt = max_allowed_config
+        if equity > 0 and max_allowed_config > equity:
+            max_amount_usdt = equity
+
+        max_amount_per_loop = max_amount_usdt / self._c_rate_divisor
+        max_notional_capacity = max_amount_per_loop * leverage
+
+        target_notional = self._c_target_order_amount
+        min_notional = self._c_min_order_amount
+
+        contract_size = self._pi_contract_size
+        # Use lot size (qtyStepSize) for precise rounding
+        lot_size = self._pi_lot_size
+        min_order_qty = self._pi_min_qty
+        qty_precision = self._pi_qty_precision
+
+        # Signed TP/SL deltas (0.0 when the offset is disabled), resolved once per batch
+        tp_offset_val = self._c_tp_price_offset
+        sl_offset_val = self._c_sl_price_offset
+        tp_delta = sign * tp_offset_val if tp_offset_val > 0 else 0.0
+        sl_delta = -sign * sl_offset_val if sl_offset_val > 0 else 0.0
+        price_step = sign * batch_offset
+        mode_str = self.config.get('mode', 'cross').capitalize()
+
+        with self.notional_lock:
+            used_notional = self.used_amount_notional
+
         for i in range(batch_size):
-            current_limit_price = initial_limit_price
-            if i > 0: 
-                if signal == 1: # Long
-                    current_limit_price -= (batch_offset * i)
-                else: # Short
-                    current_limit_price += (batch_offset * i)
+            current_limit_price = initial_limit_price - price_step * i
 
             if current_limit_price <= 0:
                 continue
 
-            # Recalculate room for EVERY order to be precise (though less critical if Target is small)
-            leverage = float(self.config.get('leverage', 1))
-            if leverage <= 0: leverage = 1.0
-            
-            # Safety Clamp: max_allowed_used must be capped by total_equity (Total Capital)
-            max_allowed_config = float(self.config.get('max_allowed_used', 1000.0))
-            with self.account_info_lock:
-                equity = self.total_equity
-            
-            max_amount_usdt = max_allowed_config
-            if equity > 0 and max_allowed_config > equity:
-                max_amount_usdt = equity
-
-            rate_divisor = self.config.get('rate_divisor', 1)
-            if rate_divisor <= 0: rate_divisor = 1
-            max_amount_per_loop = max_amount_usdt / rate_divisor
-            max_notional_capacity = max_amount_per_loop * leverage
-            
-            with self.position_lock:
-                remaining_notional = max_notional_capacity - self.used_amount_notional
-            
-            target_notional = self.config.get('target_order_amount', 100)
-            min_notional = self.config.get('min_order_amount', 100)
+            # Recalculate room for EVERY order to be precise (planned orders count against capacity)
+            remaining_notional = max_notional_capacity - used_notional - planned_notional
             
             if remaining_notional < min_notional:
                 self.log(f"Batch {self.batch_counter}-{i+1} skipped: Remaining ({remaining_notional:.2f}) < Min ({min_notional})", level="info")
@@ -2393,90 +3383,95 @@ class TradingBotEngine:
         
             # Target contracts based on exact trade_amount_usdt (removed 0.5% buffer)
             qty_base_asset = trade_amount_usdt / current_limit_price
-            contract_size = safe_float(self.product_info.get('contractSize', 1.0))
-            if contract_size <= 0: contract_size = 1.0
-
-            # Use lot size (qtyStepSize) for precise rounding
-            lot_size = safe_float(self.product_info.get('qtyStepSize', 1.0))
-            if lot_size <= 0: lot_size = 1.0
-
-            qty_contracts = math.floor((qty_base_asset / contract_size) / lot_size) * lot_size
+            # int() truncation equals floor here (qty is never negative) without the math.floor call
+            qty_contracts = int((qty_base_asset / contract_size) / lot_size) * lot_size
             
-            min_order_qty = safe_float(self.product_info.get('minOrderQty', 1.0))
             if qty_contracts < min_order_qty:
                  if (min_order_qty * contract_size * current_limit_price) <= remaining_notional:
                      qty_contracts = min_order_qty
                  else:
                      continue
 
-            qty_precision = self.product_info.get('qtyPrecision', 0)
             qty_contracts = round(qty_contracts, qty_precision)
             
             # Calculate TP/SL for Display
-            tp_px = 0.0
-            sl_px = 0.0
-            tp_offset_val = self.config.get('tp_price_offset', 0)
-            sl_offset_val = self.config.get('sl_price_offset', 0)
-            
-            if signal == 1: # LONG
-                if tp_offset_val and safe_float(tp_offset_val) > 0:
-                    tp_px = current_limit_price + safe_float(tp_offset_val)
-                if sl_offset_val and safe_float(sl_offset_val) > 0:
-                    sl_px = current_limit_price - safe_float(sl_offset_val)
-            else: # SHORT
-                if tp_offset_val and safe_float(tp_offset_val) > 0:
-                    tp_px = current_limit_price - safe_float(tp_offset_val)
-                if sl_offset_val and safe_float(sl_offset_val) > 0:
-                    sl_px = current_limit_price + safe_float(sl_offset_val)
+            tp_px = current_limit_price + tp_delta if tp_delta else 0.0
+            sl_px = current_limit_price + sl_delta if sl_delta else 0.0
 
             # Log Format: Batch1-1:M:2980|En:2982|TP:2976|SL:3010|1000|Short|Isolated|20x
             market_p = self.latest_trade_price if self.latest_trade_price else 0.0
-            side_str = 'Long' if signal == 1 else 'Short'
-            mode_str = self.config.get('mode', 'cross').capitalize()
             # M:{market}|En:{entry}|Tp:{tp}|SL:{sl}|{amt}|{side}|{mode}
             # Note: User requested "Tp" (capital T, lowercase p case matching handwritten note usually has TP or Tp, using Tp as per log request "Tp:2976") 
-            log_str = f"Batch{self.batch_counter}-{i+1}:M:{market_p:.2f}|En:{current_limit_price:.2f}|Tp:{tp_px:.2f}|SL:{sl_px:.2f}|{target_notional}|{side_str}|{mode_str}"
-            self.log(log_str, level="info")
-            
-            p_side_entry = "long" if signal == 1 else "short"
-            # Pass TP/SL params for atomic placement
-            entry_order_response = self._okx_place_order(self.config['symbol'], "Buy" if signal == 1 else "Sell", qty_contracts, price=current_limit_price, order_type="Limit", time_in_force="GoodTillCancel", posSide=p_side_entry, take_profit_price=tp_px, stop_loss_price=sl_px, verbose=False)
+            self.log_lazy("info", lambda: f"Batch{self.batch_counter}-{i+1}:M:{market_p:.2f}|En:{current_limit_price:.2f}|Tp:{tp_px:.2f}|SL:{sl_px:.2f}|{target_notional}|{side_str}|{mode_str}")
+
+            # Orders are only planned here (no I/O); the whole batch goes out in one request below
+            planned_notional += qty_contracts * contract_size * current_limit_price
+            planned.append({
+                'side': side_name,
+                'qty': qty_contracts,
+                'price': current_limit_price,
+                'order_type': "Limit",
+                'time_in_force': "GoodTillCancel",
+                'posSide': p_side_entry,
+                # Pass TP/SL params for atomic placement
+                'take_profit_price': tp_px,
+                'stop_loss_price': sl_px,
+                # One id per order, kept for any retry so a lost response can't double the entry
+                'clOrdId': self._new_clordid('e'),
+            })
 
-            if entry_order_response and entry_order_response.get('ordId'):
-                order_id = entry_order_response['ordId']
-                with self.position_lock:
-                    self.pending_entry_ids.append(order_id)
-                    self.pending_entry_order_id = order_id 
-                    self.pending_entry_order_details[order_id] = {
-                        'order_id': order_id,
-                        'side': "Buy" if signal == 1 else "Sell",
-                        'qty': qty_contracts * contract_size,
-                        'limit_price': current_limit_price,
-                        'signal': signal,
-                        'order_type': 'Limit',
-                        'status': 'New',
-                        'placed_at': datetime.now(timezone.utc)
-                    }
-                
-                # Trigger an immediate account info update to refresh values
-                def _update_after_close():
-                    try:
-                        self._sync_account_data()
-                        self._emit_socket_updates()
-                    except Exception as e:
-                        self.log(f"Error in close update: {e}", level="error")
-                threading.Thread(target=_update_after_close, daemon=True).start()
-                
-                # Small delay between batch orders to prevent rate limiting
-                if i < batch_size - 1:  # Don't delay after last order
-                    time.sleep(0.2)
-            else:
+        if not planned:
+            return
+
+        symbol = self.config['symbol']
+        results, retry_indices = self._okx_place_batch_orders(symbol, planned)
+
+        # Retry individually (same clOrdId) only the items that are known not to exist and can succeed on retry
+        for idx in retry_indices:
+            order = planned[idx]
+            results[idx] = self._okx_place_order(symbol, order['side'], order['qty'], verbose=False,
+                                                 **{k: v for k, v in order.items() if k not in ('side', 'qty')})
+            if results[idx] is None:
                 self.log(f"Order placement failed", level="error")
 
-    def _check_cancel_conditions(self):
+        placed_at_ts = time.time() # Wall-clock epoch seconds, display only
+        placed_at_mono_ns = time.monotonic_ns() # Drives the unfilled time limit
+        with self.pending_lock:
+            new_ids = set(self.pending_entry_ids)
+            new_details = dict(self.pending_entry_order_details)
+            for order, result in zip(planned, results):
+                if not result or not result.get('ordId'):
+                    continue
+                order_id = result['ordId']
+                new_ids.add(order_id)
+                self.pending_entry_order_id = order_id
+                new_details[order_id] = {
+                    'order_id': order_id,
+                    'side': side_name,
+                    'qty': order['qty'] * contract_size,
+                    'limit_price': order['price'],
+                    'signal': signal,
+                    'order_type': 'Limit',
+                    'status': 'New',
+                    'placed_at_ts': placed_at_ts,
+                    'placed_at_mono_ns': placed_at_mono_ns
+                }
+            self.pending_entry_ids = frozenset(new_ids)
+            self.pending_entry_order_details = new_details
+        self._mgmt_wakeup.set() # Resume the per-second cancel checks right away
+
+    def _drop_pending_entries(self, order_ids):
+        """Unpublishes order_ids from the pending snapshots; returns the ids that were actually tracked."""
+        with self.pending_lock:
+            dropped = self.pending_entry_ids.intersection(order_ids)
+            if dropped:
+                self.pending_entry_ids = self.pending_entry_ids - dropped
+                self.pending_entry_order_details = {k: v for k, v in self.pending_entry_order_details.items() if k not in dropped}
+        return dropped
+
+    def _check_cancel_conditions(self, market_data):
         # Explicit check for cancel conditions as per nested loop logic
         
-        loop_time = self.config.get('loop_time_seconds', 10) # Using existing param or maybe hardcode 90s check?
         # User diagram says: "Check Cancel Condition"
         # 1. More than 90 seconds (cancel_unfilled_seconds)
         # 2. TP < Market (for short) / TP > Market (for long) [Inverted Logic]
@@ -2525,74 +3520,57 @@ class TradingBotEngine:
         if self.monitoring_tick % 6 == 0:
              self.log("Check Cancel Condition")
 
-        cancel_unfilled_seconds = self.config.get('cancel_unfilled_seconds', 90)
+        cancel_unfilled_seconds = self._c_cancel_unfilled_seconds
         
-        with self.position_lock:
-             active_ids = list(self.pending_entry_ids)
-             details = dict(self.pending_entry_order_details)
+        # Published snapshots: plain reference loads, no lock and no copy
+        active_ids = self.pending_entry_ids
+        details = self.pending_entry_order_details
 
         if not active_ids:
             self.log("No Orders to cancel", level="debug")
             return
 
-        current_market_price = self._get_latest_data_and_indicators().get('current_price')
+        # Per-tick invariants: one clock read and one config read for the whole scan
+        now_ns = time.monotonic_ns()
+        cancel_limit_ns = int(cancel_unfilled_seconds * 1_000_000_000)
+        cancel_entry_below = self._c_cancel_entry_below
+        cancel_entry_above = self._c_cancel_entry_above
+
+        if not (cancel_entry_below or cancel_entry_above):
+            # Only the time limit can fire (typical config): skip the per-side price branches entirely
+            cancel_msg = f"Time Limit ({cancel_unfilled_seconds}s) reached"
+            cancelled = []
+            for order_id in active_ids:
+                d = details.get(order_id)
+                if d is None: continue
+                placed_at_ns = d.get('placed_at_mono_ns')
+                if placed_at_ns is not None and now_ns - placed_at_ns > cancel_limit_ns:
+                    if self._okx_cancel_order(self.config['symbol'], order_id, reason=cancel_msg):
+                        cancelled.append(order_id)
+            if cancelled:
+                self._drop_pending_entries(cancelled)
+            return
+
+        current_market_price = market_data.get('current_price') if market_data else None
         if not current_market_price: return
 
+        cancelled = []
         for order_id in active_ids:
-            if order_id not in details: continue
-            d = details[order_id]
+            d = details.get(order_id)
+            if d is None: continue
             
-            placed_at = d.get('placed_at')
+            placed_at_ns = d.get('placed_at_mono_ns')
             signal = d.get('signal') # 1 Long, -1 Short
             limit_price = d.get('limit_price')
             
             # 1. Time Check
-            time_passed = False
-            if placed_at and (datetime.now(timezone.utc) - placed_at).total_seconds() > cancel_unfilled_seconds:
-                time_passed = True
+            time_passed = placed_at_ns is not None and now_ns - placed_at_ns > cancel_limit_ns
             
             # self.log(f"Cancel-1:More than {cancel_unfilled_seconds} seconds: {'Yes' if time_passed else 'None'}")
-            
-            if time_passed:
-                reason = f"Time Limit ({cancel_unfilled_seconds}s) reached"
-                if self._okx_cancel_order(self.config['symbol'], order_id, reason=reason):
-                    with self.position_lock:
-                        if order_id in self.pending_entry_ids:
-                             self.pending_entry_ids.remove(order_id)
-                        if order_id in self.pending_entry_order_details:
-                             del self.pending_entry_order_details[order_id]
-                continue
 
-            # 2. TP Check (Missed Opportunity)
-            tp_offset = self.config.get('tp_price_offset', 0)
-            is_target_passed = False
-            pending_tp = 0.0
-            
-            if tp_offset and safe_float(tp_offset) > 0:
-                if signal == 1: # Long
-                    pending_tp = limit_price + tp_offset
-                    if current_market_price > pending_tp:
-                        is_target_passed = True
-                else: # Short
-                    pending_tp = limit_price - tp_offset
-                    if current_market_price < pending_tp:
-                        is_target_passed = True
-
-            # 3. Entry Check (Taker Avoidance / Directional Move)
-            is_entry_unfavorable = False
-            if signal == 1: # Long
-                # Cancel if Entry < Market (Price moved up, making order a taker or too high)
-                if current_market_price > limit_price:
-                    is_entry_unfavorable = True
-            else: # Short
-                # Cancel if Entry > Market (Price moved down, making order a taker or too low)
-                if current_market_price < limit_price:
-                    is_entry_unfavorable = True
-
-            # Execute Cancellation based on priority
-            should_cancel = False
-            cancel_msg = ""
-            
+            # 2. TP Check (Missed Opportunity) - disabled on client request, see the commented branches below
+            # 3. Entry Check (Taker Avoidance / Directional Move) - literal config checks below
+
             # Execute Cancellation based on literal config settings (Step 300)
             should_cancel = False
             cancel_msg = ""
@@ -2604,7 +3582,7 @@ class TradingBotEngine:
             # Short Specific (Literal Checks)
             elif signal == -1: 
                 # Cancel if Entry price is below market price (Literal config)
-                if self.config.get('cancel_on_entry_price_below_market') and limit_price < current_market_price:
+                if cancel_entry_below and limit_price < current_market_price:
                     should_cancel = True
                     cancel_msg = f"Short: Entry price below market (Entry {limit_price:.2f} < Market {current_market_price:.2f})"
                 
@@ -2619,7 +3597,7 @@ class TradingBotEngine:
             # Long Specific (Literal Checks)
             elif signal == 1:
                 # Cancel if Entry price is above market price
-                if self.config.get('cancel_on_entry_price_above_market') and limit_price > current_market_price:
+                if cancel_entry_above and limit_price > current_market_price:
                     should_cancel = True
                     cancel_msg = f"Long: Entry price above market (Entry {limit_price:.2f} > Market {current_market_price:.2f})"
                 
@@ -2634,47 +3612,45 @@ class TradingBotEngine:
             if should_cancel:
                 # self.log(f"Cancel Order {order_id} ({cancel_msg})") # Already logged in _okx_cancel_order now
                 if self._okx_cancel_order(self.config['symbol'], order_id, reason=cancel_msg):
-                    with self.position_lock:
-                        if order_id in self.pending_entry_ids:
-                             self.pending_entry_ids.remove(order_id)
-                        if order_id in self.pending_entry_order_details:
-                             del self.pending_entry_order_details[order_id]
+                    cancelled.append(order_id)
                 continue
-                 
-         # Clean up local tracking
-        with self.position_lock:
-             # Basic cleanup of IDs that are gone happens in account update, but we can fast track here if needed
-             pass
-
+        # One snapshot rebuild for the whole scan instead of one per cancelled order
+        if cancelled:
+            self._drop_pending_entries(cancelled)
+         # Clean up local tracking: IDs that are gone are pruned in the account update
 
     def _unified_management_loop(self):
         # High-reliability background management
         self.log("Unified management thread started.", level="debug")
-        last_account_sync = 0
+        last_account_sync = float('-inf')
+        next_stale_check = time.monotonic() + 30 # Deadline at which the price could first be 30s stale
         while not self.stop_event.is_set():
-            now = time.time()
+            now = time.monotonic()
             try:
                 # 1. High Frequency: Cancellation Check (every ~1s)
                 # Note: Only cancel if trading is active or we still have tracked pending orders
-                self._check_cancel_conditions()
+                # latest_trade_price is a single attribute read; no need for the locked indicator snapshot here
+                self._check_cancel_conditions({'current_price': self.latest_trade_price})
 
                 # 2. PnL-Based Auto-Exit Check
                 # Removed: This is now handled authoritatively in _fetch_and_emit_account_info
                 # to ensure atomic execution and correct 'Used Amount' calculation.
 
                 
-                # 3. Connection Health: Stale Price Monitor
-                price_age = now - self.last_price_update_time
-                if price_age > 30:
-                     self.log(f"WARNING: Market price is STALE ({price_age:.1f}s). Re-initializing WebSocket...", level="warning")
-                     # Reset update time to avoid spamming reconnects
-                     self.last_price_update_time = now 
-                     # Trigger reconnect by closing the current WebSocket
-                     if self.ws:
-                         try:
-                             self.ws.close()
-                         except:
-                             pass
+                # 3. Connection Health: Stale Price Monitor (only evaluated once its deadline is reached)
+                if now >= next_stale_check:
+                    price_age = now - self.last_price_update_time
+                    if price_age > 30:
+                         self.log(f"WARNING: Market price is STALE ({price_age:.1f}s). Re-initializing WebSocket...", level="warning")
+                         # Reset update time to avoid spamming reconnects
+                         self.last_price_update_time = now 
+                         # Trigger reconnect by closing the current WebSocket
+                         if self.ws:
+                             try:
+                                 self.ws.close()
+                             except:
+                                 pass
+                    next_stale_check = self.last_price_update_time + 30
                 
                 # 3. Lower Frequency: Account Info & Emitting (every ~3s)
                 # 3. Lower Frequency: Account Info & Emitting (every ~3s)
@@ -2688,7 +3664,13 @@ class TradingBotEngine:
             except Exception as e:
                 self.log(f"Error in unified mgmt loop: {e}", level="debug")
             
-            time.sleep(1) # Base tick rate
+            # Sleep until the next account sync is due; pending entries need the ~1s cancel cadence
+            loop_now = time.monotonic()
+            next_wait = min(3 - (loop_now - last_account_sync), next_stale_check - loop_now)
+            if self.pending_entry_ids:
+                next_wait = min(next_wait, 1.0)
+            self._mgmt_wakeup.wait(timeout=max(0.05, next_wait))
+            self._mgmt_wakeup.clear()
         self.log("Unified management thread stopped.", level="debug")
 
     def _main_trading_logic(self):
@@ -2724,7 +3706,7 @@ class TradingBotEngine:
                              self._initiate_entry_sequence(entry_info['limit_price'], entry_info['signal'], self.config['batch_size_per_loop'])
                         
                         # Wait Loop Time
-                        loop_time = self.config.get('loop_time_seconds', 10)
+                        loop_time = self._c_loop_time_seconds
                         self.log(f"Wait {loop_time} seconds (Post-Entry)")
                         time.sleep(loop_time)
                     else:
@@ -2737,16 +3719,13 @@ class TradingBotEngine:
                 
                 # 3. Delay before restarting cycle
                 # Use standard loop_time for consistent heartbeat
-                loop_time = self.config.get('loop_time_seconds', 10)
+                loop_time = self._c_loop_time_seconds
                 self.log(f"Wait {loop_time} seconds before meta-loop restart")
                 time.sleep(loop_time)
 
         except Exception as e:
             self.log(f"CRITICAL ERROR in _main_trading_logic: {e}", level="error")
 
-        except Exception as e:
-            self.log(f"CRITICAL ERROR in _main_trading_logic: {e}", level="error")
-
     def _initialize_websocket(self):
         ws_url = self._get_ws_url()
         try:
@@ -2764,6 +3743,7 @@ class TradingBotEngine:
 
     def _initialize_websocket_and_start_main_loop(self):
         self.log("OKX BOT STARTING", level="info")
+        self._start_ws_dispatch_thread()
         try:
             # Reconnection Loop for the WebSocket
             while not self.stop_event.is_set():
@@ -2778,7 +3758,7 @@ class TradingBotEngine:
                     self.log("Connecting to public market data...", level="debug")
                     
                     # Start the WebSocket in a separate thread (this runs the run_forever block)
-                    ws_watch_thread = threading.Thread(target=self.ws_client.run_forever, daemon=True)
+                    ws_watch_thread = threading.Thread(target=self.ws_client.run_forever, kwargs=_WS_RUN_OPTS, daemon=True)
                     ws_watch_thread.start()
                     self.log("WebSocket connection initiated.", level="debug")
 
@@ -2790,12 +3770,7 @@ class TradingBotEngine:
                         time.sleep(5)
                         continue
 
-                    # Fetch historical data for the selected timeframe - Fetch 300 candles for indicator safety
-                    timeframe = self.config.get('candlestick_timeframe', '1m')
-                    interval_sec = self.intervals.get(timeframe, 60)
-                    start_dt = datetime.now(timezone.utc) - timedelta(seconds=interval_sec * 300)
-                    end_dt = datetime.now(timezone.utc)
-                    self._fetch_initial_historical_data(self.config['symbol'], timeframe, start_dt.strftime('%Y-%m-%d'), end_dt.strftime('%Y-%m-%d'))
+                    self._load_startup_candles()
                     
                     self.bot_startup_complete = True
                     self.log("Bot startup sequence complete.", level="info")
@@ -2813,6 +3788,8 @@ class TradingBotEngine:
                         self.mgmt_thread = threading.Thread(target=self._unified_management_loop, daemon=True)
                         self.mgmt_thread.start()
 
+                    self._start_private_ws()
+
                     # Start trading logic
                     # This method now needs to respond to stop_event and WS closure
                     self._main_trading_logic()
@@ -2840,62 +3817,89 @@ class TradingBotEngine:
                     pass
             self.log("OKX BOT SHUTDOWN COMPLETE", level="info")
  
+    def _reset_fill_accumulator(self):
+        # Session window moved: fills are re-read from bot_start_time on the next reconcile
+        # (the trade totals themselves are reset by start() for a trading session)
+        self._last_fill_ts = 0
+        self._seen_fill_ids = {}
+        self._fills_session_pnl = 0.0
+
     def _calculate_net_profit_from_fills(self):
         # Fetch recent fills to calculate actual PnL
         try:
             params = {
                 "instType": "SWAP",
                 "instId": self.config['symbol'],
-                "limit": "100"
+                "limit": str(self.FILLS_PAGE_LIMIT)
             }
             # Use /trade/fills for recent activity (last 3 days)
             path_recent = "/api/v5/trade/fills"
-            response = self._okx_request("GET", path_recent, params=params)
-            
-            # Local session PnL (resets every start)
-            session_pnl = 0.0
-            
-            if response and response.get('code') == '0':
+
+            # Fetch only fills from current session for 'self.net_profit' (Auto-Exit trigger)
+            # Loosen by 5 seconds to capture trades closed right at bot start/restart
+            start_time_limit = self.bot_start_time - 5000
+
+            # Incremental: OKX returns fills newest-first. Count every fill whose id hasn't been seen, paging
+            # back with `after` until a fill older than the newest one already counted (or than the session)
+            # shows up, so a burst larger than one page is never skipped.
+            last_seen_ts = self._last_fill_ts
+            seen_ids = self._seen_fill_ids
+            new_count = 0
+            newest_ts = last_seen_ts
+            complete = False # Scan reached counted history, the session start or the end of OKX's fill history
+
+            while True:
+                response = self._okx_request("GET", path_recent, params=params)
+                if not response or response.get('code') != '0':
+                    break # Retried next pass; ids already counted stay deduped
                 fills = response.get('data', [])
-                
-                # Fetch only fills from current session for 'self.net_profit' (Auto-Exit trigger)
-                # Loosen by 5 seconds to capture trades closed right at bot start/restart
-                start_time_limit = self.bot_start_time - 5000
-
-                # Reset persistent trade analytics before re-calculating from the limit window (Simple approach)
-                # Note: In a production bot, we'd append new fills to a database.
-                # Here we strictly scan the last 100 fills to determine Win/Loss/Net for the symbol.
-                temp_total_profit = 0.0
-                temp_total_loss = 0.0
+
                 fill_count = 0
-                
                 for fill in fills:
-                     fill_ts = int(fill.get('ts', 0))
-                     if fill_ts >= start_time_limit:
-                         fill_count += 1
-                         pnl = safe_float(fill.get('pnl', 0))
-                         fee = safe_float(fill.get('fee', 0))
-                         fill_net = pnl + fee
-                         session_pnl += fill_net
-
-                         # Realized Analytics: Only count fills where a position was actually reduced or closed (pnl != 0)
-                         # This prevents entry fees from showing up as "Trade Loss" before any trades are closed.
-                         if pnl != 0:
-                             if fill_net > 0:
-                                 temp_total_profit += fill_net
-                             else:
-                                 temp_total_loss += abs(fill_net)
-                
-                if fill_count > 0:
-                    self.log(f"DEBUG: Processed {fill_count} session fills. Temp Net: {temp_total_profit - temp_total_loss:.2f}", level="debug")
-
-                self.total_trade_profit = temp_total_profit
-                self.total_trade_loss = temp_total_loss
-                self.net_trade_profit = temp_total_profit - temp_total_loss
+                     fill_ts = safe_int(fill.get('ts'), 0)
+                     if fill_ts < last_seen_ts or fill_ts < start_time_limit:
+                         complete = True
+                         break
+                     fill_id = fill.get('billId') or fill.get('tradeId')
+                     if fill_id in seen_ids:
+                         continue
+                     seen_ids[fill_id] = fill_ts
+                     if fill_ts > newest_ts:
+                         newest_ts = fill_ts
+                     fill_count += 1
+                     pnl = safe_float(fill.get('pnl', 0))
+                     fee = safe_float(fill.get('fee', 0))
+                     fill_net = pnl + fee
+                     self._fills_session_pnl += fill_net
+
+                     # Realized Analytics: Only count fills where a position was actually reduced or closed (pnl != 0)
+                     # This prevents entry fees from showing up as "Trade Loss" before any trades are closed.
+                     if pnl != 0:
+                         if fill_net > 0:
+                             self.total_trade_profit += fill_net
+                         else:
+                             self.total_trade_loss += abs(fill_net)
+                new_count += fill_count
+
+                if complete or len(fills) < self.FILLS_PAGE_LIMIT or not fills[-1].get('billId'):
+                    complete = True
+                    break
+                params["after"] = fills[-1]['billId'] # Next (older) page
+
+            # Only advance the cutoff after a complete scan; an interrupted one is redone next pass from the
+            # old cutoff, with the ids keeping it from double counting. Ids older than the cutoff are never
+            # looked at again, so they are dropped.
+            if complete and newest_ts > last_seen_ts:
+                self._last_fill_ts = newest_ts
+                self._seen_fill_ids = {k: ts for k, ts in seen_ids.items() if ts >= newest_ts}
+
+            if new_count > 0:
+                self.net_trade_profit = self.total_trade_profit - self.total_trade_loss
+                if self._debug_enabled:
+                    self.log(f"DEBUG: Processed {new_count} new session fills. Net: {self.net_trade_profit:.2f}", level="debug")
                 # self.net_profit = session_pnl # REMOVED: User wants Net Profit to be UPL for open positions only
-                
-                self._save_analytics()
-            return session_pnl
+                # analytics.json only holds daily_reports, which fills never touch; saved by the daily report
+            return self._fills_session_pnl
 
         except Exception as e:
             self.log(f"Exception in _calculate_net_profit_from_fills: {e}", level="error")
@@ -2911,6 +3915,7 @@ class TradingBotEngine:
                     self.daily_reports = data.get('daily_reports', [])
             else:
                 self.daily_reports = []
+            self._last_analytics_key = json_dumps_compact({'daily_reports': self.daily_reports})
         except Exception as e:
             self.log(f"Error loading analytics: {e}", level="error")
 
@@ -2920,8 +3925,16 @@ class TradingBotEngine:
             data = {
                 'daily_reports': self.daily_reports
             }
-            with open(self.analytics_path, 'w') as f:
+            # Skip the disk write when the content matches what was last loaded/saved
+            key = json_dumps_compact(data)
+            if key == self._last_analytics_key:
+                return
+            # Write to a temp file and swap it in so a crash never leaves a truncated analytics.json
+            tmp_path = self.analytics_path + '.tmp'
+            with open(tmp_path, 'w') as f:
                 json.dump(data, f, indent=4)
+            os.replace(tmp_path, self.analytics_path)
+            self._last_analytics_key = key
         except Exception as e:
             self.log(f"Error saving analytics: {e}", level="error")
 
@@ -2971,7 +3984,33 @@ class TradingBotEngine:
             except Exception as e:
                 self.log(f"Error in periodic account info update: {e}", level="error")
             finally:
-                time.sleep(self.config.get('account_update_interval_seconds', 10))
+                time.sleep(self._c_account_update_interval)
+
+    def _adopt_pending_order(self, order, contract_size):
+        """Starts tracking an exchange-side entry order the bot did not place in this session."""
+        ord_id = order.get('ordId') or order.get('algoId')
+        if ord_id in self.pending_entry_ids:
+            return
+        with self.pending_lock:
+            if ord_id in self.pending_entry_ids:
+                return
+            self.pending_entry_ids = self.pending_entry_ids | {ord_id}
+            now_ms = time.time() * 1000
+            c_time_ms = int(order.get('cTime', now_ms))
+            # Map the exchange creation time onto the monotonic clock once, at adoption
+            age_ns = max(0, int((now_ms - c_time_ms) * 1_000_000))
+            side_raw = order.get('side')
+            self.pending_entry_order_details = {**self.pending_entry_order_details, ord_id: {
+                'order_id': ord_id,
+                'side': side_raw.capitalize(),
+                'qty': safe_float(order.get('sz')) * contract_size,
+                'limit_price': safe_float(order.get('px')),
+                'signal': 1 if side_raw == 'buy' else -1,
+                'order_type': order.get('ordType', 'Limit'),
+                'status': order.get('state'),
+                'placed_at_ts': c_time_ms / 1000.0,
+                'placed_at_mono_ns': time.monotonic_ns() - age_ns
+            }}
 
     def _sync_account_data(self):
         """
@@ -3005,67 +4044,66 @@ class TradingBotEngine:
             self.available_balance = found_avail_bal
             self.total_equity = found_total_eq
 
-        # 2. Fetch open orders (pending orders)
-        path_pending_orders = "/api/v5/trade/orders-pending"
-        params_pending_orders = {"instType": "SWAP", "instId": self.config['symbol']}
-        response_pending_orders = self._okx_request("GET", path_pending_orders, params=params_pending_orders)
-        
+        # 2. Open orders (pending orders): the private orders stream keeps a local book; REST only reconciles
+        pending_orders = None
+        now = time.monotonic()
+        if self._orders_ws_ready.is_set() and now - self._last_rest_orders_sync < 60:
+            with self._ws_orders_lock:
+                pending_orders = list(self._ws_open_orders.values())
+        else:
+            path_pending_orders = "/api/v5/trade/orders-pending"
+            params_pending_orders = {"instType": "SWAP", "instId": self.config['symbol']}
+            fetch_ms = int(time.time() * 1000) + self.server_time_offset
+            response_pending_orders = self._okx_request("GET", path_pending_orders, params=params_pending_orders)
+            if response_pending_orders and response_pending_orders.get('code') == '0':
+                self._last_rest_orders_sync = now
+                with self._ws_orders_lock:
+                    pending_orders = self._merge_rest_open_orders(response_pending_orders.get('data', []), fetch_ms)
+
         formatted_open_trades = []
-        if response_pending_orders and response_pending_orders.get('code') == '0':
-            pending_orders = response_pending_orders.get('data', [])
-            contract_size = self.product_info.get('contractSize', 1.0)
-            if contract_size <= 0: contract_size = 1.0
+        stake_sum = 0.0
+        if pending_orders:
+            contract_size = self._pi_contract_size
+            # Per-cycle invariants: one config read and one clock read for all rows
+            cancel_unfilled_seconds = self._c_cancel_unfilled_seconds
+            now_ns = time.monotonic_ns()
 
             for order in pending_orders:
-                ord_id = order.get('ordId') or order.get('algoId')
-                
+                g = order.get
                 # Exclude Reduce-Only orders (Exits) from being adopted as Pending Entries
-                if order.get('reduceOnly') == 'true':
+                if g('reduceOnly') == 'true':
                     continue
+                ord_id = g('ordId') or g('algoId')
                 
                 # Adoption Logic
-                with self.position_lock:
-                    if ord_id not in self.pending_entry_ids:
-                        self.pending_entry_ids.append(ord_id)
-                        c_time_ms = int(order.get('cTime', time.time() * 1000))
-                        placed_at_dt = datetime.fromtimestamp(c_time_ms / 1000.0, tz=timezone.utc)
-                        self.pending_entry_order_details[ord_id] = {
-                            'order_id': ord_id,
-                            'side': order.get('side').capitalize(),
-                            'qty': safe_float(order.get('sz')) * contract_size,
-                            'limit_price': safe_float(order.get('px')),
-                            'signal': 1 if order.get('side') == 'buy' else -1,
-                            'order_type': order.get('ordType', 'Limit'),
-                            'status': order.get('state'),
-                            'placed_at': placed_at_dt
-                        }
+                self._adopt_pending_order(order, contract_size)
 
                 # Time left logic
                 time_left = None
-                cancel_unfilled_seconds = self.config.get('cancel_unfilled_seconds', 90)
-                current_placed_at = None
-                with self.position_lock:
-                    if ord_id in self.pending_entry_order_details:
-                         current_placed_at = self.pending_entry_order_details[ord_id].get('placed_at')
+                current_placed_ns = self.pending_entry_order_details.get(ord_id, {}).get('placed_at_mono_ns')
 
-                if current_placed_at:
-                    seconds_passed = (datetime.now(timezone.utc) - current_placed_at).total_seconds()
+                if current_placed_ns is not None:
+                    seconds_passed = (now_ns - current_placed_ns) / 1_000_000_000
                     time_left = max(0, int(cancel_unfilled_seconds - seconds_passed))
 
+                px = safe_float(g('px'))
+                stake = safe_float(g('sz')) * px * contract_size
+                stake_sum += stake
                 formatted_open_trades.append({
-                    'type': order.get('side').capitalize(),
+                    'type': g('side').capitalize(),
                     'id': ord_id,
-                    'entry_spot_price': safe_float(order.get('px')),
-                    'stake': safe_float(order.get('sz')) * safe_float(order.get('px')) * contract_size,
+                    'entry_spot_price': px,
+                    'stake': stake,
                     'tp_price': None,
                     'sl_price': None,
-                    'status': order.get('state'),
-                    'instId': order.get('instId'),
+                    'status': g('state'),
+                    'instId': g('instId'),
                     'time_left': time_left
                 })
         
-        with self.trade_data_lock:
-            self.open_trades = formatted_open_trades
+        # Single atomic rebind publishes the new set; readers just load the attribute
+        self.open_trades = tuple(formatted_open_trades)
+        self._open_trades_stake_sum = stake_sum
             
         # 3. Fetch open positions
         path_positions = "/api/v5/account/positions"
@@ -3078,55 +4116,57 @@ class TradingBotEngine:
         temp_unrealized_pnl = 0.0
         temp_used_notional = 0.0
 
+        # Filter by symbol and non-zero size before taking the lock
+        relevant_positions = []
+        if response_positions and response_positions.get('code') == '0':
+            symbol = self.config['symbol']
+            relevant_positions = [p for p in response_positions.get('data', [])
+                                  if p.get('instId') == symbol and safe_float(p.get('pos')) != 0]
+
         with self.position_lock:
-            prev_qtys = {k: v for k, v in self.position_qty.items()}
             found_sides = set()
-            contract_size = self.product_info.get('contractSize', 1.0)
+            contract_size = self._pi_contract_size
 
-            if response_positions and response_positions.get('code') == '0':
-                positions_data = response_positions.get('data', [])
+            for pos in relevant_positions:
+                # --- Metric Calculation (Moved from Logic Loop) ---
+                current_mkt_price = self.latest_trade_price if self.latest_trade_price else safe_float(pos.get('avgPx'))
+                pos_sz_notional = abs(safe_float(pos.get('pos'))) * current_mkt_price * contract_size
                 
-                for pos in positions_data:
-                    # Filter by symbol and non-zero size
-                    if pos.get('instId') == self.config['symbol'] and safe_float(pos.get('pos')) != 0:
-                        
-                        # --- Metric Calculation (Moved from Logic Loop) ---
-                        current_mkt_price = self.latest_trade_price if self.latest_trade_price else safe_float(pos.get('avgPx'))
-                        pos_sz_notional = abs(safe_float(pos.get('pos'))) * current_mkt_price * contract_size
-                        
-                        # Only count towards 'Used' if bot running, but always count for Size/PnL
-                        if self.is_running:
-                            temp_used_notional += pos_sz_notional
-                        
-                        temp_pos_notional += pos_sz_notional
-                        temp_unrealized_pnl += safe_float(pos.get('upl', '0'))
-                        temp_active_count += 1
-                        # --------------------------------------------------
-
-                        raw_side = pos.get('posSide', 'net')
-                        side_key = 'long'
-                        if raw_side == 'short': side_key = 'short'
-                        elif raw_side == 'net':
-                            side_key = self.config.get('direction', 'long')
-                            if side_key == 'both': side_key = 'long'
-
-                        found_sides.add(side_key)
-                        new_qty = safe_float(pos.get('pos')) * contract_size
-                        
-                        if abs(new_qty - prev_qtys.get(side_key, 0.0)) > 0.000001:
-                            self.log(f"Position update [{side_key.upper()}]: {prev_qtys.get(side_key, 0.0)} -> {new_qty}. Syncing TP/SL...", level="debug")
-                            self._should_update_tpsl = True
-                            if abs(new_qty) > abs(prev_qtys.get(side_key, 0.0)):
-                                self.total_trades_count += 1
-                        
-                        if self.current_take_profit[side_key] == 0 or self.current_stop_loss[side_key] == 0:
-                             self._should_update_tpsl = True
-
-                        self.in_position[side_key] = True
-                        self.position_entry_price[side_key] = safe_float(pos.get('avgPx'))
-                        self.position_qty[side_key] = new_qty
-                        self.position_liq[side_key] = safe_float(pos.get('liqp', '0'))
-                        self.position_details[side_key] = pos 
+                # Only count towards 'Used' if bot running, but always count for Size/PnL
+                if self.is_running:
+                    temp_used_notional += pos_sz_notional
+                
+                temp_pos_notional += pos_sz_notional
+                temp_unrealized_pnl += safe_float(pos.get('upl', '0'))
+                temp_active_count += 1
+                # --------------------------------------------------
+
+                raw_side = pos.get('posSide', 'net')
+                side_key = 'long'
+                if raw_side == 'short': side_key = 'short'
+                elif raw_side == 'net':
+                    side_key = self.config.get('direction', 'long')
+                    if side_key == 'both': side_key = 'long'
+
+                found_sides.add(side_key)
+                new_qty = safe_float(pos.get('pos')) * contract_size
+                prev_qty = self.position_qty.get(side_key, 0.0)
+                
+                if abs(new_qty - prev_qty) > 0.000001:
+                    if self._debug_enabled:
+                        self.log(f"Position update [{side_key.upper()}]: {prev_qty} -> {new_qty}. Syncing TP/SL...", level="debug")
+                    self._should_update_tpsl = True
+                    if abs(new_qty) > abs(prev_qty):
+                        self.total_trades_count += 1
+                
+                if self.current_take_profit[side_key] == 0 or self.current_stop_loss[side_key] == 0:
+                     self._should_update_tpsl = True
+
+                self.in_position[side_key] = True
+                self.position_entry_price[side_key] = safe_float(pos.get('avgPx'))
+                self.position_qty[side_key] = new_qty
+                self.position_liq[side_key] = safe_float(pos.get('liqp', '0'))
+                self.position_details[side_key] = pos 
             
             # Close detection logic
             for s in ['long', 'short']:
@@ -3162,29 +4202,17 @@ class TradingBotEngine:
             
             # Emit combined position update
             display_side = 'long' if self.in_position['long'] else ('short' if self.in_position['short'] else 'long')
-            self.emit('position_update', {
-                'in_position': self.in_position[display_side],
-                'position_entry_price': self.position_entry_price[display_side],
-                'position_qty': self.position_qty[display_side],
-                'current_take_profit': self.current_take_profit[display_side],
-                'current_stop_loss': self.current_stop_loss[display_side],
-                'positions': {
-                    'long': {
-                        'in': self.in_position['long'],
-                        'qty': self.position_qty['long'],
-                        'price': self.position_entry_price['long'],
-                        'liq': self.position_liq['long'],
-                        'sl': self.current_stop_loss['long']
-                    },
-                    'short': {
-                        'in': self.in_position['short'],
-                        'qty': self.position_qty['short'],
-                        'price': self.position_entry_price['short'],
-                        'liq': self.position_liq['short'],
-                        'sl': self.current_stop_loss['short']
-                    }
-                }
-            })
+            # Skip the emit when no position field changed since the last one; still resend every 30s
+            pos_key = tuple(
+                (self.in_position[s], self.position_qty[s], self.position_entry_price[s], self.position_liq[s],
+                 self.current_take_profit[s], self.current_stop_loss[s])
+                for s in ('long', 'short')
+            )
+            pos_now = time.monotonic()
+            if pos_key != self._last_pos_key or pos_now - self._last_pos_emit >= 30:
+                self._last_pos_key = pos_key
+                self._last_pos_emit = pos_now
+                self._emit_position_update(display_side)
 
             # Store cached metrics
             self.cached_active_positions_count = temp_active_count
@@ -3193,28 +4221,44 @@ class TradingBotEngine:
             self.cached_used_notional = temp_used_notional # Before adding pending orders
 
         # Sync pending_entry_ids
-        active_okx_ids = [t['id'] for t in formatted_open_trades]
-        with self.position_lock:
-            existing_pending = list(self.pending_entry_ids)
-            for p_id in existing_pending:
-                if p_id not in active_okx_ids:
-                    self.pending_entry_ids.remove(p_id)
-                    if p_id in self.pending_entry_order_details:
-                        del self.pending_entry_order_details[p_id]
-                    self.log(f"Pending order {p_id} cleared from tracking.", level="debug")
-                    self._should_update_tpsl = True
+        active_okx_ids = {t['id'] for t in formatted_open_trades}
+        for p_id in self._drop_pending_entries(self.pending_entry_ids - active_okx_ids):
+            self.log(f"Pending order {p_id} cleared from tracking.", level="debug")
+            self._should_update_tpsl = True
 
-        if getattr(self, '_should_update_tpsl', False) and any(self.in_position.values()) and self.is_running:
+        pos_snap = self._pos_snapshot
+        if self._should_update_tpsl and (pos_snap['long']['in_position'] or pos_snap['short']['in_position']) and self.is_running:
             self._should_update_tpsl = False
             # Call TP/SL modification to sync with new average price
-            threading.Thread(target=self.batch_modify_tpsl, daemon=True).start()
+            self._request_tpsl_sync()
         else:
              # Logic to capture initial capital if needed
              if self.initial_total_capital <= 0 and self.account_balance > 0:
                   self.initial_total_capital = self.account_balance
         
         # Calculate Need Add metrics (Viz) - Moved here to ensure update during UI-only loops
-        self._calculate_need_add_metrics(getattr(self, 'cached_pos_notional', 0.0))
+        cached_pos_notional = self.cached_pos_notional
+        if cached_pos_notional > 0:
+            self._calculate_need_add_metrics(cached_pos_notional)
+        else:
+            self.need_add_usdt_profit_target = self.need_add_usdt_above_zero = 0.0 # Idle tick: no call needed
+            self._need_add_cache_key = None
+
+    def _emit_position_update(self, display_side):
+        """Refreshes the persistent position_update payload in place and emits it; runs under position_lock."""
+        pos_payload = self._pos_payload
+        pos_payload['in_position'] = self.in_position[display_side]
+        pos_payload['position_entry_price'] = self.position_entry_price[display_side]
+        pos_payload['position_qty'] = self.position_qty[display_side]
+        pos_payload['current_take_profit'] = self.current_take_profit[display_side]
+        pos_payload['current_stop_loss'] = self.current_stop_loss[display_side]
+        for s, side_payload in self._pos_side_payloads.items():
+            side_payload['in'] = self.in_position[s]
+            side_payload['qty'] = self.position_qty[s]
+            side_payload['price'] = self.position_entry_price[s]
+            side_payload['liq'] = self.position_liq[s]
+            side_payload['sl'] = self.current_stop_loss[s]
+        self.emit('position_update', pos_payload)
 
     def _execute_position_management(self):
         """
@@ -3223,47 +4267,47 @@ class TradingBotEngine:
         CONTAINS CRITICAL FIX FOR AUTO-ADD GATING.
         """
         # Recover metrics from Sync Phase
-        used_amount_notional = getattr(self, 'cached_used_notional', 0.0)
-        okx_pos_notional = getattr(self, 'cached_pos_notional', 0.0)
-        total_unrealized_pnl = getattr(self, 'cached_unrealized_pnl', 0.0)
-        active_positions_count = getattr(self, 'cached_active_positions_count', 0)
+        used_amount_notional = self.cached_used_notional
+        okx_pos_notional = self.cached_pos_notional
+        total_unrealized_pnl = self.cached_unrealized_pnl
+        active_positions_count = self.cached_active_positions_count
+        # One lock-free read of the published position state for the whole pass
+        pos_snap = self._pos_snapshot
         
         # Add pending orders to Used Amount
-        with self.trade_data_lock:
-            for trade in self.open_trades:
-                 used_amount_notional += trade['stake']
+        # Stake total is accumulated by the sync while it rebuilds open_trades: O(1), lock-free read
+        used_amount_notional += self._open_trades_stake_sum
 
         # Metric Calculations
-        max_allowed_config = float(self.config.get('max_allowed_used', 1000.0))
+        max_allowed_config = self._c_max_allowed_used
         max_allowed_margin = max_allowed_config
         if self.total_equity > 0 and max_allowed_config > self.total_equity:
             max_allowed_margin = self.total_equity
             
-        rate_divisor = self.config['rate_divisor']
+        rate_divisor = self._c_rate_divisor
         max_amount_margin = max_allowed_margin / rate_divisor
         max_allowed_display = max_allowed_margin
         max_amount_display = max_amount_margin
         
-        leverage = float(self.config.get('leverage', 1))
-        if leverage <= 0: leverage = 1
+        leverage = self._c_leverage
         
         remaining_amount_notional = max(0.0, (max_amount_margin * leverage) - used_amount_notional)
         
-        with self.position_lock:
+        with self.notional_lock:
             self.used_amount_notional = used_amount_notional
 
         # Net Profit & Fee Calculation (CENTRALIZED)
-        trade_fee_pct = self.config.get('trade_fee_percentage', 0.08) / 100.0
+        trade_fee_pct = self._c_trade_fee_pct
+        # Position fee is invariant for the whole pass; every exit mode below reuses it
+        current_size_fee = okx_pos_notional * trade_fee_pct if okx_pos_notional > 0 else 0.0
         
         # 1. Size-Based Fees (Active Position only)
-        self.size_fees = okx_pos_notional * trade_fee_pct
+        self.size_fees = current_size_fee
         
         # 2. Used-Based Fees (Active + Pending)
         self.used_fees = used_amount_notional * trade_fee_pct
         
-        # 3. Total Fee (Alias for used_fees or historical session fees depending on context)
-        # For the dashboard, trade_fees usually refers to session-wide or current exposure fees.
-        self.trade_fees = self.used_fees
+        # 3. Total Fee: trade_fees is set once with the emitter metrics below (size-based), not here
         
         # Real-time Net Profit (Floating)
         self.net_profit = total_unrealized_pnl - self.size_fees
@@ -3277,27 +4321,35 @@ class TradingBotEngine:
             self.last_add_price = 0.0
         else:
             # Sync last_add_price
-            with self.position_lock:
-                current_side = 'long' if self.in_position['long'] else 'short'
-                current_avg = self.position_entry_price.get(current_side, 0.0)
-                if self.last_add_price == 0:
-                    self.last_add_price = current_avg
+            current_side = 'long' if pos_snap['long']['in_position'] else 'short'
+            if self.last_add_price == 0:
+                self.last_add_price = pos_snap[current_side]['entry_price']
             
             base_capital = self.total_equity
             self.total_capital_2nd = max(0.0, base_capital - self.cumulative_margin_used)
 
+        # Store metrics for Emitter
+        self.max_allowed_display = max_allowed_display
+        self.max_amount_display = max_amount_display
+        self.remaining_amount_notional = remaining_amount_notional
+        self.trade_fees = current_size_fee # Corrected: trade_fee_pct already decimal
+
+        # Flat account: auto-margin, auto-add and every position-based exit need an open position;
+        # only Auto-Manual can act without one, so the rest of the pass is skipped unless it is on
+        if active_positions_count == 0 and not self._c_use_pnl_auto_manual:
+            return
+
         # ---------------------------------------------------------
         # AUTO-MARGIN LOGIC (Iterate active sides)
         # ---------------------------------------------------------
-        if self.config.get('use_auto_margin', False):
-            for side_key in ['long', 'short']:
-                if self.in_position[side_key]:
-                    pos = self.position_details.get(side_key, {})
-                    liqp = self.position_liq[side_key]
-                    mgn_mode = pos.get('mgnMode', 'cross')
+        if self._c_use_auto_margin:
+            for side_key in ('long', 'short'):
+                side_snap = pos_snap[side_key]
+                if side_snap['in_position']:
+                    liqp = side_snap['liq']
                     
-                    if mgn_mode == 'isolated' and liqp > 0:
-                        sl_price = self.current_stop_loss[side_key]
+                    if side_snap['mgn_mode'] == 'isolated' and liqp > 0:
+                        sl_price = side_snap['stop_loss']
                         should_add = False
                         
                         if side_key == 'long':
@@ -3306,10 +4358,10 @@ class TradingBotEngine:
                             if sl_price > 0 and liqp <= sl_price: should_add = True
                         
                         if should_add:
-                            offset = self.config.get('auto_margin_offset', 30.0)
+                            offset = self._c_auto_margin_offset
                             diff = abs(sl_price - liqp)
                             add_amt = diff + offset
-                            raw_side = pos.get('posSide', 'net')
+                            raw_side = side_snap['pos_side']
                             self.log(f"AUTO-MARGIN TRIGGERED [{side_key.upper()}]: Liq:{liqp} | SL:{sl_price} | Adding:{add_amt:.2f}", level="warning")
                             self._okx_adjust_margin(self.config['symbol'], raw_side, add_amt)
 
@@ -3320,21 +4372,20 @@ class TradingBotEngine:
         if not self.authoritative_exit_in_progress and okx_pos_notional > 0:
             
             # [CRITICAL FIX] Gate the logic with configuration check
-            if self.config.get('use_add_pos_auto_cal', False):
+            if self._c_use_add_pos_auto_cal:
                 
                 # ... (Existing Auto-Add Gap Logic) ...
                 current_side = None
-                with self.position_lock:
-                     if self.in_position['long']: current_side = 'long'
-                     elif self.in_position['short']: current_side = 'short'
+                if pos_snap['long']['in_position']: current_side = 'long'
+                elif pos_snap['short']['in_position']: current_side = 'short'
                 
                 if current_side:
                      current_price = self.latest_trade_price
                      if self.last_add_price == 0:
-                         self.last_add_price = self.position_entry_price[current_side]
+                         self.last_add_price = pos_snap[current_side]['entry_price']
 
                      if current_price:
-                          gap_threshold = self.config.get('add_pos_gap_threshold', 5.0)
+                          gap_threshold = self._c_add_pos_gap_threshold
                           price_diff = 0.0
                           if current_side == 'long':
                               price_diff = self.last_add_price - current_price
@@ -3355,220 +4406,168 @@ class TradingBotEngine:
         # ---------------------------------------------------------
         auto_exit_triggered = False
         exit_reason = ""
-        current_size_fee = okx_pos_notional * trade_fee_pct if okx_pos_notional > 0 else 0.0
 
-        # Check Auto-Manual Profit
-        if self.config.get('use_pnl_auto_manual', False):
-             manual_threshold = self.config.get('pnl_auto_manual_threshold', 100.0)
-             if self.net_profit >= manual_threshold:
-                 auto_exit_triggered = True
-                 exit_reason = f"Auto-Manual Profit Target: ${self.net_profit:.2f} >= ${manual_threshold:.2f}"
-
-        # Check Auto-Cal Profit
-        if not auto_exit_triggered and self.config.get('use_pnl_auto_cal', False) and okx_pos_notional > 0:
-            cal_times = self.config.get('pnl_auto_cal_times', 4)
-            current_size_fee = okx_pos_notional * trade_fee_pct
-            cal_threshold = cal_times * current_size_fee
-            if self.net_profit >= cal_threshold:
-                auto_exit_triggered = True
-                exit_reason = f"Auto-Cal Profit Target: ${self.net_profit:.2f} >= ${cal_threshold:.2f} ({cal_times}x Fee)"
-
-        # Check Auto-Cal Loss (Close All)
-        if not auto_exit_triggered and self.config.get('use_pnl_auto_cal_loss', False) and okx_pos_notional > 0:
-            loss_times = self.config.get('pnl_auto_cal_loss_times', 1.5)
-            current_size_fee = okx_pos_notional * trade_fee_pct
-            loss_threshold = -(current_size_fee * loss_times)
-            if self.net_profit <= loss_threshold:
-                auto_exit_triggered = True
-                exit_reason = f"Auto-Cal Loss Target: ${self.net_profit:.2f} <= ${loss_threshold:.2f} ({loss_times}x Fee)"
-
-        # Check Auto-Cal Size (Profit)
-        if not auto_exit_triggered and self.config.get('use_size_auto_cal', False) and okx_pos_notional > 0:
-            size_times = self.config.get('size_auto_cal_times', 2.0)
-            current_size_fee = okx_pos_notional * trade_fee_pct
-            size_target = current_size_fee * size_times
-            if self.net_profit >= size_target:
-                auto_exit_triggered = True
-                exit_reason = f"Auto-Cal Size Target: ${self.net_profit:.2f} >= ${size_target:.2f} ({size_times}x Size Fee)"
-
-        # Check Auto-Cal Size (Loss)
-        if not auto_exit_triggered and self.config.get('use_size_auto_cal_loss', False) and okx_pos_notional > 0:
-            size_loss_times = self.config.get('size_auto_cal_loss_times', 1.5)
-            current_size_fee = okx_pos_notional * trade_fee_pct
-            size_loss_threshold = -(current_size_fee * size_loss_times)
-            if self.net_profit <= size_loss_threshold:
-                auto_exit_triggered = True
-                exit_reason = f"Auto-Cal Size Loss Target: ${self.net_profit:.2f} <= ${size_loss_threshold:.2f} ({size_loss_times}x Size Fee)"
-
-        # MODE 2: Profit Target Exit (Unrealized PnL >= Size × Fee% × Multiplier)
-        if not auto_exit_triggered and self.config.get('use_add_pos_profit_target', False) and okx_pos_notional > 0:
-            profit_mult = self.config.get('add_pos_profit_multiplier', 1.5)
-            # current_size_fee calculated above in line 3373
-            target_pnl = current_size_fee * profit_mult
-            
-            # Detailed logging every few ticks for debugging
-            if self.monitoring_tick % 5 == 0:
-                self.log(f"[Mode 2 Check] Size: ${okx_pos_notional:.2f} | Fee%: {trade_fee_pct}% | Fee: ${current_size_fee:.4f} | Target: ${target_pnl:.4f} | Unrealized PnL: ${total_unrealized_pnl:.4f}", level="debug")
-            
-            # SAFETY CHECK: Only exit if PnL is POSITIVE and >= target
-            if total_unrealized_pnl > 0 and total_unrealized_pnl >= target_pnl:
-                auto_exit_triggered = True
-                exit_reason = f"Mode 2 Profit Target: Unrealized ${total_unrealized_pnl:.2f} >= ${target_pnl:.2f} ({profit_mult}x Fee)"
-
-        # MODE 1: Break-Even Exit (PnL Above Zero)
-        if not auto_exit_triggered and self.config.get('use_add_pos_above_zero', False) and okx_pos_notional > 0:
-             # current_size_fee calculated above in line 3373
-             near_zero_threshold = max(1.0, current_size_fee * 0.1)
-             if self.net_profit >= -near_zero_threshold:
-                 auto_exit_triggered = True
-                 exit_reason = f"Mode 1 PnL Above Zero: Net ${self.net_profit:.2f} ≈ $0"
+        if self._c_any_auto_exit:
+            has_position = okx_pos_notional > 0
+            for mode, k in self._c_auto_exit_ladder:
+                direction, needs_position, reason_fmt = _AUTO_EXIT_RULES[mode]
+                if needs_position and not has_position:
+                    continue
+                pnl = self.net_profit
+                if mode == 'manual':
+                    thr = k
+                elif mode == 'mode_1':
+                    # MODE 1: Break-Even Exit, within $1 or 10% of the size fee of zero
+                    thr = -max(1.0, current_size_fee * 0.1)
+                else:
+                    # Fee-based targets: +k x fee for profit, -k x fee for loss
+                    thr = direction * k * current_size_fee
+                if mode == 'mode_2':
+                    # MODE 2: Profit Target Exit (Unrealized PnL >= Size × Fee% × Multiplier)
+                    pnl = total_unrealized_pnl
+                    target_pnl = thr
+                    # Detailed logging every few ticks for debugging
+                    if self._debug_enabled and self.monitoring_tick % 5 == 0:
+                        self.log(f"[Mode 2 Check] Size: ${okx_pos_notional:.2f} | Fee%: {trade_fee_pct}% | Fee: ${current_size_fee:.4f} | Target: ${target_pnl:.4f} | Unrealized PnL: ${total_unrealized_pnl:.4f}", level="debug")
+                    # SAFETY CHECK: Only exit if PnL is POSITIVE and >= target
+                    if pnl <= 0:
+                        continue
+                if direction * (pnl - thr) >= 0:
+                    auto_exit_triggered = True
+                    exit_reason = reason_fmt.format(pnl=pnl, thr=thr, k=k)
+                    break
 
         # ---------------------------------------------------------
         # Execute Authoritative Auto-Exit
         # ---------------------------------------------------------
-        if auto_exit_triggered:
+        # Unlocked pre-check skips exit_lock while an exit is already running; the locked re-check stays authoritative
+        if auto_exit_triggered and not self.authoritative_exit_in_progress and not self._exit_queued:
              with self.exit_lock:
-                 if not self.authoritative_exit_in_progress:
+                 if not self.authoritative_exit_in_progress and not self._exit_queued:
+                     self._exit_queued = True # Later triggers coalesce into this one until it starts
                      self.log(f"[TARGET] AUTHORITATIVE AUTO-EXIT TRIGGERED: {exit_reason}", level="WARNING")
                      # Special logging for Mode 2 if it was the reason
                      if "Mode 2" in exit_reason:
                          self.log(f"[Mode 2 TRIGGER] Size: ${okx_pos_notional:.2f} | Target: ${target_pnl:.4f} | Unrealized: ${total_unrealized_pnl:.4f}", level="WARNING")
                      
-                     threading.Thread(target=self._execute_trade_exit, args=(exit_reason,), daemon=True).start()
+                     self._submit_action(self._execute_trade_exit, exit_reason)
 
         # Need Add Calculation - Moved to _sync_account_data
         # self._calculate_need_add_metrics(okx_pos_notional)
 
-        # Store metrics for Emitter
-        self.max_allowed_display = max_allowed_display
-        self.max_amount_display = max_amount_display
-        self.remaining_amount_notional = remaining_amount_notional
-        self.trade_fees = okx_pos_notional * trade_fee_pct # Corrected: trade_fee_pct already decimal
-
     def _calculate_need_add_metrics(self, okx_pos_notional):
         """Helper to calculate Need Add values."""
+        pos_snap = self._pos_snapshot
+        if pos_snap['long']['in_position']:
+            pos_side = 'long'
+        elif pos_snap['short']['in_position']:
+            pos_side = 'short'
+        else:
+            pos_side = None
+        avg_entry = pos_snap[pos_side]['entry_price'] if pos_side else 0.0
+        if okx_pos_notional <= 0 or avg_entry <= 0:
+            self.need_add_usdt_profit_target = 0.0
+            self.need_add_usdt_above_zero = 0.0
+            self._need_add_cache_key = None
+            return
+
+        # Fallback chain: WS Price -> Cached Detail Price -> Entry (as last resort to avoid 0)
+        current_price = self.latest_trade_price
+        if not current_price or current_price <= 0:
+            # Try to get from cached position details if available
+            current_price = safe_float(self.position_details.get(pos_side, {}).get('lastPx'))
+            if current_price <= 0:
+                current_price = avg_entry # Fallback to entry so metrics stay near 0
+
+        # Same inputs as last time (idle market between UI ticks): the stored results still hold
+        cache_key = (current_price, okx_pos_notional, avg_entry, pos_side)
+        if cache_key == self._need_add_cache_key:
+            return
+        self._need_add_cache_key = cache_key
         self.need_add_usdt_profit_target = 0.0
         self.need_add_usdt_above_zero = 0.0
-        
-        if okx_pos_notional > 0:
-            try:
-                avg_entry = 0.0
-                pos_side = 'long'
-                with self.position_lock:
-                    if self.in_position['long']: 
-                        avg_entry = self.position_entry_price.get('long', 0)
-                        pos_side = 'long'
-                    elif self.in_position['short']:
-                        avg_entry = self.position_entry_price.get('short', 0)
-                        pos_side = 'short'
-                
-                if avg_entry > 0:
-                    # Fallback chain: WS Price -> Cached Detail Price -> Entry (as last resort to avoid 0)
-                    current_price = self.latest_trade_price
-                    if not current_price or current_price <= 0:
-                        # Try to get from cached position details if available
-                        details = self.position_details.get(pos_side, {})
-                        current_price = safe_float(details.get('lastPx'))
-                        if not current_price or current_price <= 0:
-                             current_price = avg_entry # Fallback to entry so denom calculation doesn't crash but metrics stay near 0
-
-                    if current_price and current_price > 0:
-                         recovery_pct = self.config.get('add_pos_recovery_percent', 0.6) / 100.0
-                         
-                         # Sensitivity Fix: Always show if price is against us
-                         is_against = (pos_side == 'long' and current_price < avg_entry) or \
-                                      (pos_side == 'short' and current_price > avg_entry)
-                         
-                         if is_against:
-                             target_price_be = 0.0
-                             if pos_side == 'long':
-                                 target_price_be = current_price * (1 + recovery_pct)
-                                 # Limit target to entry price if it would overshoot (stays sensitive)
-                                 target_price_be = min(target_price_be, avg_entry - 0.00000001)
-                                 
-                                 denom = target_price_be - current_price
-                                 if denom > 0:
-                                     self.need_add_usdt_above_zero = okx_pos_notional * (avg_entry - target_price_be) / denom
-                             else: # Short
-                                 target_price_be = current_price * (1 - recovery_pct)
-                                 # Limit target to entry price if it would overshoot
-                                 target_price_be = max(target_price_be, avg_entry + 0.00000001)
-                                 
-                                 denom = current_price - target_price_be
-                                 if denom > 0:
-                                      self.need_add_usdt_above_zero = okx_pos_notional * (target_price_be - avg_entry) / denom
-                             
-                             # Mode 2: Profit Target
-                             profit_mult = self.config.get('add_pos_profit_multiplier', 1.5)
-                             trade_fee_pct = self.config.get('trade_fee_percentage', 0.08) / 100.0
-                             needed_gain_pct = trade_fee_pct * profit_mult
-                             
-                             if pos_side == 'long':
-                                 target_avg_for_profit = target_price_be / (1 + needed_gain_pct)
-                                 denom_profit = target_avg_for_profit - current_price
-                                 if denom_profit > 0:
-                                     self.need_add_usdt_profit_target = okx_pos_notional * (avg_entry - target_avg_for_profit) / denom_profit
-                             else: # Short
-                                 target_avg_for_profit = target_price_be / (1 - needed_gain_pct)
-                                 denom_profit = current_price - target_avg_for_profit
-                                 if denom_profit > 0:
-                                     self.need_add_usdt_profit_target = okx_pos_notional * (target_avg_for_profit - avg_entry) / denom_profit
 
-            except Exception as e:
-                self.log(f"Error calculating Need Add: {e}", level="debug")
+        # Long and short share one formula: sign flips every price difference (+1 long, -1 short)
+        sign = 1.0 if pos_side == 'long' else -1.0
+
+        # Sensitivity Fix: Always show if price is against us
+        if sign * (avg_entry - current_price) <= 0:
+            return
+
+        # Break-even target one recovery step away, limited to (just short of) the entry so it stays sensitive
+        target_price_be = current_price * (1 + sign * self._c_add_pos_recovery_pct)
+        target_price_be = sign * min(sign * target_price_be, sign * avg_entry - 0.00000001)
+        denom = sign * (target_price_be - current_price)
+        if denom > 1e-12:
+            self.need_add_usdt_above_zero = okx_pos_notional * sign * (avg_entry - target_price_be) / denom
+
+        # Mode 2: Profit Target
+        gain_factor = 1 + sign * self._c_trade_fee_pct * self._c_add_pos_profit_multiplier
+        if gain_factor > 1e-12:
+            target_avg_for_profit = target_price_be / gain_factor
+            denom_profit = sign * (target_avg_for_profit - current_price)
+            if denom_profit > 1e-12:
+                self.need_add_usdt_profit_target = okx_pos_notional * sign * (avg_entry - target_avg_for_profit) / denom_profit
 
     def _emit_socket_updates(self):
         """
         Phase 3 of Unified Loop: Emitter.
         Sends calculated data to the frontend.
         """
-        with self.trade_data_lock:
-            current_trades = self.open_trades
-            
-        self.emit('trades_update', {'trades': current_trades})
+        current_trades = self.open_trades
 
-        # Emit 'account_update' with calculated targets for real-time sync
+        # Open trades and account metrics go out as one 'bot_tick' frame (one JSON encode, one WS write)
+        # Account metrics with calculated targets for real-time sync
         # Calculate current auto-exit targets based on position size
         # Standardize fee multiplier (0.08 / 100 = 0.0008)
-        trade_fee_pct_raw = self.config.get('trade_fee_percentage', 0.08)
-        trade_fee_dec = trade_fee_pct_raw / 100.0
+        trade_fee_dec = self._c_trade_fee_pct
         
-        okx_pos_notional = getattr(self, 'cached_pos_notional', 0.0)
+        okx_pos_notional = self.cached_pos_notional
         current_size_fee = okx_pos_notional * trade_fee_dec if okx_pos_notional > 0 else 0.0
         
-        self.emit('account_update', {
-            'total_trades': getattr(self, 'cached_active_positions_count', 0) + self.total_trades_count,
-            'total_capital': self.total_equity, 
-            'total_capital_2nd': getattr(self, 'total_capital_2nd', self.total_equity),
-            'max_allowed_used_display': getattr(self, 'max_allowed_display', 0.0), 
-            'max_amount_display': getattr(self, 'max_amount_display', 0.0),
-            'used_amount': getattr(self, 'used_amount_notional', 0.0), 
-            'size_amount': okx_pos_notional,
-            'trade_fees': getattr(self, 'trade_fees', 0.0),
-            'remaining_amount': getattr(self, 'remaining_amount_notional', 0.0), 
-            'total_balance': self.account_balance,
-            'available_balance': self.available_balance,
-            'net_profit': getattr(self, 'net_profit', 0.0),
-            'total_trade_profit': self.total_trade_profit,
-            'total_trade_loss': self.total_trade_loss,
-            'net_trade_profit': self.net_trade_profit,
-            'daily_reports': self.daily_reports,
-            'need_add_usdt': getattr(self, 'need_add_usdt_profit_target', 0.0),
-            'need_add_above_zero': getattr(self, 'need_add_usdt_above_zero', 0.0),
-            # Real-time calculated targets (update when fee% or multiplier changes)
-            'auto_cal_profit_target': self.config.get('pnl_auto_cal_times', 4) * current_size_fee,
-            'auto_cal_loss_target': -self.config.get('pnl_auto_cal_loss_times', 1.5) * current_size_fee,
-            'size_profit_target': self.config.get('size_auto_cal_times', 2.0) * current_size_fee,
-            'size_loss_target': -self.config.get('size_auto_cal_loss_times', 1.5) * current_size_fee,
-            'mode_2_profit_target': self.config.get('add_pos_profit_multiplier', 1.5) * current_size_fee
-        })
+        # Refresh the persistent payload in place (same keys every tick, no new dict per emit)
+        account = self._account_payload
+        account['total_trades'] = self.cached_active_positions_count + self.total_trades_count
+        account['total_capital'] = self.total_equity
+        account['total_capital_2nd'] = self.total_capital_2nd
+        account['max_allowed_used_display'] = self.max_allowed_display
+        account['max_amount_display'] = self.max_amount_display
+        account['used_amount'] = self.used_amount_notional
+        account['size_amount'] = okx_pos_notional
+        account['trade_fees'] = self.trade_fees
+        account['remaining_amount'] = self.remaining_amount_notional
+        account['total_balance'] = self.account_balance
+        account['available_balance'] = self.available_balance
+        account['net_profit'] = self.net_profit
+        account['total_trade_profit'] = self.total_trade_profit
+        account['total_trade_loss'] = self.total_trade_loss
+        account['net_trade_profit'] = self.net_trade_profit
+        account['daily_reports'] = self.daily_reports
+        account['need_add_usdt'] = self.need_add_usdt_profit_target
+        account['need_add_above_zero'] = self.need_add_usdt_above_zero
+        # Real-time calculated targets (update when fee% or multiplier changes)
+        for key, mult in self._c_exit_target_mults:
+            account[key] = mult * current_size_fee
+        # Skip the frame when nothing the dashboard shows changed (idle markets); still resend every 30s
+        tick_key = (
+            tuple(v for k, v in account.items() if k != 'daily_reports'),
+            len(self.daily_reports),
+            tuple((t['id'], t['status'], t['stake'], t['time_left']) for t in current_trades),
+        )
+        now = time.monotonic()
+        if tick_key != self._last_tick_key or now - self._last_tick_emit >= 30:
+            self._last_tick_key = tick_key
+            self._last_tick_emit = now
+            tick_payload = self._tick_payload
+            tick_payload['trades'] = current_trades
+            self.emit('bot_tick', tick_payload)
         
         self._check_and_save_daily_report()
         
         # Debug Log
-        if self.monitoring_tick % 10 == 0:
-             used = getattr(self, 'used_amount_notional', 0.0)
-             size = getattr(self, 'cached_pos_notional', 0.0)
+        if self._debug_enabled and self.monitoring_tick % 10 == 0:
+             used = self.used_amount_notional
+             size = self.cached_pos_notional
              self.log(f"Account Update | Used: ${used:.2f} | Size: ${size:.2f}", level="debug")
 
     def fetch_account_data_sync(self):
@@ -3580,23 +4579,18 @@ class TradingBotEngine:
         self._emit_socket_updates()
 
         # Sync pending_entry_ids with active orders from OKX
-        active_okx_ids = [t['id'] for t in self.open_trades]
-        with self.position_lock:
-            existing_pending = list(self.pending_entry_ids)
-            for p_id in existing_pending:
-                if p_id not in active_okx_ids:
-                    # Order is no longer on books (filled or cancelled)
-                    self.pending_entry_ids.remove(p_id)
-                    if p_id in self.pending_entry_order_details:
-                        del self.pending_entry_order_details[p_id]
-                    self.log(f"Pending order {p_id} cleared from tracking (Filled or Cancelled).", level="debug")
-                    # We might want to trigger TP/SL update here too.
-                    self._should_update_tpsl = True # Flag to update TP/SL if needed
-
-        if getattr(self, '_should_update_tpsl', False) and any(self.in_position.values()) and self.is_running:
+        active_okx_ids = {t['id'] for t in self.open_trades}
+        # Orders no longer on books (filled or cancelled)
+        for p_id in self._drop_pending_entries(self.pending_entry_ids - active_okx_ids):
+            self.log(f"Pending order {p_id} cleared from tracking (Filled or Cancelled).", level="debug")
+            # We might want to trigger TP/SL update here too.
+            self._should_update_tpsl = True # Flag to update TP/SL if needed
+
+        pos_snap = self._pos_snapshot
+        if self._should_update_tpsl and (pos_snap['long']['in_position'] or pos_snap['short']['in_position']) and self.is_running:
             self._should_update_tpsl = False
             # Call TP/SL modification to sync with new average price
-            threading.Thread(target=self.batch_modify_tpsl, daemon=True).start()
+            self._request_tpsl_sync()
             
             # REMOVED: self.initial_total_capital = total_balance reset. 
             # We want to keep the original capital to track net profit correctly.
@@ -3610,9 +4604,9 @@ class TradingBotEngine:
                  pass
 
         # Trade Fee Calculation: (Used + Remaining) * Fee_Percentage
-        trade_fee_pct = self.config.get('trade_fee_percentage', 0.07)
-        used_fee = self.used_amount_notional * (trade_fee_pct / 100.0)
-        remaining_fee = self.remaining_amount_notional * (trade_fee_pct / 100.0)
+        trade_fee_dec = self._c_trade_fee_pct
+        used_fee = self.used_amount_notional * trade_fee_dec
+        remaining_fee = self.remaining_amount_notional * trade_fee_dec
         trade_fees = used_fee + remaining_fee
 
         # Update persistent attributes for status retrieval
@@ -3624,9 +4618,10 @@ class TradingBotEngine:
 
         # Explicit Auto-Exit for Mode 1 (PnL Above Zero / Break-Even)
         # Mode 1 takes priority over Mode 2 (exits at break-even before waiting for profit)
-        if self.config.get('use_add_pos_above_zero', False) and okx_pos_notional > 0:
-             trade_fee_pct = self.config.get('trade_fee_percentage', 0.07)
-             current_size_fee = okx_pos_notional * (trade_fee_pct / 100.0)
+        okx_pos_notional = self.cached_pos_notional
+        # Unlocked flag check first: exit_lock is only taken when no exit is already running
+        if self._c_use_add_pos_above_zero and okx_pos_notional > 0 and not self.authoritative_exit_in_progress:
+             current_size_fee = okx_pos_notional * self._c_trade_fee_pct
              
              # Define "near zero" threshold: $1 or 10% of size fee (whichever is larger)
              # This prevents premature exit while ensuring we exit close to break-even
@@ -3637,51 +4632,23 @@ class TradingBotEngine:
              if self.net_profit >= -near_zero_threshold:
                  exit_reason = f"Mode 1 PnL Above Zero: ${self.net_profit:.2f} ≈ $0 (threshold: ${near_zero_threshold:.2f})"
                  with self.exit_lock:
-                     if not self.authoritative_exit_in_progress:
+                     if not self.authoritative_exit_in_progress and not self._exit_queued:
+                         self._exit_queued = True # Later triggers coalesce into this one until it starts
                          self.log(f"Mode 1 Check {exit_reason}. Auto-Closing Position...", level="WARNING")
-                         threading.Thread(target=self._execute_trade_exit, args=(exit_reason,), daemon=True).start()
+                         self._submit_action(self._execute_trade_exit, exit_reason)
 
     def test_api_credentials(self):
-        # Store current global API settings
-        
-        original_okx_api_key = self.okx_api_key
-        original_okx_api_secret = self.okx_api_secret
-        original_okx_passphrase = self.okx_passphrase
-        original_okx_simulated_trading_header = self.okx_simulated_trading_header
-
         try:
-            # Set global API settings for testing based on self.config (which was modified by app.py)
+            # Credentials for the test come from self.config (which was modified by app.py) and are passed
+            # explicitly, so the engine's own credentials are never swapped out underneath other threads
             use_dev = self.config.get('use_developer_api', False)
             use_demo = self.config.get('use_testnet', False)
-
-            if use_dev:
-                if use_demo:
-                    self.okx_api_key = self.config.get('dev_demo_api_key', '')
-                    self.okx_api_secret = self.config.get('dev_demo_api_secret', '')
-                    self.okx_passphrase = self.config.get('dev_demo_api_passphrase', '')
-                else:
-                    self.okx_api_key = self.config.get('dev_api_key', '')
-                    self.okx_api_secret = self.config.get('dev_api_secret', '')
-                    self.okx_passphrase = self.config.get('dev_passphrase', '')
-            else:
-                if use_demo:
-                    self.okx_api_key = self.config.get('okx_demo_api_key', '')
-                    self.okx_api_secret = self.config.get('okx_demo_api_secret', '')
-                    self.okx_passphrase = self.config.get('okx_demo_api_passphrase', '')
-                else:
-                    self.okx_api_key = self.config.get('okx_api_key', '')
-                    self.okx_api_secret = self.config.get('okx_api_secret', '')
-                    self.okx_passphrase = self.config.get('okx_passphrase', '')
-
-            if use_demo:
-                self.okx_simulated_trading_header = {'x-simulated-trading': '1'}
-            else:
-                self.okx_simulated_trading_header = {}
+            creds = self._select_api_credentials(use_dev, use_demo)
 
             # Attempt a simple API call, e.g., get account balance
             path_balance = "/api/v5/account/balance"
             params_balance = {"ccy": "USDT"}
-            response_balance = self._okx_request("GET", path_balance, params=params_balance, max_retries=1) # Only 1 retry for test
+            response_balance = self._okx_request("GET", path_balance, params=params_balance, max_retries=1, creds=creds) # Only 1 retry for test
 
             if response_balance and response_balance.get('code') == '0':
                 return True
@@ -3690,14 +4657,20 @@ class TradingBotEngine:
         except Exception as e:
             self.log(f"Error during API credential test: {e}", level="error")
             return False
-        finally:
-            # Restore original global API settings
-            self.okx_api_key = original_okx_api_key
-            self.okx_api_secret = original_okx_api_secret
-            self.okx_passphrase = original_okx_passphrase
-            self.okx_simulated_trading_header = original_okx_simulated_trading_header
 
     def batch_modify_tpsl(self):
+        # One run at a time (TP/SL worker and the dashboard can both trigger it). A colliding call
+        # re-marks TP/SL stale instead of waiting, so the worker picks up anything the running pass missed
+        if not self._batch_tpsl_lock.acquire(blocking=False):
+            self.log("Batch TP/SL update already in progress, queueing a follow-up pass.", level="debug")
+            self._request_tpsl_sync()
+            return
+        try:
+            self._batch_modify_tpsl()
+        finally:
+            self._batch_tpsl_lock.release()
+
+    def _batch_modify_tpsl(self):
         self.log("Initiating batch TP/SL modification...", level="debug")
         try:
             latest_data = self._get_latest_data_and_indicators()
@@ -3710,139 +4683,158 @@ class TradingBotEngine:
                 self.log("Current market price is None for batch TP/SL modification.", level="debug")
                 return
 
-            path = "/api/v5/account/positions"
-            params = {"instType": "SWAP", "instId": self.config['symbol']}
-            response = self._okx_request("GET", path, params=params)
+            symbol = self.config['symbol']
+            # The positions read and the pending-algo read don't depend on each other; overlap the two round-trips
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                pos_future = executor.submit(self._okx_request, "GET", "/api/v5/account/positions",
+                                             params={"instType": "SWAP", "instId": symbol})
+                # Note: OKX allows filtering by posSide in some cases, but here we fetch all and filter locally
+                algo_future = executor.submit(self._okx_request, "GET", "/api/v5/trade/orders-algo-pending",
+                                              params={"instType": "SWAP", "instId": symbol, "ordType": "conditional"})
+                response = pos_future.result()
+                resp_algo = algo_future.result()
 
             if not response or response.get('code') != '0':
                 self.log(f"Failed to fetch open positions for batch TP/SL modification: {response}", level="error")
                 self.emit('error', {'message': f'Failed to batch modify TP/SL: Could not fetch open positions.'})
                 return
 
-            positions = response.get('data', [])
+            # The request is already filtered by instId; parse each row once and drop flat "ghost" rows (pos 0 / no avgPx)
+            parsed = ((safe_float(p.get('pos', '0')), p.get('posSide', 'net'), safe_float(p.get('avgPx', '0'))) for p in response.get('data', []))
+            positions = [row for row in parsed if row[0] and row[2] > 0]
             modified_count = 0
-            tp_price_offset = self.config['tp_price_offset']
-            sl_price_offset = self.config['sl_price_offset']
-            price_precision = self.product_info.get('pricePrecision', 4)
-            qty_precision = self.product_info.get('qtyPrecision', 8)
-
-            # Group positions by side for batch processing if needed, but here we loop
-            for pos in positions:
-                if pos.get('instId') == self.config['symbol']:
-                    pos_qty = safe_float(pos.get('pos', '0'))
-                    pos_side_raw = pos.get('posSide', 'net')
-                    avg_px = safe_float(pos.get('avgPx', '0'))
-
-                    if abs(pos_qty) > 0 and avg_px > 0:
-                        # Map to our internal side key using exchange data
-                        # Map to our internal side key using exchange data
-                        if pos_side_raw == 'short':
-                            side_key = 'short'
-                        elif pos_side_raw == 'long':
-                            side_key = 'long'
-                        else: # 'net' mode
-                             side_key = 'long' if pos_qty > 0 else 'short'
-
-                        order_side = "sell" if side_key == 'long' else "buy"
-                        new_tp = 0.0
-                        new_sl = 0.0
-
-                        # Safely calculate targets if offsets are provided
-                        if tp_price_offset and safe_float(tp_price_offset) > 0:
-                            if side_key == 'long':
-                                new_tp = avg_px + safe_float(tp_price_offset)
-                            else:
-                                new_tp = avg_px - safe_float(tp_price_offset)
-                        else:
-                            self.log(f"Batch Sync: TP offset is null or 0 for {side_key.upper()}. Skipping TP calc.", level="debug")
-
-                        if sl_price_offset and safe_float(sl_price_offset) > 0:
-                            if side_key == 'long':
-                                new_sl = avg_px - safe_float(sl_price_offset)
-                            else:
-                                new_sl = avg_px + safe_float(sl_price_offset)
-                        else:
-                            self.log(f"Batch Sync: SL offset is null or 0 for {side_key.upper()}. Skipping SL calc.", level="debug")
-
-                        self.log(f"Syncing TP/SL for {side_key.upper()} position. Avg Price: {avg_px:.{price_precision}f}", level="debug")
+            # Offsets converted once per config change (_refresh_config_cache); <= 0 means "not configured"
+            tp_price_offset = self._c_tp_price_offset
+            sl_price_offset = self._c_sl_price_offset
+            qty_fmt = self._qty_fmt
+            px_fmt = self._px_fmt
+
+            # Live algo ids, used to recognise sides whose placed TP/SL already match the targets
+            pending_algo_ids = None
+            if resp_algo and resp_algo.get('code') == '0':
+                pending_algo_ids = {a.get('algoId') for a in resp_algo.get('data', [])}
+            pos_snap = self._pos_snapshot
+
+            # Pass 1: work out the new targets for every side before touching any orders
+            plans = []
+            for pos_qty, pos_side_raw, avg_px in positions:
+                # Map to our internal side key using exchange data
+                if pos_side_raw == 'short':
+                    side_key = 'short'
+                elif pos_side_raw == 'long':
+                    side_key = 'long'
+                else: # 'net' mode
+                     side_key = 'long' if pos_qty > 0 else 'short'
+
+                new_tp = 0.0
+                new_sl = 0.0
+
+                # Safely calculate targets if offsets are provided
+                sign = _SIDE_TABLE[side_key]['sign']
+                if tp_price_offset > 0:
+                    new_tp = avg_px + sign * tp_price_offset
+                else:
+                    self.log(f"Batch Sync: TP offset is null or 0 for {side_key.upper()}. Skipping TP calc.", level="debug")
 
+                if sl_price_offset > 0:
+                    new_sl = avg_px - sign * sl_price_offset
+                else:
+                    self.log(f"Batch Sync: SL offset is null or 0 for {side_key.upper()}. Skipping SL calc.", level="debug")
+
+                # Same formatted prices and size as the orders this method last placed, and those orders are
+                # still tracked and pending: cancelling and re-placing them would be a no-op, so skip the side
+                sz_str = qty_fmt(abs(pos_qty))
+                target_key = (px_fmt(new_tp) if tp_price_offset > 0 else None,
+                              px_fmt(new_sl) if sl_price_offset > 0 else None, sz_str)
+                placed = self._tpsl_placed.get(side_key)
+                if (placed is not None and pending_algo_ids is not None and placed[0] == target_key
+                        and placed[1:] == (pos_snap[side_key]['tp_id'], pos_snap[side_key]['sl_id'])
+                        and all(aid in pending_algo_ids for aid in placed[1:] if aid)):
+                    self.log(f"TP/SL for {side_key.upper()} already at target, skipping re-placement.", level="debug")
+                    continue
 
+                self.log(f"Syncing TP/SL for {side_key.upper()} position. Avg Price: {px_fmt(avg_px)}", level="debug")
+                plans.append((side_key, pos_side_raw, sz_str, new_tp, new_sl, target_key))
+
+            if plans:
+                # 1. Cancel existing algo orders for this SYMBOL + every synced side at once:
+                # one /cancel-algos batch instead of per-order cancels and a 0.2s settle sleep per side
+                # (batch cancels are applied before the response returns)
+                synced_pos_sides = {plan[1] for plan in plans}
+                if pending_algo_ids is not None:
+                    stale_ids = [a.get('algoId') for a in resp_algo.get('data', []) if a.get('posSide') in synced_pos_sides]
+                    if stale_ids:
+                        self._okx_cancel_algo_orders_batch(symbol, stale_ids)
+
+            # Place new TP and SL. OKX has no batch endpoint for algo placement, so every side's bodies are built
+            # first and sent concurrently (one request per order), then the ids are mapped back to their side
+            trig_px_type = self.config.get('trigger_price', 'last')
+            td_mode = self.config.get('mode', 'cross')
+            algo_requests = [] # (plan index, kind, body)
+            for idx, (side_key, pos_side_raw, sz_str, new_tp, new_sl, target_key) in enumerate(plans):
+                order_side = _SIDE_TABLE[side_key]['exit']
+                if tp_price_offset > 0:
+                    tp_px = px_fmt(new_tp)
+                    algo_requests.append((idx, 'tp', {
+                        **self._algo_body_template(symbol, td_mode, pos_side_raw, order_side, trig_px_type, 'tp'),
+                        "sz": sz_str,
+                        "tpTriggerPx": tp_px,
+                        "algoClOrdId": self._new_clordid('t')
+                    }))
+                else:
+                    self.log(f"Skipping TP batch modify for {side_key.upper()} (No offset)", level="debug")
+
+                if sl_price_offset > 0:
+                    sl_px = px_fmt(new_sl)
+                    algo_requests.append((idx, 'sl', {
+                        **self._algo_body_template(symbol, td_mode, pos_side_raw, order_side, trig_px_type, 'sl'),
+                        "sz": sz_str,
+                        "slTriggerPx": sl_px,
+                        "algoClOrdId": self._new_clordid('s')
+                    }))
+                else:
+                    self.log(f"Skipping SL batch modify for {side_key.upper()} (No offset)", level="debug")
+
+            # Network calls run lock-free; only the bookkeeping below is committed under position_lock
+            results = self._okx_batch_place_algo_order([body for _, _, body in algo_requests], verbose=False)
+            placed_by_plan = [{} for _ in plans]
+            for (idx, kind, body), algo_order in zip(algo_requests, results):
+                algo_id = algo_order and (algo_order.get('algoId') or algo_order.get('ordId'))
+                if algo_id:
+                    placed_by_plan[idx][kind] = algo_id
+                    self.log(f"[TARGET] {plans[idx][0].upper()} {kind.upper()} Set: {body[kind + 'TriggerPx']}", level="info")
+
+            position_updates = [] # Side payloads, sent to the dashboard as one frame after the loop
+            for (side_key, pos_side_raw, sz_str, new_tp, new_sl, target_key), new_exit_orders in zip(plans, placed_by_plan):
+                update_payload = None
+                with self.position_lock:
+                    # Mutate in place so readers holding a reference never see a swapped-out dict
+                    self.position_exit_orders[side_key].clear()
+                    self.position_exit_orders[side_key].update(new_exit_orders)
+                    # Remember the placement only when every configured leg went through
+                    if (tp_price_offset <= 0 or 'tp' in new_exit_orders) and (sl_price_offset <= 0 or 'sl' in new_exit_orders):
+                        self._tpsl_placed[side_key] = (target_key, new_exit_orders.get('tp'), new_exit_orders.get('sl'))
+                    else:
+                        self._tpsl_placed.pop(side_key, None)
+                    # Only count as modified if at least one order was placed
+                    if tp_price_offset > 0 or sl_price_offset > 0:
+                        self.current_take_profit[side_key] = new_tp
+                        self.current_stop_loss[side_key] = new_sl
+                        update_payload = {
+                            'in_position': self.in_position[side_key],
+                            'position_entry_price': self.position_entry_price[side_key],
+                            'position_qty': self.position_qty[side_key],
+                            'current_take_profit': new_tp,
+                            'current_stop_loss': new_sl,
+                            'side': side_key
+                        }
 
-                        with self.position_lock:
-                            # 1. Fetch and cancel existing algo orders for this SYMBOL + SIDE
-                            # Note: OKX allows filtering by posSide in some cases, but here we check all and filter locally
-                            path_algo = "/api/v5/trade/orders-algo-pending"
-                            params_algo = {"instType": "SWAP", "instId": self.config['symbol'], "ordType": "conditional"}
-                            resp_algo = self._okx_request("GET", path_algo, params=params_algo)
-                            
-                            if resp_algo and resp_algo.get('code') == '0':
-                                for algo_order in resp_algo.get('data', []):
-                                    if algo_order.get('posSide') == pos_side_raw:
-                                        self._okx_cancel_algo_order(self.config['symbol'], algo_order.get('algoId'))
-                            
-                            self.position_exit_orders[side_key] = {}
-                            time.sleep(0.2) 
+                if update_payload is not None:
+                    modified_count += 1
+                    position_updates.append(update_payload)
 
-                            # Place new TP and SL
-                            trig_px_type = self.config.get('trigger_price', 'last')
-                            
-                            if tp_price_offset and safe_float(tp_price_offset) > 0:
-                                tp_body = {
-                                    "instId": self.config['symbol'],
-                                    "tdMode": self.config.get('mode', 'cross'),
-                                    "side": order_side,
-                                    "posSide": pos_side_raw,
-                                    "ordType": "conditional",
-                                    "sz": f"{abs(pos_qty):.{qty_precision}f}",
-                                    "tpTriggerPx": f"{new_tp:.{price_precision}f}",
-                                    "tpTriggerPxType": trig_px_type,
-                                    "tpOrdPx": "-1",
-                                    "reduceOnly": "true"
-                                }
-
-                                tp_order = self._okx_place_algo_order(tp_body, verbose=False)
-                                if tp_order and (tp_order.get('algoId') or tp_order.get('ordId')):
-                                    self.position_exit_orders[side_key]['tp'] = tp_order.get('algoId') or tp_order.get('ordId')
-                                    self.log(f"[TARGET] {side_key.upper()} TP Set: {new_tp:.{price_precision}f}", level="info")
-                            else:
-                                self.log(f"Skipping TP batch modify for {side_key.upper()} (No offset)", level="debug")
-                            
-                            if sl_price_offset and safe_float(sl_price_offset) > 0:
-                                sl_body = {
-                                    "instId": self.config['symbol'],
-                                    "tdMode": self.config.get('mode', 'cross'),
-                                    "side": order_side,
-                                    "posSide": pos_side_raw,
-                                    "ordType": "conditional",
-                                    "sz": f"{abs(pos_qty):.{qty_precision}f}",
-                                    "slTriggerPx": f"{new_sl:.{price_precision}f}",
-                                    "slTriggerPxType": trig_px_type,
-                                    "slOrdPx": "-1",
-                                    "reduceOnly": "true"
-                                }
-
-                                sl_order = self._okx_place_algo_order(sl_body, verbose=False)
-                                if sl_order and (sl_order.get('algoId') or sl_order.get('ordId')):
-                                    self.position_exit_orders[side_key]['sl'] = sl_order.get('algoId') or sl_order.get('ordId')
-                                    self.log(f"[TARGET] {side_key.upper()} SL Set: {new_sl:.{price_precision}f}", level="info")
-                            else:
-                                self.log(f"Skipping SL batch modify for {side_key.upper()} (No offset)", level="debug")
-                            
-                            # Only count as modified if at least one order was placed
-                            if (tp_price_offset and safe_float(tp_price_offset) > 0) or (sl_price_offset and safe_float(sl_price_offset) > 0):
-                                self.current_take_profit[side_key] = new_tp
-                                self.current_stop_loss[side_key] = new_sl
-                                modified_count += 1
-                                
-                                # Emit side-specific update
-                                self.emit('position_update', {
-                                    'in_position': self.in_position[side_key],
-                                    'position_entry_price': self.position_entry_price[side_key],
-                                    'position_qty': self.position_qty[side_key],
-                                    'current_take_profit': self.current_take_profit[side_key],
-                                    'current_stop_loss': self.current_stop_loss[side_key],
-                                    'side': side_key
-                                })
+            if position_updates:
+                self.emit('position_batch_update', {'positions': position_updates})
 
             if modified_count > 0:
                 self.log(f"Successfully modified TP/SL for {modified_count} sides.", level="info")
@@ -3867,13 +4859,9 @@ class TradingBotEngine:
             response = self._okx_request("GET", path, params=params)
 
             if response and response.get('code') == '0':
-                orders = response.get('data', [])
-                for order in orders:
-                    order_id = order.get('ordId')
-                    if order_id:
-                        if self._okx_cancel_order(self.config['symbol'], order_id):
-                            cancelled_count += 1
-                            time.sleep(0.1)
+                order_ids = [o.get('ordId') for o in response.get('data', []) if o.get('ordId')]
+                if order_ids:
+                    cancelled_count += self._okx_cancel_batch_orders(self.config['symbol'], order_ids)
 
             # 2. Cancel Algo Orders (TP/SL/Conditional)
             path_algo = "/api/v5/trade/orders-algo-pending"
@@ -3885,13 +4873,9 @@ class TradingBotEngine:
             response_algo = self._okx_request("GET", path_algo, params=params_algo)
 
             if response_algo and response_algo.get('code') == '0':
-                algo_orders = response_algo.get('data', [])
-                for algo_order in algo_orders:
-                    algo_id = algo_order.get('algoId')
-                    if algo_id:
-                        if self._okx_cancel_algo_order(self.config['symbol'], algo_id):
-                            cancelled_count += 1
-                            time.sleep(0.1)
+                algo_ids = [o.get('algoId') for o in response_algo.get('data', []) if o.get('algoId')]
+                if algo_ids:
+                    cancelled_count += self._okx_cancel_algo_orders_batch(self.config['symbol'], algo_ids)
 
             if cancelled_count > 0:
                 self.log(f"[DONE] Cancelled {cancelled_count} pending orders.", level="info")
@@ -3919,6 +4903,11 @@ class TradingBotEngine:
         Returns a dictionary with status and warning messages.
         """
         warnings = []
+        # Re-saving unchanged settings is common from the dashboard: nothing to publish or push to the exchange
+        old_config = self.config
+        if all(old_config.get(k) == v for k, v in new_config.items()):
+            return {"success": True, "warnings": warnings}
+
         old_symbol = self.config.get('symbol')
         new_symbol = new_config.get('symbol')
         old_lev = self.config.get('leverage')
@@ -3926,12 +4915,22 @@ class TradingBotEngine:
         old_pos_mode = self.config.get('okx_pos_mode')
         new_pos_mode = new_config.get('okx_pos_mode')
 
-        # 1. Update internal config object
-        self.config = new_config
+        # 1. Build the new config privately and publish it with one reference swap, so the trading threads
+        # see either the old or the new config, never a half-applied one (new_config is app.py's live dict)
+        cfg = dict(new_config)
+        symbol_blocked = False
+        if new_symbol != old_symbol:
+            # The published snapshot mirrors self.in_position, which is synced with the exchange
+            pos_snap = self._pos_snapshot
+            symbol_blocked = pos_snap['long']['in_position'] or pos_snap['short']['in_position']
+            if symbol_blocked:
+                cfg['symbol'] = old_symbol
+        self.config = cfg
+        self._refresh_config_cache()
         self.log("Applying live configuration updates (including new Auto-Add parameters)...", level="info")
 
-        # 2. Handle Leverage Change
-        if new_lev != old_lev:
+        # 2. Handle Leverage Change (compared numerically: the dashboard may send "20" for a stored 20)
+        if safe_float(new_lev) != safe_float(old_lev):
             self.log(f"Leverage change detected: {old_lev} -> {new_lev}. Updating on exchange...", level="info")
             lev_success = False
             if new_pos_mode == 'long_short_mode':
@@ -3948,15 +4947,9 @@ class TradingBotEngine:
 
         # 3. Handle Symbol Change (Sensitive)
         if new_symbol != old_symbol:
-            # Check for open positions
-            in_pos = False
-            with self.position_lock:
-                # We check the authoritative state in self.in_position which is synced with the exchange
-                in_pos = any(self.in_position.values())
-            
-            if in_pos:
+            # Open positions were checked before publishing; the symbol was kept on old_symbol in that case
+            if symbol_blocked:
                 self.log(f"⚠️ Cannot change symbol to {new_symbol} while positions are open for {old_symbol}. Reverting symbol config.", level="warning")
-                self.config['symbol'] = old_symbol
                 warnings.append(f"Symbol change to {new_symbol} blocked: Please close existing positions for {old_symbol} first.")
             else:
                 self.log(f"🔄 Switching symbol from {old_symbol} to {new_symbol}...", level="info")
@@ -3964,12 +4957,10 @@ class TradingBotEngine:
                 # Update subscription target
                 self.subscribed_instrument = new_symbol
                 
-                # Stop WebSocket to clear old subscriptions
-                if self.ws:
-                    self.ws.close()
-                
                 # Fetch new product info
                 if self._fetch_product_info(new_symbol):
+                    # Move the streams on the open sockets instead of a full close/reconnect (handshake + login)
+                    self._switch_ws_symbol(old_symbol, new_symbol)
                     # Set leverage for the new symbol
                     if new_pos_mode == 'long_short_mode':
                         self._okx_set_leverage(new_symbol, new_lev, pos_side="long")
@@ -3980,8 +4971,10 @@ class TradingBotEngine:
                     self.log(f"[DONE] Successfully swapped to {new_symbol}.", level="info")
                 else:
                     self.log(f"❌ Failed to fetch info for {new_symbol}. Reverting to {old_symbol}.", level="error")
-                    self.config['symbol'] = old_symbol
+                    self.config = {**cfg, 'symbol': old_symbol}
+                    self._refresh_config_cache()
+                    self.subscribed_instrument = old_symbol
                     warnings.append(f"Failed to switch to {new_symbol}: could not fetch product info.")
-                    # Restart WS with old symbol if needed (it will restart automatically in the loop)
+                    # The streams were never moved, so they are still on old_symbol
 
         return {"success": True, "warnings": warnings}
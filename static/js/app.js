@@ -316,10 +316,21 @@ function setupSocketListeners() {
         updateOpenTrades(data.trades);
     });
 
+    // Periodic engine update: open trades + account metrics in a single frame
+    socket.on('bot_tick', (data) => {
+        updateOpenTrades(data.trades);
+        updateAccountMetrics(data.account);
+    });
+
     socket.on('position_update', (data) => {
         updatePositionDisplay(data);
     });
 
+    // Several sides updated together (e.g. a TP/SL resync): one frame, one payload per side
+    socket.on('position_batch_update', (data) => {
+        (data.positions || []).forEach(updatePositionDisplay);
+    });
+
     socket.on('console_log', (data) => {
         addConsoleLog(data);
     });
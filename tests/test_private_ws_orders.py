@@ -0,0 +1,133 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from bot_engine import TradingBotEngine
+
+SYMBOL = 'BTC-USDT-SWAP'
+
+
+def make_order(ord_id, state='live', u_time=1000, reduce_only='false', inst_id=SYMBOL):
+    return {'ordId': ord_id, 'state': state, 'uTime': str(u_time), 'reduceOnly': reduce_only, 'instId': inst_id}
+
+
+def make_engine(open_orders=None, closed_orders=None):
+    return SimpleNamespace(
+        config={'symbol': SYMBOL},
+        _pi_contract_size=0.01,
+        _ws_orders_lock=threading.Lock(),
+        _ws_open_orders=dict(open_orders or {}),
+        _ws_closed_orders=dict(closed_orders or {}),
+        _adopt_pending_order=mock.Mock(),
+        _drop_pending_entries=mock.Mock(),
+    )
+
+
+def merge(engine, rest_orders, fetch_ms):
+    return TradingBotEngine._merge_rest_open_orders(engine, rest_orders, fetch_ms)
+
+
+def push(engine, data):
+    TradingBotEngine._process_orders_push(engine, data)
+
+
+class MergeRestOpenOrdersTest(unittest.TestCase):
+
+    def test_snapshot_order_newer_than_book_replaces_it(self):
+        engine = make_engine(open_orders={'1': make_order('1', u_time=1000)})
+        rest = make_order('1', state='partially_filled', u_time=2000)
+        merged = merge(engine, [rest], fetch_ms=1500)
+        self.assertEqual(merged, [rest])
+        self.assertIs(engine._ws_open_orders['1'], rest)
+
+    def test_stale_snapshot_order_keeps_newer_book_copy(self):
+        pushed = make_order('1', state='partially_filled', u_time=3000)
+        engine = make_engine(open_orders={'1': pushed})
+        merged = merge(engine, [make_order('1', u_time=1000)], fetch_ms=1500)
+        self.assertEqual(merged, [pushed])
+
+    def test_tombstoned_order_is_not_resurrected_by_stale_snapshot(self):
+        engine = make_engine(closed_orders={'1': 2000})
+        merged = merge(engine, [make_order('1', u_time=1000)], fetch_ms=1500)
+        self.assertEqual(merged, [])
+        self.assertEqual(engine._ws_open_orders, {})
+        # Still listed by the snapshot, so the tombstone is kept
+        self.assertEqual(engine._ws_closed_orders, {'1': 2000})
+
+    def test_snapshot_newer_than_tombstone_wins(self):
+        engine = make_engine(closed_orders={'1': 1000})
+        rest = make_order('1', u_time=2000)
+        self.assertEqual(merge(engine, [rest], fetch_ms=1500), [rest])
+
+    def test_unlisted_tombstones_are_pruned(self):
+        engine = make_engine(closed_orders={'gone': 1000})
+        merge(engine, [], fetch_ms=1500)
+        self.assertEqual(engine._ws_closed_orders, {})
+
+    def test_book_only_orders_kept_only_if_updated_after_fetch(self):
+        fresh = make_order('fresh', u_time=2000)
+        stale = make_order('stale', u_time=1000)
+        engine = make_engine(open_orders={'fresh': fresh, 'stale': stale})
+        merged = merge(engine, [], fetch_ms=1500)
+        self.assertEqual(merged, [fresh])
+        self.assertEqual(engine._ws_open_orders, {'fresh': fresh})
+
+    def test_reduce_only_orders_are_excluded(self):
+        engine = make_engine()
+        merged = merge(engine, [make_order('tp', u_time=2000, reduce_only='true')], fetch_ms=1500)
+        self.assertEqual(merged, [])
+        self.assertEqual(engine._ws_open_orders, {})
+
+
+class ProcessOrdersPushTest(unittest.TestCase):
+
+    def test_live_order_is_booked_and_adopted(self):
+        engine = make_engine()
+        order = make_order('1')
+        push(engine, [order])
+        self.assertIs(engine._ws_open_orders['1'], order)
+        engine._adopt_pending_order.assert_called_once_with(order, 0.01)
+        engine._drop_pending_entries.assert_not_called()
+
+    def test_partially_filled_order_stays_booked_without_adoption(self):
+        engine = make_engine()
+        order = make_order('1', state='partially_filled')
+        push(engine, [order])
+        self.assertIs(engine._ws_open_orders['1'], order)
+        engine._adopt_pending_order.assert_not_called()
+
+    def test_filled_order_is_tombstoned_but_not_dropped(self):
+        engine = make_engine(open_orders={'1': make_order('1', u_time=1000)})
+        push(engine, [make_order('1', state='filled', u_time=2000)])
+        self.assertEqual(engine._ws_open_orders, {})
+        self.assertEqual(engine._ws_closed_orders, {'1': 2000})
+        engine._drop_pending_entries.assert_not_called()
+
+    def test_terminal_states_are_tombstoned_and_dropped(self):
+        engine = make_engine(open_orders={'1': make_order('1'), '2': make_order('2'), '3': make_order('3')})
+        push(engine, [make_order('1', state='canceled', u_time=2000),
+                      make_order('2', state='mmp_canceled', u_time=2001),
+                      make_order('3', state='failed', u_time=2002)])
+        self.assertEqual(engine._ws_open_orders, {})
+        self.assertEqual(engine._ws_closed_orders, {'1': 2000, '2': 2001, '3': 2002})
+        engine._drop_pending_entries.assert_called_once_with(['1', '2', '3'])
+
+    def test_tombstone_from_push_blocks_stale_snapshot(self):
+        engine = make_engine(open_orders={'1': make_order('1', u_time=1000)})
+        push(engine, [make_order('1', state='canceled', u_time=2000)])
+        self.assertEqual(merge(engine, [make_order('1', u_time=1000)], fetch_ms=1500), [])
+
+    def test_reduce_only_and_other_instruments_are_ignored(self):
+        engine = make_engine()
+        push(engine, [make_order('tp', reduce_only='true'),
+                      make_order('other', inst_id='ETH-USDT-SWAP'),
+                      make_order('gone', state='canceled', inst_id='ETH-USDT-SWAP')])
+        self.assertEqual(engine._ws_open_orders, {})
+        self.assertEqual(engine._ws_closed_orders, {})
+        engine._adopt_pending_order.assert_not_called()
+        engine._drop_pending_entries.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()